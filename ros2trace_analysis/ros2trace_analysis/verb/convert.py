@@ -27,4 +27,7 @@ class ConvertVerb(VerbExtension):
         return convert(
             args.trace_directory,
             args.output_file_name,
+            args.output_format,
+            args.jobs,
+            args.incremental,
         )
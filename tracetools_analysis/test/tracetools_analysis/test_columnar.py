@@ -0,0 +1,167 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tracetools_analysis.conversion import columnar
+from tracetools_analysis.conversion.columnar import ColumnarTrace
+from tracetools_analysis.conversion.columnar import is_columnar_file
+from tracetools_analysis.conversion.columnar import write_columnar
+from tracetools_analysis.loading import get_event_names
+from tracetools_analysis.loading import iter_events
+from tracetools_analysis.loading import load_file
+
+
+class TestColumnar(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.events = []
+        for i in range(20):
+            if i % 3 == 0:
+                event = {
+                    '_name': 'ros2:rcl_node_init',
+                    '_timestamp': 1000 + i,
+                    'cpu_id': i % 4,
+                    'vpid': 12,
+                    'vtid': 34,
+                    'procname': 'talker',
+                    'node_handle': 0xfffffffffffff000 + i,
+                    'node_name': f'node_{i}',
+                }
+                # Field that is only in some events
+                if i % 2:
+                    event['namespace'] = '/'
+            elif i % 3 == 1:
+                event = {
+                    '_name': 'ros2:callback_start',
+                    '_timestamp': 1000 + i,
+                    'cpu_id': 0,
+                    'callback': i,
+                    'is_intra_process': 0,
+                }
+            else:
+                event = {
+                    '_name': 'lttng_ust_cyg_profile_fast:func_entry',
+                    '_timestamp': 1000 + i,
+                    'cpu_id': 1,
+                    'addr': i * 8,
+                    'ratio': i / 2,
+                    'gid': [1, 2, i],
+                }
+            self.events.append(event)
+        self.file_path = os.path.join(self.test_dir_path, 'converted')
+        write_columnar(self.events, self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def test_round_trip(self) -> None:
+        self.assertTrue(is_columnar_file(self.file_path))
+        trace = ColumnarTrace(self.file_path)
+        self.assertEqual(len(self.events), len(trace))
+        self.assertEqual(self.events, list(trace))
+        self.assertEqual(self.events[0], trace[0])
+        self.assertEqual(self.events[3], trace[3])
+        self.assertEqual(self.events[-1], trace[-1])
+        self.assertEqual(self.events[2:5], trace[2:5])
+        with self.assertRaises(IndexError):
+            trace[len(self.events)]
+        # Values are converted one chunk of events at a time
+        with mock.patch.object(columnar, 'ITER_CHUNK_SIZE', 4):
+            self.assertEqual(self.events, list(trace))
+
+    def test_write_chunks(self) -> None:
+        events = list(self.events)
+        # Field that only appears later, and field with different types over time
+        events.append({'_name': 'ros2:callback_start', '_timestamp': 2000, 'cpu_id': 0,
+                       'callback': 1, 'is_intra_process': 0, 'extra': 1})
+        for i, event in enumerate(events):
+            if event['_name'] == 'lttng_ust_cyg_profile_fast:func_entry':
+                event = dict(event)
+                event['addr'] = 2**64 - 1 if i > 10 else 'unknown'
+                events[i] = event
+        expected_file_path = os.path.join(self.test_dir_path, 'converted_expected')
+        write_columnar(events, expected_file_path)
+        expected = ColumnarTrace(expected_file_path)
+        # Values are converted to arrays every few events, with the same result
+        file_path = os.path.join(self.test_dir_path, 'converted_chunks')
+        with mock.patch.object(columnar, 'WRITE_CHUNK_SIZE', 2):
+            write_columnar(events, file_path)
+        trace = ColumnarTrace(file_path)
+        self.assertEqual(events, list(trace))
+        for event_name in trace.event_names:
+            expected_columns = expected.get_columns(event_name)
+            columns = trace.get_columns(event_name)
+            self.assertEqual(list(expected_columns.keys()), list(columns.keys()))
+            for field_name, values in columns.items():
+                self.assertEqual(expected_columns[field_name].dtype, values.dtype)
+
+    def test_columns(self) -> None:
+        trace = ColumnarTrace(self.file_path)
+        self.assertEqual(
+            [
+                'ros2:rcl_node_init',
+                'ros2:callback_start',
+                'lttng_ust_cyg_profile_fast:func_entry',
+            ],
+            trace.event_names,
+        )
+        self.assertEqual(7, trace.get_count('ros2:rcl_node_init'))
+        self.assertEqual(0, trace.get_count('some_other_event'))
+        self.assertEqual({}, trace.get_columns('some_other_event'))
+
+        timestamps = trace.get_column('ros2:callback_start', '_timestamp')
+        self.assertEqual(np.int64, timestamps.dtype)
+        self.assertEqual([1001, 1004, 1007, 1010, 1013, 1016, 1019], timestamps.tolist())
+        node_handles = trace.get_column('ros2:rcl_node_init', 'node_handle')
+        self.assertEqual(np.uint64, node_handles.dtype)
+        ratios = trace.get_column('lttng_ust_cyg_profile_fast:func_entry', 'ratio')
+        self.assertEqual(np.float64, ratios.dtype)
+        namespace_present = trace.get_column('ros2:rcl_node_init', 'namespace__present__')
+        self.assertEqual(
+            [False, True, False, True, False, True, False],
+            namespace_present.tolist(),
+        )
+
+    def test_loading(self) -> None:
+        self.assertFalse(is_columnar_file(__file__))
+        events = iter_events(self.file_path, do_convert_if_needed=False)
+        self.assertEqual(self.events, list(events))
+        events = load_file(self.file_path, do_convert_if_needed=False)
+        self.assertIsInstance(events, ColumnarTrace)
+        self.assertEqual(self.events, list(events))
+        self.assertEqual(
+            {
+                'ros2:rcl_node_init',
+                'ros2:callback_start',
+                'lttng_ust_cyg_profile_fast:func_entry',
+            },
+            get_event_names(self.file_path, do_convert_if_needed=False),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+from io import StringIO
+import os
+import shutil
+import tempfile
+import unittest
+
+from tracetools_analysis.conversion.cache import get_stream_changes
+from tracetools_analysis.conversion.cache import get_trace_state
+from tracetools_analysis.conversion.cache import is_conversion_up_to_date
+from tracetools_analysis.conversion.cache import read_manifest
+from tracetools_analysis.conversion.cache import STREAM_NEW
+from tracetools_analysis.conversion.cache import STREAM_REMOVED
+from tracetools_analysis.conversion.cache import write_manifest
+from tracetools_analysis.conversion.streams import compare_file_state
+from tracetools_analysis.conversion.streams import FILE_APPENDED
+from tracetools_analysis.conversion.streams import FILE_CHANGED
+from tracetools_analysis.conversion.streams import FILE_HASH_SIZE
+from tracetools_analysis.conversion.streams import FILE_UNCHANGED
+from tracetools_analysis.conversion.streams import get_file_state
+from tracetools_analysis.loading import _inspect_input_path
+
+
+PACKET = b'\xc1\x1f\xfc\xc1' + bytes(60)
+
+
+class TestConversionCache(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.ust_dir_path = os.path.join(self.test_dir_path, 'ust')
+        os.mkdir(self.ust_dir_path)
+        self._write('metadata', b'/* CTF 1.8 */')
+        self._write('ros2_0', PACKET)
+        self._write('ros2_1', PACKET)
+        self.converted_file_path = os.path.join(self.test_dir_path, 'converted')
+        open(self.converted_file_path, 'a').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _write(self, file_name: str, content: bytes, mode: str = 'wb') -> str:
+        file_path = os.path.join(self.ust_dir_path, file_name)
+        with open(file_path, mode) as f:
+            f.write(content)
+        return file_path
+
+    def test_compare_file_state(self) -> None:
+        file_path = self._write('ros2_0', PACKET)
+        state = get_file_state(file_path)
+        self.assertEqual(FILE_UNCHANGED, compare_file_state(state, state, file_path))
+
+        self._write('ros2_0', PACKET, mode='ab')
+        new_state = get_file_state(file_path)
+        self.assertEqual(FILE_APPENDED, compare_file_state(state, new_state, file_path))
+
+        self._write('ros2_0', PACKET[:4] + b'\x01' * 100)
+        new_state = get_file_state(file_path)
+        self.assertEqual(FILE_CHANGED, compare_file_state(state, new_state, file_path))
+
+        # Only the start of big files is hashed
+        self._write('ros2_0', bytes(FILE_HASH_SIZE + 1))
+        state = get_file_state(file_path)
+        self.assertEqual(FILE_HASH_SIZE, state['hash_size'])
+        self._write('ros2_0', PACKET, mode='ab')
+        new_state = get_file_state(file_path)
+        self.assertEqual(FILE_APPENDED, compare_file_state(state, new_state, file_path))
+
+    def test_stream_changes(self) -> None:
+        trace_state = get_trace_state(self.test_dir_path)
+        self.assertEqual({os.path.join('ust', 'metadata')}, set(trace_state['metadata'].keys()))
+        self.assertEqual(
+            [os.path.join('ust', 'ros2_0'), os.path.join('ust', 'ros2_1')],
+            list(trace_state['streams'].keys()),
+        )
+        write_manifest(self.converted_file_path, trace_state, 'pickle', 2, True)
+        manifest = read_manifest(self.converted_file_path)
+        self.assertEqual('pickle', manifest['output_format'])
+        self.assertTrue(is_conversion_up_to_date(self.converted_file_path))
+
+        self._write('ros2_0', PACKET, mode='ab')
+        os.remove(os.path.join(self.ust_dir_path, 'ros2_1'))
+        self._write('ros2_2', PACKET)
+        self.assertEqual(
+            {
+                os.path.join('ust', 'ros2_0'): FILE_APPENDED,
+                os.path.join('ust', 'ros2_1'): STREAM_REMOVED,
+                os.path.join('ust', 'ros2_2'): STREAM_NEW,
+            },
+            get_stream_changes(manifest, self.test_dir_path, get_trace_state(self.test_dir_path)),
+        )
+        self.assertFalse(is_conversion_up_to_date(self.converted_file_path))
+
+        # Streams using a metadata file that changed are considered changed
+        self._write('metadata', b'/* CTF 1.8, changed */')
+        changes = get_stream_changes(
+            manifest,
+            self.test_dir_path,
+            get_trace_state(self.test_dir_path),
+        )
+        self.assertEqual(FILE_CHANGED, changes[os.path.join('ust', 'ros2_0')])
+
+    def test_inspect_input_path(self) -> None:
+        # No manifest: converted file is used as is
+        self.assertIsNone(is_conversion_up_to_date(self.converted_file_path))
+        file_path, create_file = _inspect_input_path(self.test_dir_path, quiet=True)
+        self.assertEqual(self.converted_file_path, file_path)
+        self.assertFalse(create_file)
+
+        write_manifest(
+            self.converted_file_path,
+            get_trace_state(self.test_dir_path),
+            'pickle',
+            2,
+            False,
+        )
+        file_path, create_file = _inspect_input_path(self.test_dir_path, quiet=True)
+        self.assertFalse(create_file)
+
+        self._write('ros2_1', PACKET, mode='ab')
+        temp_stdout = StringIO()
+        with contextlib.redirect_stdout(temp_stdout):
+            file_path, create_file = _inspect_input_path(self.test_dir_path)
+        self.assertEqual(self.converted_file_path, file_path)
+        self.assertTrue(create_file)
+        self.assertIn('will update it', temp_stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict
+from typing import List
+from typing import Optional
+import unittest
+
+from pandas import DataFrame
+from pandas import Index
+from pandas.util.testing import assert_frame_equal
+
+from tracetools_analysis.processor import Processor
+from tracetools_analysis.processor.cpu_time import CpuTimeHandler
+from tracetools_analysis.utils.cpu_time import CpuTimeDataModelUtil
+
+
+class TestCpuTimeHandler(unittest.TestCase):
+
+    events: List[Dict]
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    @staticmethod
+    def build_sched_switch(
+        timestamp: int,
+        cpu_id: int,
+        prev_tid: int,
+        next_tid: int,
+    ) -> Dict:
+        return {
+            '_name': 'sched_switch',
+            '_timestamp': timestamp,
+            'cpu_id': cpu_id,
+            'prev_tid': prev_tid,
+            'next_tid': next_tid,
+        }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.events = [
+            cls.build_sched_switch(10, 0, 1, 2),
+            cls.build_sched_switch(12, 1, 3, 4),
+            cls.build_sched_switch(15, 0, 2, 1),
+            cls.build_sched_switch(20, 1, 4, 3),
+            cls.build_sched_switch(21, 0, 1, 2),
+            cls.build_sched_switch(30, 2, 5, 6),
+            cls.build_sched_switch(31, 1, 3, 4),
+            cls.build_sched_switch(40, 0, 2, 1),
+        ]
+
+    def _process(
+        self,
+        batch_size: int,
+        timestamp_begin: Optional[int] = None,
+        use_trace_begin: bool = False,
+    ) -> DataFrame:
+        handler = CpuTimeHandler(
+            timestamp_begin=timestamp_begin,
+            use_trace_begin=use_trace_begin,
+        )
+        processor = Processor(handler, quiet=True, batch_size=batch_size)
+        processor.process(self.events)
+        self.handler = handler
+        return handler.data.times
+
+    def test_times(self) -> None:
+        expected_times = DataFrame(
+            data={
+                'tid': [2, 4, 1, 3, 2],
+                'start_timestamp': [10, 12, 15, 20, 21],
+                'duration': [5, 8, 6, 11, 19],
+                'cpu_id': [0, 1, 0, 1, 0],
+            },
+        )
+        # Same result no matter how events are split into blocks
+        for batch_size in (1, 3, len(self.events)):
+            assert_frame_equal(expected_times, self._process(batch_size))
+
+    def test_times_trace_begin(self) -> None:
+        # The first slice on each CPU starts with the first event
+        expected_times = DataFrame(
+            data={
+                'tid': [1, 3, 2, 4, 1, 5, 3, 2],
+                'start_timestamp': [10, 10, 10, 12, 15, 10, 20, 21],
+                'duration': [0, 2, 5, 8, 6, 20, 11, 19],
+                'cpu_id': [0, 1, 0, 1, 0, 2, 1, 0],
+            },
+        )
+        for batch_size in (1, 3, len(self.events)):
+            assert_frame_equal(
+                expected_times, self._process(batch_size, use_trace_begin=True))
+        # An explicit beginning takes precedence
+        self.assertEqual(
+            [5, 5, 10, 12, 15, 5, 20, 21],
+            self._process(3, timestamp_begin=5, use_trace_begin=True)[
+                'start_timestamp'].tolist(),
+        )
+
+    def test_times_timestamp_begin(self) -> None:
+        expected_times = DataFrame(
+            data={
+                'tid': [1, 3, 2, 4, 1, 5, 3, 2],
+                'start_timestamp': [5, 5, 10, 12, 15, 5, 20, 21],
+                'duration': [5, 7, 5, 8, 6, 25, 11, 19],
+                'cpu_id': [0, 1, 0, 1, 0, 2, 1, 0],
+            },
+        )
+        for batch_size in (1, 3, len(self.events)):
+            assert_frame_equal(expected_times, self._process(batch_size, timestamp_begin=5))
+
+    def test_time_per_thread(self) -> None:
+        self._process(3, timestamp_begin=5)
+        expected_df = DataFrame(
+            data={'duration': [11, 24, 18, 8, 25]},
+            index=Index([1, 2, 3, 4, 5], name='tid'),
+        )
+        assert_frame_equal(expected_df, CpuTimeDataModelUtil(self.handler).get_time_per_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
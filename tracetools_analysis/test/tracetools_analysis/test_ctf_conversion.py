@@ -0,0 +1,177 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Dict
+from typing import List
+import unittest
+from unittest import mock
+
+from tracetools_analysis.conversion import ctf
+from tracetools_analysis.conversion.columnar import ColumnarTrace
+from tracetools_analysis.conversion.ctf import convert
+from tracetools_analysis.conversion.ctf import CrossStreamTieError
+from tracetools_analysis.conversion.ctf import events_to_pickle
+from tracetools_analysis.conversion.ctf import merge_partitions
+from tracetools_analysis.conversion.ctf import OUTPUT_FORMAT_COLUMNAR
+from tracetools_analysis.conversion.ctf import OUTPUT_FORMATS
+from tracetools_analysis.conversion.streams import get_trace_streams
+
+
+_PACKET_MAGIC = b'\xc1\x1f\xfc\xc1'
+
+
+def _get_fake_trace_events(trace_directory: str) -> List[Dict]:
+    # Streams contain pickled events after a packet magic number, and events with the same
+    # timestamp are given in the reverse order of the streams, unlike when merging partitions
+    events = []
+    for _, stream_file_path in get_trace_streams(trace_directory):
+        with open(stream_file_path, 'rb') as f:
+            f.seek(len(_PACKET_MAGIC))
+            events.extend(pickle.load(f))
+    return sorted(events, key=lambda event: (event['_timestamp'], -event['cpu_id']))
+
+
+class TestCtfConversion(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _create_file(self, *path, content: bytes = b'') -> str:
+        file_path = os.path.join(self.test_dir_path, *path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+
+    def test_get_trace_streams(self) -> None:
+        packet = b'\xc1\x1f\xfc\xc1' + bytes(8)
+        kernel_metadata = self._create_file('kernel', 'metadata', content=b'/* CTF 1.8 */')
+        kernel_stream_0 = self._create_file('kernel', 'channel0_0', content=packet)
+        kernel_stream_1 = self._create_file('kernel', 'channel0_1', content=packet)
+        self._create_file('kernel', 'index', 'channel0_0.idx', content=bytes(8))
+        ust_metadata = self._create_file('ust', 'uid', '1000', '64-bit', 'metadata')
+        ust_stream = self._create_file('ust', 'uid', '1000', '64-bit', 'ros2_0', content=packet)
+        # Not streams
+        self._create_file('ust', 'uid', '1000', '64-bit', 'ros2_1')
+        self._create_file('converted', content=packet)
+
+        self.assertEqual(
+            [
+                (kernel_metadata, kernel_stream_0),
+                (kernel_metadata, kernel_stream_1),
+                (ust_metadata, ust_stream),
+            ],
+            get_trace_streams(self.test_dir_path),
+        )
+
+    def test_merge_partitions(self) -> None:
+        timestamps = [
+            [1, 4, 4, 9],
+            [2, 3, 4],
+            [],
+            [0, 10],
+        ]
+        partition_file_paths = []
+        for i, partition_timestamps in enumerate(timestamps):
+            file_path = os.path.join(self.test_dir_path, f'partition_{i}')
+            with open(file_path, 'wb') as f:
+                events_to_pickle(
+                    (
+                        {'_name': f'event_{i}', '_timestamp': timestamp, 'cpu_id': i}
+                        for timestamp in partition_timestamps
+                    ),
+                    pickle.Pickler(f, protocol=4),
+                )
+            partition_file_paths.append(file_path)
+
+        events = list(merge_partitions([partition_file_paths[i] for i in (0, 2, 3)]))
+        self.assertEqual(
+            [0, 1, 4, 4, 9, 10],
+            [event['_timestamp'] for event in events],
+        )
+        self.assertEqual(
+            [3, 0, 0, 0, 0, 3],
+            [event['cpu_id'] for event in events],
+        )
+        # Ties between partitions cannot be ordered like babeltrace does
+        with self.assertRaises(CrossStreamTieError):
+            list(merge_partitions(partition_file_paths))
+
+    def _create_fake_trace(self, name: str, timestamps: List[List[int]]) -> str:
+        self._create_file(name, 'metadata')
+        for i, stream_timestamps in enumerate(timestamps):
+            events = [
+                {'_name': f'event_{j}', '_timestamp': timestamp, 'cpu_id': i, 'index': j}
+                for j, timestamp in enumerate(stream_timestamps)
+            ]
+            self._create_file(
+                name, f'channel0_{i}', content=_PACKET_MAGIC + pickle.dumps(events))
+        return os.path.join(self.test_dir_path, name)
+
+    def _read_converted(self, file_path: str, output_format: str):
+        if output_format == OUTPUT_FORMAT_COLUMNAR:
+            # Archive members have a modification time
+            return list(ColumnarTrace(file_path))
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def test_convert_jobs(self) -> None:
+        traces = {
+            'distinct': [[1, 4, 5, 9], [2, 3, 6], [0, 10]],
+            'ties': [[1, 4, 4, 9], [2, 3, 4], [0, 9]],
+        }
+        with mock.patch.object(ctf, 'get_trace_ctf_events', _get_fake_trace_events), \
+                mock.patch.object(ctf, 'event_to_dict', dict), \
+                mock.patch.object(ctf, 'ProcessPoolExecutor', ThreadPoolExecutor):
+            for (trace_name, timestamps), output_format in itertools.product(
+                traces.items(), OUTPUT_FORMATS,
+            ):
+                trace_directory = self._create_fake_trace(trace_name, timestamps)
+                expected_file_path = os.path.join(self.test_dir_path, f'{trace_name}_sequential')
+                convert(trace_directory, expected_file_path, output_format)
+                expected = self._read_converted(expected_file_path, output_format)
+                # Incremental conversion also merges partitions, even with a single job
+                for jobs, incremental in ((3, False), (1, True), (3, True)):
+                    with self.subTest(
+                        trace=trace_name, format=output_format, jobs=jobs, incremental=incremental,
+                    ):
+                        file_path = os.path.join(
+                            self.test_dir_path, f'{trace_name}_{jobs}_{incremental}')
+                        count = convert(
+                            trace_directory,
+                            file_path,
+                            output_format,
+                            jobs=jobs,
+                            incremental=incremental,
+                        )
+                        self.assertEqual(sum(len(t) for t in timestamps), count)
+                        self.assertEqual(expected, self._read_converted(file_path, output_format))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+from pandas import DataFrame
+from pandas.util.testing import assert_frame_equal
+
+from tracetools_analysis.data_model.cpu_time import CpuTimeDataModel
+from tracetools_analysis.data_model.memory_usage import MemoryUsageDataModel
+from tracetools_analysis.data_model.storage import ColumnStorage
+
+
+class TestColumnStorage(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def test_empty(self) -> None:
+        storage = ColumnStorage({'a': np.int64, 'b': object})
+        self.assertEqual(0, len(storage))
+        df = storage.to_dataframe()
+        self.assertTrue(df.empty)
+        self.assertEqual(['a', 'b'], df.columns.tolist())
+        self.assertEqual(np.int64, df['a'].dtype)
+
+    def test_append_across_chunks(self) -> None:
+        storage = ColumnStorage({'a': np.int64, 'b': object}, chunk_size=3)
+        for i in range(8):
+            storage.append(i, None if i % 2 else str(i))
+        self.assertEqual(8, len(storage))
+        expected_df = DataFrame(
+            data={
+                'a': list(range(8)),
+                'b': ['0', None, '2', None, '4', None, '6', None],
+            },
+        )
+        assert_frame_equal(storage.to_dataframe(), expected_df)
+        np.testing.assert_array_equal(np.arange(8), storage.get_column('a'))
+
+    def test_extend_across_chunks(self) -> None:
+        storage = ColumnStorage({'a': np.int64, 'b': np.float64}, chunk_size=3)
+        storage.append(0, 0.0)
+        storage.extend(np.arange(1, 6), np.arange(1, 6) / 2)
+        storage.extend([], [])
+        storage.extend([6, 7], [3.0, 3.5])
+        self.assertEqual(8, len(storage))
+        np.testing.assert_array_equal(np.arange(8), storage.get_column('a'))
+        np.testing.assert_array_equal(np.arange(8) / 2, storage.get_column('b'))
+
+    def test_data_model_lazy_dataframe(self) -> None:
+        data_model = CpuTimeDataModel()
+        self.assertTrue(data_model.times.empty)
+        data_model.add_duration(1, 10, 5, 0)
+        data_model.add_duration(2, 15, 3, 0)
+        times = data_model.times
+        self.assertEqual([1, 2], times['tid'].tolist())
+        self.assertTrue((times.dtypes == np.int64).all())
+        # Should not be re-created if nothing was added
+        self.assertTrue(times is data_model.times)
+        data_model.add_duration(1, 18, 2, 0)
+        self.assertEqual(3, len(data_model.times))
+
+    def test_memory_differences_out_of_order(self) -> None:
+        data_model = MemoryUsageDataModel()
+        data_model.add_memory_differences(
+            np.array([1, 4]), np.array([1, 1]), np.array([8, 8]), np.array([0, 2]))
+        self.assertEqual([1, 4], data_model.memory_diff['timestamp'].tolist())
+        data_model.add_memory_differences(
+            np.array([2, 6]), np.array([1, 2]), np.array([-8, 4]), np.array([1, 3]))
+        memory_diff = data_model.memory_diff
+        self.assertEqual([1, 2, 4, 6], memory_diff['timestamp'].tolist())
+        self.assertEqual([8, -8, 8, 4], memory_diff['memory_diff'].tolist())
+        self.assertEqual(list(range(4)), memory_diff.index.tolist())
+
+        # Differences with the same timestamp are in trace order
+        data_model = MemoryUsageDataModel()
+        data_model.add_memory_differences(
+            np.array([5, 7]), np.array([1, 1]), np.array([-8, -8]), np.array([1, 3]))
+        data_model.add_memory_differences(
+            np.array([5, 7]), np.array([1, 1]), np.array([8, 8]), np.array([0, 2]))
+        self.assertEqual([8, -8, 8, -8], data_model.memory_diff['memory_diff'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,14 +17,23 @@ from datetime import timezone
 from typing import Dict
 import unittest
 
+import numpy as np
 from pandas import DataFrame
+from pandas import isnull
 from pandas.util.testing import assert_frame_equal
 
 from tracetools_analysis.data_model import DataModel
+from tracetools_analysis.data_model.memory_usage import MemoryUsageDataModel
+from tracetools_analysis.data_model.ros2 import prettify_symbol
+from tracetools_analysis.data_model.ros2 import Ros2DataModel
 from tracetools_analysis.processor import EventHandler
 from tracetools_analysis.processor import EventMetadata
 from tracetools_analysis.processor import HandlerMap
+from tracetools_analysis.processor import Processor
+from tracetools_analysis.processor.memory_usage import KernelMemoryUsageHandler
 from tracetools_analysis.utils import DataModelUtil
+from tracetools_analysis.utils.memory_usage import MemoryUsageDataModelUtil
+from tracetools_analysis.utils.ros2 import Ros2DataModelUtil
 
 
 class TestDataModelUtil(unittest.TestCase):
@@ -75,6 +84,31 @@ class TestDataModelUtil(unittest.TestCase):
         )
         assert_frame_equal(result_df, expected_df, check_dtype=False)
 
+    def test_convert_time_columns_nan(self) -> None:
+        input_df = DataFrame(
+            data={
+                'timestamp': [1565177400000*1000000, np.nan],
+                'some_duration': [np.nan, 3000000],
+            },
+        )
+        result_df = DataModelUtil.convert_time_columns(
+            input_df,
+            'some_duration',
+            'timestamp',
+            inplace=False,
+        )
+        self.assertEqual(datetime(2019, 8, 7, 11, 30, 0), result_df['timestamp'][0])
+        self.assertTrue(isnull(result_df['timestamp'][1]))
+        self.assertTrue(np.isnan(result_df['some_duration'][0]))
+        self.assertEqual(3.0, result_df['some_duration'][1])
+        # Original should not have been modified
+        self.assertEqual(3000000, input_df['some_duration'][1])
+
+        input_df = DataFrame(data={'a': [10, np.nan], 'b': [13, 3]})
+        DataModelUtil.compute_column_difference(input_df, 'b', 'a', 'diff')
+        self.assertEqual(3, input_df['diff'][0])
+        self.assertTrue(np.isnan(input_df['diff'][1]))
+
     def test_compute_column_difference(self) -> None:
         input_df = DataFrame(
             data=[
@@ -146,6 +180,167 @@ class TestDataModelUtil(unittest.TestCase):
         data_model_util_direct = DataModelUtil(handler_data_direct.data)
         self.assertTrue(data_model_util_direct.data is data_model)
 
+    def test_memory_usage(self) -> None:
+        data_model_ust = MemoryUsageDataModel()
+        for timestamp, tid, memory_diff in [
+            (1, 10, 100),
+            (2, 11, 50),
+            (3, 10, 2048),
+            (4, 10, -2148),
+            (5, 11, -50),
+        ]:
+            data_model_ust.add_memory_difference(timestamp, tid, memory_diff)
+        data_model_kernel = MemoryUsageDataModel()
+        data_model_kernel.add_memory_difference(3, 10, 4096)
+        data_model_kernel.add_memory_difference(4, 12, 4096)
+        data_model_util = MemoryUsageDataModelUtil(
+            userspace=data_model_ust,
+            kernel=data_model_kernel,
+        )
+
+        memory_usage_dfs = data_model_util.get_absolute_userspace_memory_usage_by_tid()
+        self.assertEqual({10, 11}, set(memory_usage_dfs.keys()))
+        expected_df = DataFrame(
+            data={
+                'timestamp': [1, 1, 3, 3, 4, 4],
+                'tid': [10] * 6,
+                'memory_usage': [0, 100, 100, 2148, 2148, 0],
+            },
+        )
+        DataModelUtil.convert_time_columns(expected_df, [], ['timestamp'], True)
+        assert_frame_equal(expected_df, memory_usage_dfs[10])
+        self.assertEqual([0, 50, 50, 0], memory_usage_dfs[11]['memory_usage'].tolist())
+
+        expected_df = DataFrame(
+            data=[
+                [10, '2.1 KB', '4.0 KB'],
+                [11, '50.0 B', None],
+            ],
+            columns=['tid', 'max_memory_usage_ust', 'max_memory_usage_kernel'],
+        )
+        assert_frame_equal(expected_df, data_model_util.get_max_memory_usage_per_tid())
+
+    def test_kernel_memory_usage_handler(self) -> None:
+        events = [
+            {'_name': 'kmem_mm_page_alloc', '_timestamp': 1, 'cpu_id': 0, 'tid': 10, 'order': 0},
+            {'_name': 'kmem_mm_page_free', '_timestamp': 1, 'cpu_id': 0, 'tid': 10, 'order': 0},
+            {'_name': 'kmem_mm_page_free', '_timestamp': 2, 'cpu_id': 0, 'tid': 10, 'order': 1},
+            {'_name': 'kmem_mm_page_alloc', '_timestamp': 2, 'cpu_id': 0, 'tid': 10, 'order': 1},
+            # No thread ID
+            {'_name': 'kmem_mm_page_alloc', '_timestamp': 3, 'cpu_id': 0, 'order': 0},
+        ]
+        handler = KernelMemoryUsageHandler()
+        # The block of free events is given first
+        Processor(handler, quiet=True, batch_size=2).process(events)
+        expected_df = DataFrame(
+            data={
+                'timestamp': [1, 1, 2, 2, 3],
+                'tid': [10, 10, 10, 10, MemoryUsageDataModel.UNKNOWN_TID],
+                'memory_diff': [4096, -4096, -8192, 8192, 4096],
+            },
+        )
+        assert_frame_equal(expected_df, handler.data.memory_diff)
+
+    def test_prettify_symbol(self) -> None:
+        symbol = (
+            'std::_Bind<void (Node::*(Node*, std::_Placeholder<1>))'
+            '(std::unique_ptr<Msg, std::default_delete<Msg> >)>'
+        )
+        pretty = 'void (Node::?)(std::unique_ptr<Msg>)'
+        prettify_symbol.cache_clear()
+        self.assertEqual(pretty, prettify_symbol(symbol))
+        # Shared by all instances
+        data_model_util = Ros2DataModelUtil(Ros2DataModel())
+        self.assertEqual(pretty, data_model_util._prettify(symbol))
+        self.assertEqual(1, prettify_symbol.cache_info().hits)
+
+    def test_ros2_lookups(self) -> None:
+        data_model = Ros2DataModel()
+        data_model.add_node(1, 0, 100, 11, 'node', '/')
+        data_model.add_rcl_subscription(2, 0, 1, 12, '/topic', 10)
+        data_model.add_rclcpp_subscription(3, 0, 2)
+        data_model.add_timer(4, 0, 1000000, 100)
+        data_model.add_callback_object(3, 0, 30)
+        data_model.add_callback_object(4, 0, 40)
+        data_model.add_callback_symbol(30, 0, 'void (*)(std::shared_ptr<Msg>)')
+        data_model.add_callback_symbol(40, 0, 'void (*)()')
+        data_model.add_callback_instance(30, 0, 5, False)
+        data_model.add_callback_instance(40, 0, 5, False)
+        data_model.finalize()
+        data_model_util = Ros2DataModelUtil(data_model)
+
+        self.assertEqual(
+            {30: 'void (*)(std::shared_ptr<Msg>)', 40: 'void (*)()'},
+            data_model_util.get_callback_symbols(),
+        )
+        self.assertEqual(40, data_model_util.get_callback_object('void (*)()'))
+        self.assertIsNone(data_model_util.get_callback_object('unknown'))
+        self.assertEqual(
+            ('Subscription', {'node': 'node', 'tid': 100, 'topic': '/topic'}),
+            data_model_util.get_callback_owner_info(30),
+        )
+        self.assertEqual(
+            ('Timer', {'tid': 100, 'period': '1 ms'}),
+            data_model_util.get_callback_owner_info(40),
+        )
+        self.assertIsNone(data_model_util.get_callback_owner_info(50))
+        self.assertIsNone(data_model_util.get_subscription_reference_info(4))
+        self.assertEqual({'node': 'node', 'tid': 100}, data_model_util.get_node_handle_info(1))
+        self.assertIsNone(data_model_util.get_node_handle_info(2))
+
+        stats = data_model_util.get_callback_duration_stats(percentiles=[0.5])
+        self.assertEqual([30, 40], stats.index.tolist())
+        self.assertEqual(
+            ['symbol', 'owner_type', 'owner_info', 'count', 'sum', 'mean', 'std', 'min', 'max',
+             '50%'],
+            stats.columns.tolist(),
+        )
+        self.assertEqual(
+            ['void (*)()', 'Timer', 'tid: 100, period: 1 ms', 1, 5e-06],
+            stats.loc[40, ['symbol', 'owner_type', 'owner_info', 'count', '50%']].tolist(),
+        )
+
+        # Indexes are only rebuilt when the data model changes
+        callback_symbols = data_model_util._get_callback_symbols_index()
+        self.assertTrue(callback_symbols is data_model_util._get_callback_symbols_index())
+        data_model.add_callback_object(5, 0, 50)
+        data_model.add_callback_symbol(50, 0, 'void (*)(int)')
+        data_model.add_callback_instance(50, 0, 5, False)
+        data_model.finalize()
+        self.assertEqual(50, data_model_util.get_callback_object('void (*)(int)'))
+        self.assertIsNone(data_model_util.get_callback_owner_info(50))
+
+    def test_callback_duration_stats(self) -> None:
+        rng = np.random.default_rng(0)
+        data_model = Ros2DataModel()
+        # Callbacks with different numbers of instances, interleaved in time
+        callback_objects = [40] * 7 + [10] + [30] * 2 + [20] * 12
+        rng.shuffle(callback_objects)
+        for timestamp, callback_object in enumerate(callback_objects):
+            duration = int(rng.integers(1000, 5000000)) if timestamp % 5 else 2000
+            data_model.add_callback_instance(callback_object, timestamp, duration, False)
+        data_model.finalize()
+        data_model_util = Ros2DataModelUtil(data_model)
+
+        percentiles = [0, 0.25, 0.5, 0.9, 0.99, 1]
+        stats = data_model_util.get_callback_duration_stats(percentiles=percentiles)
+        callback_instances = data_model.callback_instances.assign(
+            duration=data_model.callback_instances['duration'] / 1000000.0)
+        durations = callback_instances.groupby('callback_object')['duration']
+        expected = DataFrame({
+            'count': durations.count(),
+            'sum': durations.sum(),
+            'mean': durations.mean(),
+            'std': durations.std(),
+            'min': durations.min(),
+            'max': durations.max(),
+        })
+        for percentile in percentiles:
+            expected[f'{percentile * 100:g}%'] = durations.quantile(percentile)
+        self.assertEqual([10, 20, 30, 40], stats.index.tolist())
+        self.assertTrue(isnull(stats.loc[10, 'std']))
+        assert_frame_equal(expected, stats.drop(columns=['symbol', 'owner_type', 'owner_info']))
+
 
 if __name__ == '__main__':
     unittest.main()
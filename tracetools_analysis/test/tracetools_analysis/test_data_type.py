@@ -0,0 +1,151 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from tracetools_analysis.ros_model.data_type import _convolve
+from tracetools_analysis.ros_model.data_type import FFT_CONVOLVE_MIN_SIZE
+from tracetools_analysis.ros_model.data_type import Histogram
+from tracetools_analysis.ros_model.data_type import QuantileSketch
+from tracetools_analysis.ros_model.data_type import Timeseries
+from tracetools_analysis.ros_model.search_tree import Path
+from tracetools_analysis.ros_model.util import Util
+
+
+class TestDataType(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def test_timeseries_sum(self) -> None:
+        child_a = Timeseries(np.array([10, 20, 30]), np.array([1, 4, 7]), np.array([1, 4, 7]))
+        child_b = Timeseries(np.array([1, np.nan, 3]), np.array([2, 5, 6]))
+        timeseries = Timeseries.sum([child_a, child_b])
+        # Starts at the first record of the last child to start
+        self.assertEqual([2, 4, 5, 6, 7], timeseries.time.tolist())
+        np.testing.assert_array_equal(
+            np.array([11, 21, np.nan, 23, 33]),
+            timeseries.raw,
+        )
+        self.assertIsNone(timeseries.clock)
+
+        # The same timeseries can appear more than once
+        timeseries = Timeseries.sum([child_a, child_b, child_a])
+        self.assertEqual([2, 4, 4, 5, 6, 7, 7], timeseries.time.tolist())
+        np.testing.assert_array_equal(
+            np.array([21, 41, 41, np.nan, 43, 63, 63]),
+            timeseries.raw,
+        )
+        self.assertEqual([1, 1, 4, 4, 7, 7], Timeseries.sum([child_a, child_a]).clock.tolist())
+
+    def test_histogram_add(self) -> None:
+        hist_a = Histogram(np.array([0, 1, 0, 1]), binsize_ns=10)
+        hist_b = Histogram(np.array([0, 0, 2]), binsize_ns=10)
+        self.assertEqual(
+            [0, 0, 0, 0.25, 0.25, 0.25, 0.25, 0],
+            (hist_a + hist_b).raw.tolist(),
+        )
+        self.assertEqual(
+            (hist_a + hist_b + hist_a).raw.tolist(),
+            Histogram.sum([hist_a, hist_b, hist_a]).raw.tolist(),
+        )
+
+    def test_timeseries_to_hist(self) -> None:
+        timeseries = Timeseries(np.array([2500, np.nan, 3100, 2650, -5]), np.arange(5))
+        hist = timeseries.to_hist(binsize_ns=100)
+        self.assertEqual(25, hist.offset)
+        np.testing.assert_allclose(np.array([1, 1, 0, 0, 0, 0, 1]) / 3, hist.values)
+        self.assertEqual(33, len(hist.raw))
+        latency_ms, values = hist.get_xy()
+        np.testing.assert_allclose(np.arange(24, 33) * 1e-4, latency_ms)
+        np.testing.assert_allclose(np.array([0, 1, 1, 0, 0, 0, 0, 1, 0]) / 3, values)
+
+        # Only the occupied range is stored
+        timeseries = Timeseries(np.array([1e12, 1e12 + 5]), np.arange(2))
+        hist = timeseries.to_hist(binsize_ns=1)
+        self.assertEqual(int(1e12), hist.offset)
+        self.assertEqual(6, len(hist.values))
+        self.assertEqual(int(2e12), (hist + hist).offset)
+
+    def test_convolve(self) -> None:
+        rng = np.random.default_rng(0)
+        a = rng.random(FFT_CONVOLVE_MIN_SIZE * 2)
+        b = rng.random(FFT_CONVOLVE_MIN_SIZE)
+        a[rng.random(len(a)) < 0.5] = 0
+        b[:-10] = 0
+        b[:10] = 1e-200
+        expected = np.convolve(a, b)
+        result = _convolve(a, b)
+        np.testing.assert_allclose(expected, result, atol=1e-12)
+        # Same bins as the direct convolution, even when below rounding errors
+        np.testing.assert_array_equal(expected > 0, result > 0)
+
+    def test_quantile_sketch(self) -> None:
+        rng = np.random.default_rng(0)
+        values = np.concatenate((rng.lognormal(13, 1, 10000), -rng.lognormal(10, 1, 100), [0]))
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        sketch.add(values[:5000])
+        other = QuantileSketch(relative_accuracy=0.01)
+        other.add(values[5000:])
+        merged = QuantileSketch.sum([sketch, other])
+
+        self.assertEqual(len(values), merged.count)
+        self.assertEqual(np.min(values), merged.get_quantile(0))
+        self.assertEqual(np.max(values), merged.get_quantile(1))
+        self.assertAlmostEqual(np.mean(values), merged.mean)
+        for quantile in (0.005, 0.0101, 0.5, 0.9, 0.99, 0.999):
+            expected = np.quantile(values, quantile, method='lower')
+            self.assertLessEqual(
+                abs(merged.get_quantile(quantile) - expected), abs(expected) * 0.01)
+        self.assertTrue(np.isnan(QuantileSketch().get_quantile(0.5)))
+
+        timeseries = Timeseries(np.array([1e6, np.nan, 3e6, 2e6]), np.arange(4))
+        self.assertEqual(3, timeseries.sketch.count)
+        stats = Util.get_stats_from_timeseries(timeseries, use_sketch=True)
+        self.assertEqual(
+            ['min', 'max', 'median', 'mean', 'p50', 'p90', 'p99', 'p99.9'],
+            list(stats.keys()),
+        )
+        self.assertEqual(Util.get_stats_from_timeseries(timeseries), {
+            'min': 1.0, 'max': 3.0, 'median': 2.0, 'mean': 2.0,
+        })
+        self.assertAlmostEqual(2.0, stats['median'], delta=0.02)
+        self.assertEqual(3.0, stats['max'])
+
+    def test_path_cache(self) -> None:
+        child_a = Path()
+        child_b = Path()
+        child_a.timeseries = Timeseries(np.array([10, 20]), np.array([1, 3]))
+        child_b.timeseries = Timeseries(np.array([1, 2]), np.array([2, 4]))
+        path = Path([child_a, child_b])
+
+        timeseries = path.timeseries
+        self.assertEqual([11, 21, 22], timeseries.raw.tolist())
+        self.assertTrue(timeseries is path.timeseries)
+        hist = path.hist(binsize_ns=10)
+        self.assertTrue(hist is path.hist(binsize_ns=10))
+        self.assertFalse(hist is path.hist(binsize_ns=1))
+
+        # Setting the timeseries of a child invalidates them
+        child_b.timeseries = Timeseries(np.array([3, 4]), np.array([2, 4]))
+        self.assertEqual([13, 23, 24], path.timeseries.raw.tolist())
+        self.assertFalse(hist is path.hist(binsize_ns=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
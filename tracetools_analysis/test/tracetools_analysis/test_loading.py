@@ -17,11 +17,19 @@
 import contextlib
 from io import StringIO
 import os
+import pickle
 import shutil
 import tempfile
 import unittest
 
+from tracetools_analysis.conversion.index import EventIndexBuilder
+from tracetools_analysis.conversion.index import get_event_index_file_path
+from tracetools_analysis.conversion.index import load_event_index
 from tracetools_analysis.loading import _inspect_input_path
+from tracetools_analysis.loading import EventList
+from tracetools_analysis.loading import get_event_names
+from tracetools_analysis.loading import iter_events
+from tracetools_analysis.loading import load_file
 
 
 class TestLoading(unittest.TestCase):
@@ -60,6 +68,37 @@ class TestLoading(unittest.TestCase):
         open(self.random_file_path, 'a').close()
         self.assertTrue(os.path.exists(self.random_file_path))
 
+        # Create converted files with events pickled on their own and with a shared memo
+        self.events = [
+            {
+                '_name': 'myeventname' if i % 2 else 'myothereventname',
+                '_timestamp': i,
+                'cpu_id': 0,
+            }
+            for i in range(10)
+        ]
+        self.events_file_path = os.path.join(self.test_dir_path, 'events')
+        with open(self.events_file_path, 'wb') as f:
+            p = pickle.Pickler(f, protocol=4)
+            for event in self.events:
+                p.dump(event)
+                p.clear_memo()
+        # Same events, with an event index
+        self.indexed_events_file_path = os.path.join(self.test_dir_path, 'indexed_events')
+        with open(self.indexed_events_file_path, 'wb') as f:
+            p = pickle.Pickler(f, protocol=4)
+            index = EventIndexBuilder(f)
+            for event in self.events:
+                index.add(event)
+                p.dump(event)
+                p.clear_memo()
+        index.write(self.indexed_events_file_path)
+        self.events_shared_memo_file_path = os.path.join(self.test_dir_path, 'events_shared_memo')
+        with open(self.events_shared_memo_file_path, 'wb') as f:
+            p = pickle.Pickler(f, protocol=4)
+            for event in self.events:
+                p.dump(event)
+
     def tearDown(self):
         shutil.rmtree(self.test_dir_path)
 
@@ -103,3 +142,72 @@ class TestLoading(unittest.TestCase):
         # Shouldn't be any output
         output = temp_stdout.getvalue()
         self.assertEqual(0, len(output), f'was not quiet: "{output}"')
+
+    def test_iter_events(self) -> None:
+        for file_path in (self.events_file_path, self.events_shared_memo_file_path):
+            events = iter_events(file_path, do_convert_if_needed=False)
+            self.assertFalse(isinstance(events, list))
+            self.assertEqual(self.events, list(events))
+            self.assertEqual(self.events, load_file(file_path, do_convert_if_needed=False))
+
+    def test_iter_events_invalid_path(self) -> None:
+        with contextlib.redirect_stderr(StringIO()):
+            with self.assertRaises(RuntimeError):
+                iter_events(self.without_converted_file_dir)
+
+    def test_get_event_names(self) -> None:
+        self.assertEqual(
+            {'myeventname', 'myothereventname'},
+            get_event_names(self.events_file_path, do_convert_if_needed=False),
+        )
+        # Only the files that list the event names are used without reading all events
+        self.assertIsNone(
+            get_event_names(self.events_file_path, do_convert_if_needed=False, scan_events=False))
+        self.assertEqual(
+            {'myeventname', 'myothereventname'},
+            get_event_names(
+                self.indexed_events_file_path, do_convert_if_needed=False, scan_events=False),
+        )
+
+    def test_event_index(self) -> None:
+        index = load_event_index(self.indexed_events_file_path)
+        self.assertIsNotNone(index)
+        self.assertEqual(['myothereventname', 'myeventname'], index.event_names)
+        self.assertEqual(10, len(index))
+        self.assertEqual(5, index.get_count('myeventname'))
+        self.assertEqual(0, index.get_count('someothereventname'))
+        self.assertEqual(1, index.get_first_timestamp('myeventname'))
+        self.assertEqual(9, index.get_last_timestamp('myeventname'))
+        self.assertIsNone(index.get_first_timestamp('someothereventname'))
+        self.assertEqual(10, len(index.get_offsets(['myeventname', 'myothereventname'])))
+        self.assertIsNone(load_event_index(self.events_file_path))
+
+        events = load_file(self.indexed_events_file_path, do_convert_if_needed=False)
+        self.assertIsInstance(events, EventList)
+        self.assertEqual(self.events, events)
+        self.assertEqual({'myeventname', 'myothereventname'}, events.event_names)
+        self.assertEqual(
+            {'myeventname', 'myothereventname'},
+            get_event_names(self.indexed_events_file_path, do_convert_if_needed=False),
+        )
+
+    def test_event_index_stale(self) -> None:
+        # Index of another file
+        shutil.copyfile(
+            get_event_index_file_path(self.indexed_events_file_path),
+            get_event_index_file_path(self.events_shared_memo_file_path),
+        )
+        self.assertIsNone(load_event_index(self.events_shared_memo_file_path))
+        events = load_file(self.events_shared_memo_file_path, do_convert_if_needed=False)
+        self.assertNotIsInstance(events, EventList)
+        self.assertEqual(self.events, events)
+
+    def test_iter_events_event_names(self) -> None:
+        expected_events = [event for event in self.events if event['_name'] == 'myeventname']
+        for file_path in (self.events_file_path, self.indexed_events_file_path):
+            events = iter_events(
+                file_path,
+                do_convert_if_needed=False,
+                event_names=['myeventname', 'someothereventname'],
+            )
+            self.assertEqual(expected_events, list(events))
@@ -0,0 +1,112 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tracetools_analysis.conversion import columnar
+from tracetools_analysis.conversion.columnar import is_columnar_file
+from tracetools_analysis.conversion.mapped import ALIGNMENT
+from tracetools_analysis.conversion.mapped import is_mapped_file
+from tracetools_analysis.conversion.mapped import MappedTrace
+from tracetools_analysis.conversion.mapped import MappedTraceWriter
+from tracetools_analysis.conversion.mapped import MISSING_ID
+from tracetools_analysis.loading import get_event_names
+from tracetools_analysis.loading import load_file
+
+
+class TestMapped(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.events = []
+        for i in range(10):
+            if i % 2:
+                event = {
+                    '_name': 'ros2:rcl_subscription_init',
+                    '_timestamp': 100 + i,
+                    'cpu_id': i % 3,
+                    'vtid': 200 + i,
+                    'subscription_handle': 0xfffffffffffff000 + i,
+                    'topic_name': f'/topic_{i}',
+                    'gid': [i, i],
+                }
+            else:
+                event = {
+                    '_name': 'sched_switch',
+                    '_timestamp': 100 + i,
+                    'cpu_id': i % 3,
+                    'prev_tid': i,
+                }
+            self.events.append(event)
+        self.file_path = os.path.join(self.test_dir_path, 'converted')
+        writer = MappedTraceWriter()
+        for event in self.events:
+            writer.add(event)
+        self.assertEqual(len(self.events), writer.write(self.file_path))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def test_round_trip(self) -> None:
+        self.assertTrue(is_mapped_file(self.file_path))
+        self.assertFalse(is_columnar_file(self.file_path))
+        trace = MappedTrace(self.file_path)
+        self.assertEqual(self.events, list(trace))
+        with mock.patch.object(columnar, 'ITER_CHUNK_SIZE', 3):
+            self.assertEqual(self.events, list(trace))
+        self.assertEqual(self.events[1], trace[1])
+        self.assertEqual(self.events[-1], trace[-1])
+
+    def test_views(self) -> None:
+        trace = MappedTrace(self.file_path)
+        self.assertEqual(list(range(100, 110)), trace.timestamps.tolist())
+        self.assertEqual([i % 3 for i in range(10)], trace.cpu_ids.tolist())
+        self.assertEqual(
+            [200 + i if i % 2 else MISSING_ID for i in range(10)],
+            trace.tids.tolist(),
+        )
+        self.assertEqual([i % 2 for i in range(10)], trace.name_codes.tolist())
+
+        handles = trace.get_column('ros2:rcl_subscription_init', 'subscription_handle')
+        self.assertEqual(np.uint64, handles.dtype)
+        self.assertEqual([0xfffffffffffff000 + i for i in (1, 3, 5, 7, 9)], handles.tolist())
+        # Views over the file, not copies
+        for values in (trace.timestamps, trace.cpu_ids, trace.tids, handles):
+            self.assertFalse(values.flags.writeable)
+            self.assertFalse(values.flags.owndata)
+            self.assertEqual(0, values.__array_interface__['data'][0] % ALIGNMENT)
+
+    def test_loading(self) -> None:
+        events = load_file(self.file_path, do_convert_if_needed=False)
+        self.assertIsInstance(events, MappedTrace)
+        self.assertEqual(self.events, list(events))
+        self.assertEqual(
+            {'ros2:rcl_subscription_init', 'sched_switch'},
+            get_event_names(self.file_path, do_convert_if_needed=False),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
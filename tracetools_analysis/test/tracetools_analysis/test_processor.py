@@ -14,10 +14,21 @@
 
 import contextlib
 from io import StringIO
+import os
+import shutil
+import tempfile
 from typing import Dict
+from typing import List
 from typing import Set
 import unittest
 
+import numpy as np
+
+from tracetools_analysis.conversion.columnar import ColumnarTrace
+from tracetools_analysis.conversion.columnar import write_columnar
+from tracetools_analysis.processor import BatchDispatchPlan
+from tracetools_analysis.processor import BatchHandlerMap
+from tracetools_analysis.processor import EventBlock
 from tracetools_analysis.processor import EventHandler
 from tracetools_analysis.processor import EventMetadata
 from tracetools_analysis.processor import HandlerMap
@@ -54,6 +65,46 @@ class StubHandler2(EventHandler):
         self.handler_called = True
 
 
+class MetadataHandler(EventHandler):
+
+    def __init__(self) -> None:
+        handler_map: HandlerMap = {
+            'myeventname': self._handler_whatever,
+        }
+        super().__init__(handler_map=handler_map)
+        self.metadata: List[EventMetadata] = []
+
+    def _handler_whatever(
+        self, event: Dict, metadata: EventMetadata
+    ) -> None:
+        self.metadata.append(metadata)
+
+
+class MetadataHandler2(MetadataHandler):
+    pass
+
+
+class NoMetadataReferenceHandler(EventHandler):
+
+    def __init__(self) -> None:
+        handler_map: HandlerMap = {
+            'myeventname': self._handler_whatever,
+        }
+        super().__init__(handler_map=handler_map)
+        self.metadata_ids: List[int] = []
+        self.timestamps: List[int] = []
+
+    @staticmethod
+    def keeps_metadata() -> bool:
+        return False
+
+    def _handler_whatever(
+        self, event: Dict, metadata: EventMetadata
+    ) -> None:
+        self.metadata_ids.append(id(metadata))
+        self.timestamps.append(metadata.timestamp)
+
+
 class WrongHandler(EventHandler):
 
     def __init__(self) -> None:
@@ -109,6 +160,31 @@ class EventHandlerWithRequiredEvent(EventHandler):
         pass
 
 
+class BatchHandler(EventHandler):
+
+    def __init__(self) -> None:
+        handler_map: HandlerMap = {
+            'myeventname': self._handler_whatever,
+        }
+        batch_handler_map: BatchHandlerMap = {
+            'myeventname': self._handler_block,
+            'myothereventname': self._handler_block,
+        }
+        super().__init__(handler_map=handler_map, batch_handler_map=batch_handler_map)
+        self.handled_events: List[Dict] = []
+        self.blocks: List[EventBlock] = []
+
+    def _handler_whatever(
+        self, event: Dict, metadata: EventMetadata
+    ) -> None:
+        self.handled_events.append(event)
+
+    def _handler_block(
+        self, block: EventBlock
+    ) -> None:
+        self.blocks.append(block)
+
+
 class TestProcessor(unittest.TestCase):
 
     def __init__(self, *args) -> None:
@@ -145,6 +221,89 @@ class TestProcessor(unittest.TestCase):
         self.assertTrue(handler1.handler_called, 'event handler not called')
         self.assertTrue(handler2.handler_called, 'event handler not called')
 
+    def test_dispatch_plan(self) -> None:
+        handler1 = MetadataHandler()
+        handler2 = MetadataHandler2()
+        mock_events = [
+            {
+                '_name': 'myeventname',
+                '_timestamp': 1,
+                'cpu_id': 2,
+                'procname': 'myprocname',
+                'vpid': 3,
+                'pid': 4,
+                'vtid': 5,
+                'tid': 6,
+            },
+            {
+                '_name': 'myeventname',
+                '_timestamp': 7,
+                'cpu_id': 0,
+                'vpid': 8,
+                'pid': 9,
+                'vtid': 10,
+                'tid': 11,
+            },
+            {
+                '_name': 'unhandledeventname',
+                '_timestamp': 12,
+                'cpu_id': 0,
+            },
+        ]
+        processor = Processor(handler1, handler2, quiet=True)
+        processor.process(mock_events)
+        self.assertEqual(2, len(handler1.metadata))
+        # The same metadata object should be given to all handlers
+        self.assertTrue(handler1.metadata[0] is handler2.metadata[0])
+        metadata = handler1.metadata[0]
+        self.assertEqual('myeventname', metadata.event_name)
+        self.assertEqual(1, metadata.timestamp)
+        self.assertEqual(2, metadata.cpu_id)
+        self.assertEqual('myprocname', metadata.procname)
+        self.assertEqual(3, metadata.pid)
+        self.assertEqual(5, metadata.tid)
+        metadata = handler1.metadata[1]
+        self.assertIsNone(metadata.procname)
+        self.assertEqual(8, metadata.pid)
+        self.assertEqual(10, metadata.tid)
+
+    def test_dispatch_plan_fallback_fields(self) -> None:
+        handler = MetadataHandler()
+        mock_event = {
+            '_name': 'myeventname',
+            '_timestamp': 1,
+            'cpu_id': 2,
+            'pid': 4,
+            'tid': 6,
+        }
+        processor = Processor(handler, quiet=True)
+        processor.process([mock_event])
+        metadata = handler.metadata[0]
+        self.assertEqual(4, metadata.pid)
+        self.assertEqual(6, metadata.tid)
+
+    def test_metadata_reuse(self) -> None:
+        mock_events = [
+            {
+                '_name': 'myeventname',
+                '_timestamp': timestamp,
+                'cpu_id': 0,
+            }
+            for timestamp in range(3)
+        ]
+        # The same metadata object should be updated for every event
+        handler = NoMetadataReferenceHandler()
+        Processor(handler, quiet=True).process(mock_events)
+        self.assertEqual([0, 1, 2], handler.timestamps)
+        self.assertEqual(1, len(set(handler.metadata_ids)))
+
+        # Unless another handler for the same event might keep a reference to it
+        handler = NoMetadataReferenceHandler()
+        other_handler = MetadataHandler()
+        Processor(handler, other_handler, quiet=True).process(mock_events)
+        self.assertEqual([0, 1, 2], handler.timestamps)
+        self.assertEqual([0, 1, 2], [metadata.timestamp for metadata in other_handler.metadata])
+
     def test_assert_handler_functions_for_required_events(self) -> None:
         with self.assertRaises(AssertionError):
             MissingEventHandler()
@@ -167,6 +326,137 @@ class TestProcessor(unittest.TestCase):
         # Passes check
         Processor(EventHandlerWithRequiredEvent()).process([required_mock_event, mock_event])
 
+    def test_check_required_events_iterable(self) -> None:
+        mock_event = {
+            '_name': 'myeventname',
+            '_timestamp': 0,
+            'cpu_id': 0,
+        }
+        required_mock_event = {
+            '_name': 'myrequiredevent',
+            '_timestamp': 69,
+            'cpu_id': 0,
+        }
+        # Fails check after processing
+        with self.assertRaises(Processor.RequiredEventNotFoundError):
+            Processor(EventHandlerWithRequiredEvent(), quiet=True).process(
+                event for event in [mock_event]
+            )
+        # Fails check before processing with the given event names
+        with self.assertRaises(Processor.RequiredEventNotFoundError):
+            Processor(EventHandlerWithRequiredEvent(), quiet=True).process(
+                iter([required_mock_event]),
+                event_names={'myeventname'},
+            )
+        # Passes check
+        Processor(EventHandlerWithRequiredEvent(), quiet=True).process(
+            event for event in [required_mock_event, mock_event]
+        )
+
+    def test_get_event_names(self) -> None:
+        mock_event = {
+            '_name': 'myeventname',
+            '_timestamp': 0,
+            'cpu_id': 0,
+        }
+        self.assertEqual({'myeventname'}, Processor.get_event_names([mock_event]))
+
+        # Names given along with the events are used directly
+        class EventListWithNames(list):
+            event_names = ['myrequiredevent']
+
+        events = EventListWithNames([mock_event])
+        self.assertEqual({'myrequiredevent'}, Processor.get_event_names(events))
+
+    def test_batch_handler(self) -> None:
+        events = [
+            {
+                '_name': 'myothereventname' if i % 3 == 0 else 'myeventname',
+                '_timestamp': i,
+                'cpu_id': i % 2,
+                'vtid': 10 + i,
+                'value': i * 2,
+            }
+            for i in range(10)
+        ]
+        handler = BatchHandler()
+        processor = Processor(handler, quiet=True, batch_size=4)
+        processor.process(events)
+        self.assertIsInstance(processor._dispatch_plans['myeventname'], BatchDispatchPlan)
+
+        # Normal handler functions are still called for every event
+        self.assertEqual(
+            [event for event in events if event['_name'] == 'myeventname'],
+            handler.handled_events,
+        )
+        # Blocks are given when full, and remaining events when processing is done
+        self.assertEqual(
+            [('myeventname', 4), ('myothereventname', 4), ('myeventname', 2)],
+            [(block.event_name, len(block)) for block in handler.blocks],
+        )
+        block = handler.blocks[0]
+        self.assertEqual('myeventname', block.event_name)
+        self.assertEqual([1, 2, 4, 5], block.timestamp.tolist())
+        self.assertEqual([1, 0, 0, 1], block.cpu_id.tolist())
+        self.assertEqual([11, 12, 14, 15], block.tid.tolist())
+        self.assertIsNone(block.pid)
+        self.assertEqual([2, 4, 8, 10], block.get_field('value').tolist())
+        self.assertEqual([1, 2, 4, 5], block.index.tolist())
+        self.assertEqual([0, 3, 6, 9], handler.blocks[1].index.tolist())
+        # Arrays are only created once
+        self.assertTrue(block.get_field('value') is block.get_field('value'))
+        with self.assertRaises(AttributeError):
+            block.get_field('missing')
+
+    def test_batch_handler_columnar(self) -> None:
+        events = [
+            {
+                '_name': 'myothereventname' if i % 3 == 0 else 'myeventname',
+                '_timestamp': i,
+                'cpu_id': i % 2,
+                'vtid': 10 + i,
+                'value': i * 2,
+            }
+            for i in range(10)
+        ]
+        # Field that only some events have
+        events[1]['other_value'] = 1
+        test_dir_path = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(test_dir_path, 'converted')
+            write_columnar(events, file_path)
+            trace = ColumnarTrace(file_path)
+            handler = BatchHandler()
+            Processor(handler, quiet=True, batch_size=4).process(trace)
+        finally:
+            shutil.rmtree(test_dir_path)
+
+        # Normal handler functions still get the events
+        self.assertEqual(
+            [event for event in events if event['_name'] == 'myeventname'],
+            handler.handled_events,
+        )
+        # Blocks are created from the columns of the trace
+        self.assertEqual(
+            [('myeventname', 4), ('myothereventname', 4), ('myeventname', 2)],
+            [(block.event_name, len(block)) for block in handler.blocks],
+        )
+        block = handler.blocks[0]
+        self.assertTrue(
+            np.shares_memory(block.timestamp, trace.get_column('myeventname', '_timestamp')))
+        self.assertEqual([1, 2, 4, 5], block.timestamp.tolist())
+        self.assertEqual([1, 0, 0, 1], block.cpu_id.tolist())
+        self.assertEqual([11, 12, 14, 15], block.tid.tolist())
+        self.assertIsNone(block.pid)
+        self.assertEqual([2, 4, 8, 10], block.get_field('value').tolist())
+        self.assertEqual([1, 2, 4, 5], block.index.tolist())
+        self.assertEqual([7, 8], handler.blocks[2].get_field('_timestamp').tolist())
+        self.assertEqual([7, 8], handler.blocks[2].index.tolist())
+        with self.assertRaises(AttributeError):
+            block.get_field('other_value')
+        with self.assertRaises(AttributeError):
+            block.get_field('missing')
+
     def test_get_handler_by_type(self) -> None:
         handler1 = StubHandler1()
         handler2 = StubHandler2()
@@ -174,6 +464,21 @@ class TestProcessor(unittest.TestCase):
         result = processor.get_handler_by_type(StubHandler1)
         self.assertTrue(result is handler1)
 
+    def test_process_iterable(self) -> None:
+        handler1 = StubHandler1()
+        mock_event = {
+            '_name': 'myeventname',
+            '_timestamp': 0,
+            'cpu_id': 0,
+        }
+        temp_stdout = StringIO()
+        with contextlib.redirect_stdout(temp_stdout):
+            processor = Processor(handler1)
+            processor.process(event for event in [mock_event])
+        self.assertTrue(handler1.handler_called, 'event handler not called')
+        # Should still display progress, but without the total
+        self.assertIn('[1] [StubHandler1]', temp_stdout.getvalue())
+
     def test_processor_quiet(self) -> None:
         handler1 = StubHandler1()
         mock_event = {
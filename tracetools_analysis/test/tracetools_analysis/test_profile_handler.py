@@ -287,7 +287,7 @@ class TestProfileHandler(unittest.TestCase):
     @staticmethod
     def build_expected_df(expected_data: List[Dict[str, Any]]) -> DataFrame:
         # Make sure the columns are in the same order
-        expected_df = DataFrame(columns=[
+        return DataFrame(expected_data, columns=[
             'tid',
             'depth',
             'function_name',
@@ -296,7 +296,6 @@ class TestProfileHandler(unittest.TestCase):
             'duration',
             'actual_duration',
         ])
-        return expected_df.append(expected_data, ignore_index=True)
 
     @staticmethod
     def transform_fake_fields(events: List[DictEvent]) -> None:
@@ -0,0 +1,185 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+from typing import Dict
+from typing import List
+import unittest
+
+from pandas import DataFrame
+from pandas.util.testing import assert_frame_equal
+
+from tracetools_analysis.processor import Processor
+from tracetools_analysis.processor.ros2 import Ros2Handler
+
+
+input_events: List[Dict[str, Any]] = [
+    {
+        '_name': 'ros2:rcl_init',
+        '_timestamp': 1,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'context_handle': 0xC0,
+        'version': '1.0.0',
+    },
+    {
+        '_name': 'ros2:rcl_node_init',
+        '_timestamp': 2,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'node_handle': 0xA0,
+        'rmw_handle': 0xA1,
+        'node_name': 'my_node',
+        'namespace': '/',
+    },
+    {
+        '_name': 'ros2:rcl_timer_init',
+        '_timestamp': 3,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'timer_handle': 0xB0,
+        'period': 1000,
+    },
+    # Re-initialized timer, which should overwrite the previous one
+    {
+        '_name': 'ros2:rcl_timer_init',
+        '_timestamp': 4,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'timer_handle': 0xB0,
+        'period': 2000,
+    },
+    {
+        '_name': 'ros2:rclcpp_timer_callback_added',
+        '_timestamp': 5,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'timer_handle': 0xB0,
+        'callback': 0xD0,
+    },
+    {
+        '_name': 'ros2:rclcpp_callback_register',
+        '_timestamp': 6,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'callback': 0xD0,
+        'symbol': 'void (*)()',
+    },
+    {
+        '_name': 'ros2:callback_start',
+        '_timestamp': 10,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'callback': 0xD0,
+        'is_intra_process': 0,
+    },
+    {
+        '_name': 'ros2:callback_end',
+        '_timestamp': 15,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'callback': 0xD0,
+    },
+    {
+        '_name': 'ros2:callback_start',
+        '_timestamp': 20,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'callback': 0xD0,
+        'is_intra_process': 1,
+    },
+    {
+        '_name': 'ros2:callback_end',
+        '_timestamp': 27,
+        'cpu_id': 0,
+        'vpid': 10,
+        'vtid': 10,
+        'callback': 0xD0,
+    },
+]
+
+
+class TestRos2Handler(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.handler = Ros2Handler()
+        cls.processor = Processor(cls.handler, quiet=True)
+        cls.processor.process(input_events)
+
+    def test_objects(self) -> None:
+        data = self.__class__.handler.data  # type: ignore
+        self.assertEqual(['context_handle'], data.contexts.index.names)
+        self.assertEqual([0xC0], data.contexts.index.tolist())
+        self.assertEqual([1, 10, '1.0.0'], data.contexts.loc[0xC0].tolist())
+        self.assertEqual(['my_node'], data.nodes['name'].tolist())
+        # The last timer init should have overwritten the first one
+        self.assertEqual([0xB0], data.timers.index.tolist())
+        self.assertEqual([4, 2000, 10], data.timers.loc[0xB0].tolist())
+        self.assertEqual(0xD0, data.callback_objects.loc[0xB0, 'callback_object'])
+        self.assertEqual('void (*)()', data.callback_symbols.loc[0xD0, 'symbol'])
+        self.assertEqual('void (*)()', data.callback_symbols.loc[0xD0, 'symbol_pretty'])
+        # Objects without any event should still have their columns
+        self.assertTrue(data.publishers.empty)
+        self.assertEqual(['publisher_handle'], data.publishers.index.names)
+        self.assertEqual(
+            ['timestamp', 'node_handle', 'rmw_handle', 'topic_name', 'depth'],
+            data.publishers.columns.tolist(),
+        )
+
+    def test_callback_instances(self) -> None:
+        expected_df = DataFrame(
+            data=[
+                {
+                    'callback_object': 0xD0,
+                    'timestamp': 10,
+                    'duration': 5,
+                    'intra_process': False,
+                },
+                {
+                    'callback_object': 0xD0,
+                    'timestamp': 20,
+                    'duration': 7,
+                    'intra_process': True,
+                },
+            ],
+        )
+        result_df = self.__class__.handler.data.callback_instances  # type: ignore
+        assert_frame_equal(result_df, expected_df)
+
+    def test_empty_instances(self) -> None:
+        data = self.__class__.handler.data  # type: ignore
+        self.assertTrue(data.lifecycle_transitions.empty)
+        self.assertEqual(
+            ['state_machine_handle', 'start_label', 'goal_label', 'timestamp'],
+            data.lifecycle_transitions.columns.tolist(),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
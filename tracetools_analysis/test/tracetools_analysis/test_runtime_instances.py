@@ -0,0 +1,247 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+from pandas import DataFrame
+
+from tracetools_analysis.processor import AutoProcessor
+from tracetools_analysis.processor import Processor
+from tracetools_analysis.ros_model.application import Application
+from tracetools_analysis.ros_model.instances import RuntimeInstancesHandler
+
+
+class TestRuntimeInstances(unittest.TestCase):
+
+    def __init__(self, *args) -> None:
+        super().__init__(
+            *args,
+        )
+
+    def test_instances(self) -> None:
+        events = [
+            {'_name': 'ros2:rclcpp_publish', '_timestamp': 1, 'publisher_handle': 0xA0},
+            {'_name': 'ros2:callback_start', '_timestamp': 2, 'callback': 0xC0},
+            {
+                '_name': 'ros2:rclcpp_subscribe',
+                '_timestamp': 3,
+                'callback': 0xC0,
+                'source_stamp': 1,
+                'received_stamp': 2,
+            },
+            {'_name': 'ros2:callback_end', '_timestamp': 4, 'callback': 0xC0},
+            {'_name': 'ros2:rclcpp_publish', '_timestamp': 5, 'publisher_handle': 0xA1},
+            {'_name': 'ros2:rcl_init', '_timestamp': 6},
+        ]
+        handler = RuntimeInstancesHandler()
+        Processor(handler, quiet=True).process(events)
+        data = handler.data
+
+        publish_instances = data.publish_instances
+        self.assertEqual(
+            ['timestamp', 'stamp', 'publisher_handle'],
+            publish_instances.columns.tolist(),
+        )
+        self.assertEqual([1, 5], publish_instances['timestamp'].tolist())
+        self.assertEqual([0xA0, 0xA1], publish_instances['publisher_handle'].tolist())
+        self.assertTrue(publish_instances['stamp'].isna().all())
+        self.assertEqual(
+            [[3, 0xC0, 1, 2]],
+            data.subscribe_instances[
+                ['timestamp', 'callback_object', 'source_stamp', 'received_stamp']
+            ].values.tolist(),
+        )
+        self.assertEqual([[2, 0xC0]], data.callback_start_instances.values.tolist())
+        self.assertEqual(
+            ['timestamp', 'callback_in_object'],
+            data.callback_end_instances.columns.tolist(),
+        )
+        self.assertEqual([[4, 0xC0]], data.callback_end_instances.values.tolist())
+
+        # Only used automatically if the trace has the events it handles
+        event_names = {event['_name'] for event in events}
+        self.assertEqual(
+            {RuntimeInstancesHandler},
+            AutoProcessor._get_applicable_event_handler_classes(
+                event_names, {RuntimeInstancesHandler}),
+        )
+        self.assertEqual(
+            set(),
+            AutoProcessor._get_applicable_event_handler_classes(
+                event_names - {'ros2:rclcpp_subscribe'}, {RuntimeInstancesHandler}),
+        )
+
+    def test_sched_instances(self) -> None:
+        events = []
+        for timestamp, name, callback in [
+            (1, 'ros2:callback_end', 0xC0),
+            (2, 'ros2:callback_start', 0xC1),
+            (3, 'ros2:callback_end', 0xC0),
+            (4, 'ros2:callback_end', 0xC0),
+            (5, 'ros2:callback_start', 0xC1),
+            (6, 'ros2:callback_start', 0xC1),
+            (7, 'ros2:callback_end', 0xC1),
+            (7, 'ros2:callback_start', 0xC0),
+            (9, 'ros2:callback_start', 0xC0),
+        ]:
+            events.append({'_name': name, '_timestamp': timestamp, 'callback': callback})
+
+        def sched(callback_in, callback_out):
+            return SimpleNamespace(
+                callback_in=SimpleNamespace(object=callback_in),
+                callback_out=SimpleNamespace(object=callback_out),
+            )
+
+        application = Application()
+        sched_instances = application._get_sched_instances(
+            events, [sched(0xC1, 0xC0), sched(0xC0, 0xC1)])
+        self.assertEqual(
+            ['timestamp', 'callback_in_object', 'callback_out_object', 'duration'],
+            sched_instances.columns.tolist(),
+        )
+        # Only ends directly followed by a start are matched, in the order of the scheds
+        self.assertEqual(
+            [[7, 0xC1, 0xC0, 0], [1, 0xC0, 0xC1, 1], [4, 0xC0, 0xC1, 1]],
+            sched_instances.values.tolist(),
+        )
+
+    def test_comm_instances(self) -> None:
+        events = []
+        for timestamp, publisher_handle in [(1, 0xA0), (3, 0xA1), (5, 0xA0), (6, 0xA1)]:
+            events.append({
+                '_name': 'ros2:rclcpp_publish',
+                '_timestamp': timestamp,
+                'publisher_handle': publisher_handle,
+            })
+        for timestamp, callback, source_stamp, received_stamp in [
+            (2, 0xC0, 1, 2),
+            (4, 0xC1, 3, 3),
+            (7, 0xC0, 5, 6),
+            # Subscription that is not part of any comm
+            (8, 0xC9, 8, 8),
+        ]:
+            events.append({
+                '_name': 'ros2:rclcpp_subscribe',
+                '_timestamp': timestamp,
+                'callback': callback,
+                'source_stamp': source_stamp,
+                'received_stamp': received_stamp,
+            })
+        # The message published by 0xA1 at 6 is lost
+        events.sort(key=lambda event: event['_timestamp'])
+
+        def comm(publish_object, subscribe_object):
+            return SimpleNamespace(
+                topic_name='/topic',
+                get_objects=lambda: {'publish': publish_object, 'subscribe': subscribe_object},
+                child=[SimpleNamespace()],
+            )
+
+        application = Application()
+        application.data_util = SimpleNamespace(
+            get_publish_info=lambda: DataFrame({
+                'publisher_handle': [0xA0, 0xA1, 0xA2],
+                'topic_name': ['/topic'] * 3,
+            }),
+            get_subscribe_info=lambda: DataFrame({
+                'callback_object': [0xC0, 0xC1, 0xC2],
+                'topic_name': ['/topic'] * 3,
+            }),
+        )
+        comms = [
+            comm(0xA1, 0xC1),
+            comm(0xA0, 0xC0),
+            # Publisher that never published
+            comm(0xA2, 0xC0),
+            # Subscription that never received anything
+            comm(0xA1, 0xC2),
+        ]
+        comm_instances = application._get_comm_instances(events, comms)
+        self.assertEqual(
+            [
+                'publish_object',
+                'subscribe_object',
+                'timestamp',
+                'duration',
+                'communication_latency',
+            ],
+            comm_instances.columns.tolist(),
+        )
+        # Same rows as when computing them one comm at a time, in the order of the comms
+        self.assertEqual(
+            [
+                [0xA1, 0xC1, 4, 1, 0],
+                [0xA0, 0xC0, 2, 1, 1],
+                [0xA0, 0xC0, 7, 2, 1],
+            ],
+            comm_instances.values.tolist(),
+        )
+
+        application.comms = comms
+        application._import_comm_instances(comm_instances)
+        self.assertEqual([4], comms[0].timeseries.time.tolist())
+        self.assertEqual([1], comms[0].timeseries.raw.tolist())
+        self.assertEqual([0], comms[0].child[0].timeseries.raw.tolist())
+        self.assertEqual([2, 7], comms[1].timeseries.time.tolist())
+        self.assertEqual([1, 2], comms[1].timeseries.raw.tolist())
+        self.assertEqual([1, 1], comms[1].child[0].timeseries.raw.tolist())
+        for empty_comm in comms[2:]:
+            self.assertEqual(0, len(empty_comm.timeseries.raw))
+            self.assertEqual(0, len(empty_comm.child[0].timeseries.raw))
+
+    def test_import_trace_without_comm_events(self) -> None:
+        metadata = {'cpu_id': 0, 'vpid': 10, 'vtid': 10, 'procname': 'app'}
+        events = [
+            {
+                '_name': 'ros2:rcl_init',
+                '_timestamp': 1,
+                'context_handle': 0x10,
+                'version': '1.0.0',
+                **metadata,
+            },
+            {
+                '_name': 'ros2:callback_start',
+                '_timestamp': 2,
+                'callback': 0xC0,
+                'is_intra_process': 0,
+                **metadata,
+            },
+            {'_name': 'ros2:callback_end', '_timestamp': 5, 'callback': 0xC0, **metadata},
+        ]
+        # Runtime instances are optional, only the events needed by Ros2Handler are required
+        application = Application()
+        with mock.patch(
+            'tracetools_analysis.ros_model.application.load_file', return_value=events,
+        ):
+            application.import_trace('trace')
+        self.assertEqual([], application.comm_instances)
+        self.assertEqual(
+            [[0xC0, 2, 3]],
+            application.data_util.data.callback_instances[
+                ['callback_object', 'timestamp', 'duration']
+            ].values.tolist(),
+        )
+
+        application = Application()
+        with mock.patch(
+            'tracetools_analysis.ros_model.application.load_file', return_value=events[1:],
+        ):
+            with self.assertRaises(Processor.RequiredEventNotFoundError):
+                application.import_trace('trace')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module for the conversion cache manifest.
+
+The manifest is written next to the converted file, which is under the trace directory. It
+records the state of the metadata and stream files of the trace directory at conversion time,
+which allows checking if the converted file is still up to date. For incremental conversions, the
+events of each stream are also kept in a separate partial file under a cache directory, so that
+only new, changed, or appended streams need to be converted again.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from .streams import compare_file_state
+from .streams import FILE_CHANGED
+from .streams import FILE_UNCHANGED
+from .streams import FileState
+from .streams import get_file_state
+from .streams import get_trace_streams
+
+
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_FILE_SUFFIX = '.manifest'
+CACHE_DIRECTORY_SUFFIX = '.cache'
+
+STREAM_NEW = 'new'
+STREAM_REMOVED = 'removed'
+
+Manifest = Dict[str, Any]
+TraceState = Dict[str, Dict[str, FileState]]
+
+
+def get_manifest_file_path(
+    converted_file_path: str,
+) -> str:
+    """Get the path to the manifest file of a converted file."""
+    return converted_file_path + MANIFEST_FILE_SUFFIX
+
+
+def get_cache_directory_path(
+    converted_file_path: str,
+) -> str:
+    """Get the path to the directory containing the partial files of a converted file."""
+    return converted_file_path + CACHE_DIRECTORY_SUFFIX
+
+
+def get_partition_file_name(
+    stream: str,
+) -> str:
+    """
+    Get the name of the partial file of a stream.
+
+    :param stream: the path to the stream file, relative to the trace directory
+    :return: the file name
+    """
+    return hashlib.sha1(stream.encode()).hexdigest()[:16]
+
+
+def get_trace_state(
+    trace_directory: str,
+) -> TraceState:
+    """
+    Get the current state of the metadata and stream files of a trace directory.
+
+    :param trace_directory: the trace directory
+    :return: the (relative path -> file state) maps of metadata files and stream files; the state
+        of a stream file also contains the relative path to its metadata file
+    """
+    metadata: Dict[str, FileState] = {}
+    streams: Dict[str, FileState] = {}
+    for metadata_file_path, stream_file_path in get_trace_streams(trace_directory):
+        metadata_path = os.path.relpath(metadata_file_path, trace_directory)
+        if metadata_path not in metadata:
+            metadata[metadata_path] = get_file_state(metadata_file_path)
+        stream_state = get_file_state(stream_file_path)
+        stream_state['metadata'] = metadata_path
+        streams[os.path.relpath(stream_file_path, trace_directory)] = stream_state
+    return {
+        'metadata': metadata,
+        'streams': streams,
+    }
+
+
+def get_stream_changes(
+    manifest: Manifest,
+    trace_directory: str,
+    trace_state: TraceState,
+) -> Dict[str, str]:
+    """
+    Compare the streams of a trace directory with the streams of a manifest.
+
+    Streams using a metadata file that changed (other than by having data appended to it) are
+    considered changed, since their events might not be decoded the same way.
+
+    :param manifest: the manifest
+    :param trace_directory: the trace directory
+    :param trace_state: the current state of the trace directory
+    :return: the (relative stream path -> change) map, with `STREAM_NEW`, `STREAM_REMOVED`, or a
+        file change (see `compare_file_state`)
+    """
+    metadata_changes = {
+        path: compare_file_state(
+            manifest['metadata'][path],
+            state,
+            os.path.join(trace_directory, path),
+        ) if path in manifest['metadata'] else FILE_CHANGED
+        for path, state in trace_state['metadata'].items()
+    }
+    changes = {}
+    for path, state in trace_state['streams'].items():
+        old_state = manifest['streams'].get(path, None)
+        if old_state is None:
+            changes[path] = STREAM_NEW
+        elif metadata_changes[state['metadata']] == FILE_CHANGED:
+            changes[path] = FILE_CHANGED
+        else:
+            changes[path] = compare_file_state(
+                old_state,
+                state,
+                os.path.join(trace_directory, path),
+            )
+    for path in manifest['streams'].keys():
+        if path not in trace_state['streams']:
+            changes[path] = STREAM_REMOVED
+    return changes
+
+
+def read_manifest(
+    converted_file_path: str,
+) -> Optional[Manifest]:
+    """
+    Read the manifest of a converted file.
+
+    :param converted_file_path: the path to the converted file
+    :return: the manifest, or `None` if there is no (valid) manifest
+    """
+    manifest_file_path = get_manifest_file_path(converted_file_path)
+    if not os.path.isfile(manifest_file_path):
+        return None
+    try:
+        with open(manifest_file_path, 'r') as f:
+            manifest = json.load(f)
+    except ValueError:
+        return None
+    if manifest.get('version', None) != MANIFEST_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(
+    converted_file_path: str,
+    trace_state: TraceState,
+    output_format: str,
+    event_count: int,
+    incremental: bool,
+) -> None:
+    """
+    Write the manifest of a converted file.
+
+    :param converted_file_path: the path to the converted file
+    :param trace_state: the state of the trace directory that was converted
+    :param output_format: the format of the converted file
+    :param event_count: the number of events in the converted file
+    :param incremental: whether the partial files of the streams are in the cache directory
+    """
+    manifest = {
+        'version': MANIFEST_FORMAT_VERSION,
+        'output_format': output_format,
+        'event_count': event_count,
+        'incremental': incremental,
+        'metadata': trace_state['metadata'],
+        'streams': trace_state['streams'],
+    }
+    with open(get_manifest_file_path(converted_file_path), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def remove_manifest(
+    converted_file_path: str,
+) -> None:
+    """Remove the manifest of a converted file, if it exists."""
+    manifest_file_path = get_manifest_file_path(converted_file_path)
+    if os.path.isfile(manifest_file_path):
+        os.remove(manifest_file_path)
+
+
+def is_conversion_up_to_date(
+    converted_file_path: str,
+) -> Optional[bool]:
+    """
+    Check if a converted file is up to date with its trace directory, using its manifest.
+
+    The trace directory is the directory containing the converted file.
+
+    :param converted_file_path: the path to the converted file
+    :return: `True` if it is up to date, `False` if it is not, or `None` if there is no manifest
+    """
+    manifest = read_manifest(converted_file_path)
+    if manifest is None:
+        return None
+    trace_directory = os.path.dirname(os.path.abspath(converted_file_path))
+    changes = get_stream_changes(manifest, trace_directory, get_trace_state(trace_directory))
+    return all(change == FILE_UNCHANGED for change in changes.values())
@@ -0,0 +1,568 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module for the columnar converted trace format.
+
+Events are partitioned by event name, and each partition stores one typed numpy array per field
+(e.g. `_timestamp`, `cpu_id`, `vtid`, and payload fields). All arrays are written to a single
+uncompressed `.npz` file, along with the name of every event in the original order, so that the
+event stream can be rebuilt exactly.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+from tracetools_read import DictEvent
+
+
+COLUMNAR_FORMAT_VERSION = 1
+
+# Magic number of zip files, which is what .npz files are
+_ZIP_MAGIC = b'PK\x03\x04'
+
+_KEY_VERSION = '__version__'
+_KEY_NAMES = '__names__'
+_KEY_NAME_CODES = '__name_codes__'
+_KEY_FIELDS = '__fields__'
+# Suffix for the key of the mask of events which have a value for a field, if not all of them do
+PRESENT_SUFFIX = '__present__'
+_DEFAULT_VALUE_TYPES = (bool, int, float, str)
+# Value of missing fields when reading
+_MISSING = object()
+# Number of events for which values are converted to Python objects at once when iterating
+ITER_CHUNK_SIZE = 65536
+# Number of events with a given name for which values are buffered as Python objects when writing
+WRITE_CHUNK_SIZE = 65536
+
+
+def _partition_key(
+    partition_index: int,
+    name: str,
+) -> str:
+    return f'{partition_index}/{name}'
+
+
+def is_columnar_file(
+    file_path: str,
+) -> bool:
+    """
+    Check if a converted file uses the columnar format.
+
+    :param file_path: the path to the converted file
+    :return: `True` if it is a columnar file, `False` otherwise
+    """
+    with open(file_path, 'rb') as f:
+        return f.read(len(_ZIP_MAGIC)) == _ZIP_MAGIC
+
+
+def _to_array(
+    values: List[Any],
+) -> np.ndarray:
+    """
+    Create a typed array from a list of values.
+
+    Integers are stored as int64, or uint64 if they do not fit (e.g. pointers). Values that cannot
+    be represented with a common numpy dtype (e.g. sequences) are stored in an object array.
+
+    :param values: the values
+    :return: the array
+    """
+    if all(isinstance(value, bool) for value in values):
+        return np.array(values, dtype=np.bool_)
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        for dtype in (np.int64, np.uint64):
+            try:
+                return np.array(values, dtype=dtype)
+            except OverflowError:
+                pass
+    elif all(isinstance(value, (int, float)) for value in values):
+        return np.array(values, dtype=np.float64)
+    elif all(isinstance(value, str) for value in values):
+        return np.array(values, dtype=np.str_)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _field_to_arrays(
+    values: List[Any],
+    present: Optional[List[bool]],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Create the arrays of a field.
+
+    :param values: the values, with `None` for events that do not have a value
+    :param present: whether each event has a value, or `None` if all of them do
+    :return: the array of values, and the mask of the events which have a value, if needed
+    """
+    if present is None:
+        return _to_array(values), None
+    # Replace missing values with the default value of the type of the present values, so that the
+    # array can still be typed
+    value_type = next(
+        (type(value) for value, is_present in zip(values, present) if is_present), None)
+    if value_type in _DEFAULT_VALUE_TYPES:
+        values = [
+            value if is_present else value_type()
+            for value, is_present in zip(values, present)
+        ]
+    return _to_array(values), np.array(present, dtype=np.bool_)
+
+
+class _PartitionBuffer():
+    """
+    Buffer of the field values of the events with a given name.
+
+    Values are converted to typed arrays every `WRITE_CHUNK_SIZE` events, so that they are not kept
+    as Python objects for the whole trace.
+    """
+
+    def __init__(self) -> None:
+        self.size = 0
+        # field name -> values of the current chunk, in the order in which fields were first seen
+        self.fields: Dict[str, List[Any]] = OrderedDict()
+        # field name -> whether each event of the current chunk has a value for that field
+        self.present: Dict[str, List[bool]] = {}
+        self._chunk_size = WRITE_CHUNK_SIZE
+        self._chunk_start = 0
+        # (number of events, field name -> (values, mask)) of the previous chunks
+        self._chunks: List[Tuple[int, Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]]]] = []
+
+    def append(
+        self,
+        event: DictEvent,
+    ) -> None:
+        index = self.size - self._chunk_start
+        for field_name, value in event.items():
+            if field_name == '_name':
+                continue
+            values = self.fields.get(field_name, None)
+            if values is None:
+                # Field was missing from the previous events
+                values = [None] * index
+                self.fields[field_name] = values
+                if index > 0:
+                    self.present[field_name] = [False] * index
+            values.append(value)
+        self.size += 1
+        for field_name, values in self.fields.items():
+            present = self.present.get(field_name, None)
+            if len(values) <= index:
+                # Field is missing from this event
+                values.append(None)
+                if present is None:
+                    present = [True] * index
+                    self.present[field_name] = present
+                present.append(False)
+            elif present is not None:
+                present.append(True)
+        if index + 1 >= self._chunk_size:
+            self._flush_chunk()
+
+    def _flush_chunk(self) -> None:
+        """Convert the values of the current chunk to typed arrays."""
+        chunk_length = self.size - self._chunk_start
+        if chunk_length == 0:
+            return
+        self._chunks.append((
+            chunk_length,
+            {
+                field_name: _field_to_arrays(values, self.present.get(field_name, None))
+                for field_name, values in self.fields.items()
+            },
+        ))
+        self._chunk_start = self.size
+        self.fields = OrderedDict((field_name, []) for field_name in self.fields.keys())
+        self.present = {}
+
+    def _get_field_arrays(
+        self,
+        field_name: str,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Get the arrays of a field for all chunks, typed as if there was a single chunk."""
+        field_chunks = [chunk.get(field_name, None) for _, chunk in self._chunks]
+        if len(field_chunks) == 1:
+            return field_chunks[0]
+        if all(field_chunk is not None for field_chunk in field_chunks):
+            dtypes = {values.dtype for values, _ in field_chunks}
+            has_missing = any(present is not None for _, present in field_chunks)
+            # Strings of different lengths only differ by their dtype; missing object values might
+            # not be the same placeholder as with a single chunk
+            if (
+                (len(dtypes) == 1 or all(dtype.kind == 'U' for dtype in dtypes)) and
+                not (has_missing and dtypes == {np.dtype(object)})
+            ):
+                values = np.concatenate([values for values, _ in field_chunks])
+                if not has_missing:
+                    return values, None
+                return values, np.concatenate([
+                    present if present is not None else np.ones(len(chunk_values), np.bool_)
+                    for chunk_values, present in field_chunks
+                ])
+        # Types differ between chunks, so type all values at once
+        all_values: List[Any] = []
+        all_present: List[bool] = []
+        for (chunk_length, _), field_chunk in zip(self._chunks, field_chunks):
+            if field_chunk is None:
+                all_values.extend([None] * chunk_length)
+                all_present.extend([False] * chunk_length)
+                continue
+            chunk_values, chunk_present = field_chunk
+            if chunk_present is None:
+                all_values.extend(chunk_values.tolist())
+                all_present.extend([True] * chunk_length)
+                continue
+            all_values.extend(
+                value if is_present else None
+                for value, is_present in zip(chunk_values.tolist(), chunk_present.tolist())
+            )
+            all_present.extend(chunk_present.tolist())
+        return _field_to_arrays(all_values, None if all(all_present) else all_present)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        self._flush_chunk()
+        arrays: Dict[str, np.ndarray] = OrderedDict()
+        for field_name in self.fields.keys():
+            values, present = self._get_field_arrays(field_name)
+            if present is not None:
+                arrays[field_name + PRESENT_SUFFIX] = present
+            arrays[field_name] = values
+        return arrays
+
+
+class ColumnarTraceWriter():
+    """Writer for the columnar converted trace format."""
+
+    def __init__(self) -> None:
+        """Create a ColumnarTraceWriter."""
+        self._partitions: Dict[str, _PartitionBuffer] = OrderedDict()
+        self._partition_indices: Dict[str, int] = {}
+        self._name_codes = array('i')
+
+    def __len__(self) -> int:
+        return len(self._name_codes)
+
+    def add(
+        self,
+        event: DictEvent,
+    ) -> None:
+        """
+        Add an event.
+
+        :param event: the event
+        """
+        name = event['_name']
+        partition_index = self._partition_indices.get(name, None)
+        if partition_index is None:
+            partition_index = len(self._partitions)
+            self._partition_indices[name] = partition_index
+            self._partitions[name] = _PartitionBuffer()
+        self._partitions[name].append(event)
+        self._name_codes.append(partition_index)
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        """Get all arrays to write, by key."""
+        arrays: Dict[str, np.ndarray] = {
+            _KEY_VERSION: np.array(COLUMNAR_FORMAT_VERSION, dtype=np.int64),
+            _KEY_NAMES: np.array(list(self._partitions.keys()), dtype=np.str_),
+            _KEY_NAME_CODES: np.frombuffer(self._name_codes, dtype=np.intc).astype(np.int32),
+        }
+        for partition_index, partition in enumerate(self._partitions.values()):
+            partition_arrays = partition.to_arrays()
+            arrays[_partition_key(partition_index, _KEY_FIELDS)] = np.array(
+                list(partition.fields.keys()), dtype=np.str_)
+            for array_name, values in partition_arrays.items():
+                arrays[_partition_key(partition_index, array_name)] = values
+        return arrays
+
+    def write(
+        self,
+        target: Union[str, BinaryIO],
+    ) -> int:
+        """
+        Write all added events.
+
+        :param target: the path to the file, or the file to write to
+        :return: the number of events written
+        """
+        arrays = self._get_arrays()
+        if isinstance(target, str):
+            with open(target, 'wb') as f:
+                np.savez(f, **arrays)
+        else:
+            np.savez(target, **arrays)
+        return len(self._name_codes)
+
+
+class ColumnarTrace(Sequence):
+    """
+    Reader for the columnar converted trace format.
+
+    It can be used like a list of events, which are rebuilt as dicts, in the original order. The
+    typed columns of the events with a given name can also be accessed directly, without creating
+    any event dict.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+    ) -> None:
+        """
+        Open a columnar converted trace file.
+
+        :param file_path: the path to the file
+        """
+        self._arrays = self._load_arrays(file_path)
+        version = int(self._arrays[_KEY_VERSION])
+        if version != COLUMNAR_FORMAT_VERSION:
+            raise RuntimeError(f'unsupported columnar format version: {version}')
+        self._names: List[str] = self._arrays[_KEY_NAMES].tolist()
+        self._name_codes: np.ndarray = self._arrays[_KEY_NAME_CODES]
+        self._fields: List[List[str]] = [
+            self._arrays[_partition_key(i, _KEY_FIELDS)].tolist() for i in range(len(self._names))
+        ]
+        self._columns_cache: Dict[int, Dict[str, np.ndarray]] = {}
+        self._indices_cache: Dict[int, np.ndarray] = {}
+        self._positions: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _load_arrays(
+        file_path: str,
+    ) -> Mapping[str, np.ndarray]:
+        """
+        Load the arrays of a file.
+
+        :param file_path: the path to the file
+        :return: the (key -> array) map, which may load arrays when they are accessed
+        """
+        # Values that could not be typed are stored as objects, which need to be unpickled; like
+        # the pickle format, this is only meant to be used with local, trusted files
+        return np.load(file_path, allow_pickle=True)
+
+    @property
+    def event_names(self) -> List[str]:
+        """Get the names of the events, in order of first appearance."""
+        return list(self._names)
+
+    def get_count(
+        self,
+        event_name: str,
+    ) -> int:
+        """
+        Get the number of events with a given name.
+
+        :param event_name: the event name
+        :return: the number of events
+        """
+        if event_name not in self._names:
+            return 0
+        return int(np.count_nonzero(self._name_codes == self._names.index(event_name)))
+
+    def get_fields(
+        self,
+        event_name: str,
+    ) -> List[str]:
+        """
+        Get the names of the fields of the events with a given name.
+
+        :param event_name: the event name
+        :return: the field names
+        """
+        return list(self._fields[self._names.index(event_name)])
+
+    def get_columns(
+        self,
+        event_name: str,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get all columns of the events with a given name.
+
+        For fields that are not present in all events, the mask of the events that have a value is
+        given as the `<field>__present__` column.
+
+        :param event_name: the event name
+        :return: the (field name -> array) map, or an empty map if there are no such events
+        """
+        if event_name not in self._names:
+            return {}
+        return dict(self._get_partition_columns(self._names.index(event_name)))
+
+    def get_column(
+        self,
+        event_name: str,
+        field_name: str,
+    ) -> np.ndarray:
+        """
+        Get a column of the events with a given name.
+
+        :param event_name: the event name
+        :param field_name: the field name
+        :return: the array of values
+        """
+        return self.get_columns(event_name)[field_name]
+
+    def get_indices(
+        self,
+        event_name: str,
+    ) -> np.ndarray:
+        """
+        Get the index in the trace of each event with a given name.
+
+        :param event_name: the event name
+        :return: the array of indices, in order
+        """
+        if event_name not in self._names:
+            return np.empty(0, dtype=np.int64)
+        partition_index = self._names.index(event_name)
+        indices = self._indices_cache.get(partition_index, None)
+        if indices is None:
+            indices = np.flatnonzero(self._name_codes == partition_index)
+            self._indices_cache[partition_index] = indices
+        return indices
+
+    def _get_partition_columns(
+        self,
+        partition_index: int,
+    ) -> Dict[str, np.ndarray]:
+        columns = self._columns_cache.get(partition_index, None)
+        if columns is None:
+            prefix = f'{partition_index}/'
+            columns = {
+                key[len(prefix):]: self._arrays[key]
+                for key in self._arrays.keys()
+                if key.startswith(prefix) and key != _partition_key(partition_index, _KEY_FIELDS)
+            }
+            self._columns_cache[partition_index] = columns
+        return columns
+
+    def _get_positions(self) -> np.ndarray:
+        """Get the position of each event in its partition."""
+        if self._positions is None:
+            codes = self._name_codes
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes, minlength=len(self._names))
+            starts = np.cumsum(counts) - counts
+            positions = np.empty(len(codes), dtype=np.int64)
+            positions[order] = np.arange(len(codes)) - np.repeat(starts, counts)
+            self._positions = positions
+        return self._positions
+
+    def _get_partition_values(
+        self,
+        partition_index: int,
+        start: int,
+        stop: int,
+    ) -> List[List[Any]]:
+        """Get, for each field, the list of values as Python objects, from `start` to `stop`."""
+        columns = self._get_partition_columns(partition_index)
+        values = []
+        for field_name in self._fields[partition_index]:
+            field_values = columns[field_name][start:stop].tolist()
+            present = columns.get(field_name + PRESENT_SUFFIX, None)
+            if present is not None:
+                field_values = [
+                    value if is_present else _MISSING
+                    for value, is_present in zip(field_values, present[start:stop].tolist())
+                ]
+            values.append(field_values)
+        return values
+
+    def _make_event(
+        self,
+        partition_index: int,
+        position: int,
+        partition_values: List[List[Any]],
+    ) -> DictEvent:
+        event = {'_name': self._names[partition_index]}
+        for field_name, field_values in zip(self._fields[partition_index], partition_values):
+            value = field_values[position]
+            if value is not _MISSING:
+                event[field_name] = value
+        return event
+
+    def __len__(self) -> int:
+        return len(self._name_codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('event index out of range')
+        partition_index = int(self._name_codes[index])
+        position = int(self._get_positions()[index])
+        columns = self._get_partition_columns(partition_index)
+        event = {'_name': self._names[partition_index]}
+        for field_name in self._fields[partition_index]:
+            present = columns.get(field_name + PRESENT_SUFFIX, None)
+            if present is None or present[position]:
+                value = columns[field_name][position]
+                # Convert numpy scalars to Python objects, like when iterating
+                event[field_name] = value.item() if isinstance(value, np.generic) else value
+        return event
+
+    def __iter__(self) -> Iterator[DictEvent]:
+        # Values are only converted to Python objects one chunk of events at a time, so that
+        # memory usage does not depend on the size of the trace
+        positions = self._get_positions()
+        make_event = self._make_event
+        for chunk_start in range(0, len(self._name_codes), ITER_CHUNK_SIZE):
+            chunk_codes = self._name_codes[chunk_start:chunk_start + ITER_CHUNK_SIZE]
+            chunk_positions = positions[chunk_start:chunk_start + ITER_CHUNK_SIZE]
+            # The positions of the events of a partition in a chunk are contiguous
+            starts = {}
+            partitions_values = {}
+            for partition_index in np.unique(chunk_codes).tolist():
+                partition_positions = chunk_positions[chunk_codes == partition_index]
+                start = int(partition_positions[0])
+                starts[partition_index] = start
+                partitions_values[partition_index] = self._get_partition_values(
+                    partition_index, start, int(partition_positions[-1]) + 1)
+            for partition_index, position in zip(chunk_codes.tolist(), chunk_positions.tolist()):
+                yield make_event(
+                    partition_index,
+                    position - starts[partition_index],
+                    partitions_values[partition_index],
+                )
+
+
+def write_columnar(
+    events: Iterable[DictEvent],
+    target: Union[str, BinaryIO],
+) -> int:
+    """
+    Write events to a columnar converted trace file.
+
+    :param events: the events
+    :param target: the path to the file, or the file to write to
+    :return: the number of events written
+    """
+    writer = ColumnarTraceWriter()
+    for event in events:
+        writer.add(event)
+    return writer.write(target)
@@ -12,47 +12,447 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Module with CTF to pickle conversion functions."""
+"""Module with CTF to pickle or columnar conversion functions."""
 
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import itertools
+import os
+import pickle
 from pickle import Pickler
+import shutil
+import tempfile
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
 
+from tracetools_read import DictEvent
 from tracetools_read.trace import event_to_dict
 from tracetools_read.trace import get_trace_ctf_events
 
+from .cache import get_cache_directory_path
+from .cache import get_partition_file_name
+from .cache import get_stream_changes
+from .cache import get_trace_state
+from .cache import Manifest
+from .cache import read_manifest
+from .cache import remove_manifest
+from .cache import STREAM_REMOVED
+from .cache import TraceState
+from .cache import write_manifest
+from .columnar import ColumnarTraceWriter
+from .index import EventIndexBuilder
+from .index import remove_event_index
+from .mapped import MappedTraceWriter
+from .streams import CTF_METADATA_FILE_NAME
+from .streams import FILE_APPENDED
+from .streams import FILE_UNCHANGED
+from .streams import is_packet_start
 
-def ctf_to_pickle(trace_directory: str, target: Pickler) -> int:
+
+OUTPUT_FORMAT_PICKLE = 'pickle'
+OUTPUT_FORMAT_COLUMNAR = 'npz'
+OUTPUT_FORMAT_MAPPED = 'bin'
+OUTPUT_FORMATS = (OUTPUT_FORMAT_PICKLE, OUTPUT_FORMAT_COLUMNAR, OUTPUT_FORMAT_MAPPED)
+
+
+def events_to_pickle(
+    events: Iterable[DictEvent],
+    target: Pickler,
+    index: Optional[EventIndexBuilder] = None,
+) -> int:
+    """
+    Dump events to a pickle file.
+
+    :param events: the events
+    :param target: the target file to write to
+    :param index: the event index builder for the target file, if any
+    :return: the number of events written
+    """
+    count_written = 0
+
+    for event in events:
+        if index is not None:
+            index.add(event)
+        target.dump(event)
+        # Do not let events refer to previous ones, so that they can be loaded one at a time
+        target.clear_memo()
+        count_written += 1
+
+    return count_written
+
+
+def ctf_to_pickle(
+    trace_directory: str,
+    target: Pickler,
+    index: Optional[EventIndexBuilder] = None,
+) -> int:
     """
     Load CTF trace, convert events, and dump to a pickle file.
 
     :param trace_directory: the trace directory
     :param target: the target file to write to
+    :param index: the event index builder for the target file, if any
     :return: the number of events written
     """
     ctf_events = get_trace_ctf_events(trace_directory)
+    return events_to_pickle((event_to_dict(event) for event in ctf_events), target, index)
 
-    count = 0
-    count_written = 0
 
-    for event in ctf_events:
-        count += 1
+def ctf_to_columnar(trace_directory: str, target: ColumnarTraceWriter) -> int:
+    """
+    Load CTF trace, convert events, and add them to a columnar trace writer.
 
-        pod = event_to_dict(event)
-        target.dump(pod)
+    :param trace_directory: the trace directory
+    :param target: the writer to add events to
+    :return: the number of events added
+    """
+    ctf_events = get_trace_ctf_events(trace_directory)
+
+    count_written = 0
+    for event in ctf_events:
+        target.add(event_to_dict(event))
         count_written += 1
 
     return count_written
 
 
-def convert(trace_directory: str, output_file_path: str) -> int:
+def _convert_stream(
+    metadata_file_path: str,
+    stream_file_path: str,
+    output_file_path: str,
+    offset: int = 0,
+) -> int:
     """
-    Convert CTF trace to pickle file.
+    Convert a single CTF stream to a partial pickle file.
 
-    :param trace_directory: the trace directory
+    A trace directory with only the metadata file and the stream file is created, using links.
+    If converting from an offset, the stream data from that offset is copied instead, and the
+    events are appended to the partial file.
+
+    :param metadata_file_path: the path to the metadata file of the trace
+    :param stream_file_path: the path to the stream file
+    :param output_file_path: the path to the partial pickle file
+    :param offset: the byte offset from which to convert the stream, which must be the start of
+        a packet
+    :return: the number of events written
+    """
+    with tempfile.TemporaryDirectory(prefix='tracetools_analysis_stream_') as trace_directory:
+        os.symlink(
+            os.path.abspath(metadata_file_path),
+            os.path.join(trace_directory, CTF_METADATA_FILE_NAME),
+        )
+        trace_stream_file_path = os.path.join(trace_directory, os.path.basename(stream_file_path))
+        if offset == 0:
+            os.symlink(os.path.abspath(stream_file_path), trace_stream_file_path)
+        else:
+            with open(stream_file_path, 'rb') as src, open(trace_stream_file_path, 'wb') as dst:
+                src.seek(offset)
+                shutil.copyfileobj(src, dst)
+        with open(output_file_path, 'ab' if offset else 'wb') as f:
+            return ctf_to_pickle(trace_directory, Pickler(f, protocol=4))
+
+
+def _read_partition(
+    file_path: str,
+) -> Iterator[DictEvent]:
+    with open(file_path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class CrossStreamTieError(RuntimeError):
+    """Error when events from different streams have the same timestamp."""
+
+    pass
+
+
+def merge_partitions(
+    partition_file_paths: List[str],
+) -> Iterator[DictEvent]:
+    """
+    Merge the events of partial pickle files by timestamp.
+
+    The events of each partition must be sorted by timestamp, which is the case for a CTF stream.
+    Events of different partitions with the same timestamp cannot be given in the order in which
+    babeltrace would give them when reading the whole trace, so `CrossStreamTieError` is raised
+    when such events are found, possibly after some events have already been given.
+
+    :param partition_file_paths: the paths to the partial pickle files
+    :return: the merged events
+    """
+    previous_timestamp = None
+    previous_partition = None
+    for partition, event in heapq.merge(
+        *(
+            zip(itertools.repeat(partition), _read_partition(file_path))
+            for partition, file_path in enumerate(partition_file_paths)
+        ),
+        key=lambda item: item[1]['_timestamp'],
+    ):
+        timestamp = event['_timestamp']
+        if timestamp == previous_timestamp and partition != previous_partition:
+            raise CrossStreamTieError(
+                f'events from different streams have the same timestamp: {timestamp}')
+        previous_timestamp = timestamp
+        previous_partition = partition
+        yield event
+
+
+def _convert_streams(
+    tasks: List[Tuple[str, str, str, int]],
+    jobs: int,
+) -> None:
+    """
+    Convert CTF streams to partial pickle files, using a pool of processes if needed.
+
+    :param tasks: the (metadata file path, stream file path, output file path, offset) tuples
+    :param jobs: the number of processes
+    """
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _convert_stream(*task)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Consume results to get exceptions
+        list(executor.map(_convert_stream, *zip(*tasks)))
+
+
+def _write_events(
+    events: Iterable[DictEvent],
+    output_file_path: str,
+    output_format: str,
+) -> int:
+    """
+    Write converted events to a pickle or columnar file.
+
+    :param events: the events
     :param output_file_path: the path to the output file that will be created
+    :param output_format: the format of the output file, see `OUTPUT_FORMATS`
     :return: the number of events written to the output file
     """
+    if output_format in (OUTPUT_FORMAT_COLUMNAR, OUTPUT_FORMAT_MAPPED):
+        if output_format == OUTPUT_FORMAT_COLUMNAR:
+            writer = ColumnarTraceWriter()
+        else:
+            writer = MappedTraceWriter()
+        for event in events:
+            writer.add(event)
+        return writer.write(output_file_path)
+
     with open(output_file_path, 'wb') as f:
         p = Pickler(f, protocol=4)
-        count = ctf_to_pickle(trace_directory, p)
+        index = EventIndexBuilder(f)
+        count = events_to_pickle(events, p, index)
+    index.write(output_file_path)
+
+    return count
+
+
+def _convert_sequential(
+    trace_directory: str,
+    output_file_path: str,
+    output_format: str,
+) -> int:
+    """
+    Convert CTF trace in a single pass.
+
+    :param trace_directory: the trace directory
+    :param output_file_path: the path to the output file that will be created
+    :param output_format: the format of the output file, see `OUTPUT_FORMATS`
+    :return: the number of events written to the output file
+    """
+    ctf_events = get_trace_ctf_events(trace_directory)
+    events = (event_to_dict(event) for event in ctf_events)
+    return _write_events(events, output_file_path, output_format)
+
+
+def _convert(
+    trace_directory: str,
+    output_file_path: str,
+    output_format: str,
+    jobs: int,
+    trace_state: TraceState,
+) -> int:
+    """
+    Convert CTF trace, either sequentially or with one process per stream.
+
+    If events from different streams turn out to have the same timestamp, the trace is converted
+    again sequentially, so that these events are in the same order as with a single job.
+
+    :param trace_directory: the trace directory
+    :param output_file_path: the path to the output file that will be created
+    :param output_format: the format of the output file, see `OUTPUT_FORMATS`
+    :param jobs: the number of processes to use
+    :param trace_state: the current state of the trace directory
+    :return: the number of events written to the output file
+    """
+    streams = trace_state['streams'] if jobs > 1 else {}
+    if len(streams) <= 1:
+        return _convert_sequential(trace_directory, output_file_path, output_format)
+
+    temp_directory = tempfile.mkdtemp(prefix='tracetools_analysis_convert_')
+    try:
+        tasks = [
+            (
+                os.path.join(trace_directory, state['metadata']),
+                os.path.join(trace_directory, stream),
+                os.path.join(temp_directory, str(i)),
+                0,
+            )
+            for i, (stream, state) in enumerate(streams.items())
+        ]
+        _convert_streams(tasks, jobs)
+        return _write_events(
+            merge_partitions([partition_file_path for _, _, partition_file_path, _ in tasks]),
+            output_file_path,
+            output_format,
+        )
+    except CrossStreamTieError:
+        # Only babeltrace knows how to order these events
+        return _convert_sequential(trace_directory, output_file_path, output_format)
+    finally:
+        shutil.rmtree(temp_directory)
+
+
+def _convert_incremental(
+    trace_directory: str,
+    output_file_path: str,
+    output_format: str,
+    jobs: int,
+    manifest: Optional[Manifest],
+    trace_state: TraceState,
+) -> int:
+    """
+    Convert CTF trace using the cache of partial files of a previous conversion.
+
+    Only new and changed streams are converted again, and only the new data of streams that were
+    appended to is converted. The partial files are then merged into the output file.
+
+    :param trace_directory: the trace directory
+    :param output_file_path: the path to the output file that will be created
+    :param output_format: the format of the output file, see `OUTPUT_FORMATS`
+    :param jobs: the number of processes to use
+    :param manifest: the manifest of the previous conversion, or `None` if there was none
+    :param trace_state: the current state of the trace directory
+    :return: the number of events written to the output file
+    """
+    cache_directory = get_cache_directory_path(output_file_path)
+    if (
+        manifest is None or
+        not manifest['incremental'] or
+        not os.path.isdir(cache_directory)
+    ):
+        # Start over
+        manifest = None
+        shutil.rmtree(cache_directory, ignore_errors=True)
+    os.makedirs(cache_directory, exist_ok=True)
+
+    changes = get_stream_changes(manifest, trace_directory, trace_state) if manifest else {}
+    if (
+        manifest is not None and
+        manifest['output_format'] == output_format and
+        os.path.isfile(output_file_path) and
+        all(change == FILE_UNCHANGED for change in changes.values())
+    ):
+        # Nothing to do
+        return manifest['event_count']
+
+    tasks = []
+    for stream, state in trace_state['streams'].items():
+        change = changes.get(stream, None)
+        if change == FILE_UNCHANGED:
+            continue
+        stream_file_path = os.path.join(trace_directory, stream)
+        offset = 0
+        if change == FILE_APPENDED:
+            offset = manifest['streams'][stream]['size']
+            # Should be a packet boundary, unless the file was being written to at that point
+            if not is_packet_start(stream_file_path, offset):
+                offset = 0
+        tasks.append((
+            os.path.join(trace_directory, state['metadata']),
+            stream_file_path,
+            os.path.join(cache_directory, get_partition_file_name(stream)),
+            offset,
+        ))
+    for stream, change in changes.items():
+        if change == STREAM_REMOVED:
+            os.remove(os.path.join(cache_directory, get_partition_file_name(stream)))
+    _convert_streams(tasks, jobs)
+
+    partition_file_paths = [
+        os.path.join(cache_directory, get_partition_file_name(stream))
+        for stream in trace_state['streams'].keys()
+    ]
+    try:
+        return _write_events(
+            merge_partitions(partition_file_paths), output_file_path, output_format)
+    except CrossStreamTieError:
+        # The cache is still valid, but only babeltrace knows how to order these events
+        return _convert_sequential(trace_directory, output_file_path, output_format)
+
+
+def convert(
+    trace_directory: str,
+    output_file_path: str,
+    output_format: str = OUTPUT_FORMAT_PICKLE,
+    jobs: int = 1,
+    incremental: Optional[bool] = None,
+) -> int:
+    """
+    Convert CTF trace to pickle or columnar file.
+
+    An event index file is also written next to pickle files, and a manifest file (see `cache`) is
+    written next to the output file.
+
+    With more than one job, each CTF stream of the trace is converted on its own in a separate
+    process, and the resulting events are merged by timestamp. The output is the same as with a
+    single job: if events from different streams have the same timestamp, which only babeltrace
+    knows how to order, the trace is converted again with a single job.
+
+    With incremental conversion, the events of each stream are kept in a cache directory next to
+    the output file, so that later conversions only convert new or changed data.
+
+    :param trace_directory: the trace directory
+    :param output_file_path: the path to the output file that will be created
+    :param output_format: the format of the output file, see `OUTPUT_FORMATS`
+    :param jobs: the number of processes to use
+    :param incremental: whether to convert incrementally, or `None` to do it only if the previous
+        conversion was incremental
+    :return: the number of events written to the output file
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f'unknown output format: {output_format}')
+    if jobs < 1:
+        raise ValueError(f'invalid number of jobs: {jobs}')
+
+    trace_state = get_trace_state(trace_directory)
+    manifest = read_manifest(output_file_path)
+    if incremental is None:
+        incremental = manifest is not None and manifest['incremental']
+    # Remove the previous manifest first, in case conversion gets interrupted
+    remove_manifest(output_file_path)
+    # Other formats list event names themselves, and the index of a previous file would be stale
+    remove_event_index(output_file_path)
+
+    if incremental:
+        count = _convert_incremental(
+            trace_directory,
+            output_file_path,
+            output_format,
+            jobs,
+            manifest,
+            trace_state,
+        )
+    else:
+        shutil.rmtree(get_cache_directory_path(output_file_path), ignore_errors=True)
+        count = _convert(trace_directory, output_file_path, output_format, jobs, trace_state)
+    write_manifest(output_file_path, trace_state, output_format, count, incremental)
 
     return count
@@ -0,0 +1,253 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module for the event index of converted files.
+
+The index is a small sidecar file written next to the converted file by the converter. For each
+event name, it contains the number of events, the first and last timestamps, and the byte offset
+of each event in the converted file. This allows getting the event names without reading all
+events, and reading only the events with some names.
+"""
+
+from array import array
+import os
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+import numpy as np
+from tracetools_read import DictEvent
+
+
+EVENT_INDEX_FORMAT_VERSION = 1
+EVENT_INDEX_FILE_SUFFIX = '.index'
+
+_KEY_VERSION = 'version'
+_KEY_FILE_SIZE = 'file_size'
+_KEY_FILE_MTIME = 'file_mtime_ns'
+_KEY_NAMES = 'names'
+_KEY_COUNTS = 'counts'
+_KEY_FIRST_TIMESTAMPS = 'first_timestamps'
+_KEY_LAST_TIMESTAMPS = 'last_timestamps'
+_KEY_OFFSETS_PREFIX = 'offsets/'
+
+
+def get_event_index_file_path(
+    converted_file_path: str,
+) -> str:
+    """
+    Get the path to the event index file of a converted file.
+
+    :param converted_file_path: the path to the converted file
+    :return: the path to the event index file
+    """
+    return converted_file_path + EVENT_INDEX_FILE_SUFFIX
+
+
+class EventIndexBuilder():
+    """Builder for the event index of a converted file, as events are being written to it."""
+
+    def __init__(
+        self,
+        target: BinaryIO,
+    ) -> None:
+        """
+        Create an EventIndexBuilder.
+
+        :param target: the converted file to which events are being written
+        """
+        self._target = target
+        self._offsets: Dict[str, array] = {}
+        self._first_timestamps: Dict[str, int] = {}
+        self._last_timestamps: Dict[str, int] = {}
+
+    def add(
+        self,
+        event: DictEvent,
+    ) -> None:
+        """
+        Add an event, right before it is written to the converted file.
+
+        :param event: the event
+        """
+        name = event['_name']
+        timestamp = event['_timestamp']
+        offsets = self._offsets.get(name, None)
+        if offsets is None:
+            offsets = array('q')
+            self._offsets[name] = offsets
+            self._first_timestamps[name] = timestamp
+        offsets.append(self._target.tell())
+        self._last_timestamps[name] = timestamp
+
+    def write(
+        self,
+        converted_file_path: str,
+    ) -> None:
+        """
+        Write the index, after the converted file has been closed.
+
+        :param converted_file_path: the path to the converted file
+        """
+        file_stat = os.stat(converted_file_path)
+        names = list(self._offsets.keys())
+        arrays = {
+            _KEY_VERSION: np.array(EVENT_INDEX_FORMAT_VERSION, dtype=np.int64),
+            _KEY_FILE_SIZE: np.array(file_stat.st_size, dtype=np.int64),
+            _KEY_FILE_MTIME: np.array(file_stat.st_mtime_ns, dtype=np.int64),
+            _KEY_NAMES: np.array(names, dtype=np.str_),
+            _KEY_COUNTS: np.array([len(self._offsets[name]) for name in names], dtype=np.int64),
+            _KEY_FIRST_TIMESTAMPS: np.array(
+                [self._first_timestamps[name] for name in names], dtype=np.int64),
+            _KEY_LAST_TIMESTAMPS: np.array(
+                [self._last_timestamps[name] for name in names], dtype=np.int64),
+        }
+        for i, name in enumerate(names):
+            offsets = np.frombuffer(self._offsets[name], dtype=np.int64)
+            arrays[f'{_KEY_OFFSETS_PREFIX}{i}'] = offsets
+        # Use a file object, otherwise numpy adds a .npz extension
+        with open(get_event_index_file_path(converted_file_path), 'wb') as f:
+            np.savez(f, **arrays)
+
+
+class EventIndex():
+    """Event index of a converted file."""
+
+    def __init__(
+        self,
+        index_file_path: str,
+    ) -> None:
+        """
+        Load an event index file.
+
+        Only the per-name information is loaded; offsets are loaded when they are requested.
+
+        :param index_file_path: the path to the event index file
+        """
+        self._npz = np.load(index_file_path)
+        version = int(self._npz[_KEY_VERSION])
+        if version != EVENT_INDEX_FORMAT_VERSION:
+            raise RuntimeError(f'unsupported event index format version: {version}')
+        self.file_size = int(self._npz[_KEY_FILE_SIZE])
+        self.file_mtime_ns = int(self._npz[_KEY_FILE_MTIME])
+        self._names: List[str] = self._npz[_KEY_NAMES].tolist()
+        self._name_indices = {name: i for i, name in enumerate(self._names)}
+        self._counts: List[int] = self._npz[_KEY_COUNTS].tolist()
+        self._first_timestamps: List[int] = self._npz[_KEY_FIRST_TIMESTAMPS].tolist()
+        self._last_timestamps: List[int] = self._npz[_KEY_LAST_TIMESTAMPS].tolist()
+
+    @property
+    def event_names(self) -> List[str]:
+        """Get the names of the events, in order of first appearance."""
+        return list(self._names)
+
+    def __len__(self) -> int:
+        """Get the total number of events."""
+        return sum(self._counts)
+
+    def __contains__(self, event_name: str) -> bool:
+        return event_name in self._name_indices
+
+    def get_count(
+        self,
+        event_name: str,
+    ) -> int:
+        """
+        Get the number of events with a given name.
+
+        :param event_name: the event name
+        :return: the number of events
+        """
+        index = self._name_indices.get(event_name, None)
+        return 0 if index is None else self._counts[index]
+
+    def get_first_timestamp(
+        self,
+        event_name: str,
+    ) -> Optional[int]:
+        """
+        Get the timestamp of the first event with a given name.
+
+        :param event_name: the event name
+        :return: the timestamp, or `None` if there are no such events
+        """
+        index = self._name_indices.get(event_name, None)
+        return None if index is None else self._first_timestamps[index]
+
+    def get_last_timestamp(
+        self,
+        event_name: str,
+    ) -> Optional[int]:
+        """
+        Get the timestamp of the last event with a given name.
+
+        :param event_name: the event name
+        :return: the timestamp, or `None` if there are no such events
+        """
+        index = self._name_indices.get(event_name, None)
+        return None if index is None else self._last_timestamps[index]
+
+    def get_offsets(
+        self,
+        event_names: Iterable[str],
+    ) -> np.ndarray:
+        """
+        Get the byte offsets of the events with the given names in the converted file.
+
+        :param event_names: the event names
+        :return: the sorted offsets
+        """
+        offsets = [
+            self._npz[f'{_KEY_OFFSETS_PREFIX}{self._name_indices[name]}']
+            for name in set(event_names) if name in self._name_indices
+        ]
+        if not offsets:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(offsets))
+
+
+def load_event_index(
+    converted_file_path: str,
+) -> Optional[EventIndex]:
+    """
+    Load the event index of a converted file, if it exists and is up to date.
+
+    :param converted_file_path: the path to the converted file
+    :return: the event index, or `None` if there is no valid index
+    """
+    index_file_path = get_event_index_file_path(converted_file_path)
+    if not os.path.isfile(index_file_path):
+        return None
+    index = EventIndex(index_file_path)
+    # Ignore the index if the converted file was changed since it was written
+    file_stat = os.stat(converted_file_path)
+    if index.file_size != file_stat.st_size or index.file_mtime_ns != file_stat.st_mtime_ns:
+        return None
+    return index
+
+
+def remove_event_index(
+    converted_file_path: str,
+) -> None:
+    """
+    Remove the event index of a converted file, if it exists.
+
+    :param converted_file_path: the path to the converted file
+    """
+    index_file_path = get_event_index_file_path(converted_file_path)
+    if os.path.isfile(index_file_path):
+        os.remove(index_file_path)
@@ -0,0 +1,225 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module for the memory-mapped converted trace format.
+
+It contains the same typed columns as the columnar format, along with the timestamp, CPU ID, and
+thread ID of every event in the original order. Unlike the .npz file of the columnar format, the
+arrays are written raw at fixed, aligned offsets, so that they can be used as numpy views over a
+read-only memory map of the file. Opening a file does not read any event data, and processes
+using the same file share its pages through the page cache.
+
+Layout, with little-endian integers:
+
+* magic number (8 bytes)
+* offset of the directory (8 bytes)
+* size of the directory (8 bytes)
+* arrays, each aligned to `ALIGNMENT` bytes
+* directory: JSON map of array key to its offset, dtype, and shape; arrays of Python objects,
+  which cannot be mapped, are pickled instead
+"""
+
+from array import array
+import json
+import mmap
+import pickle
+import struct
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import Mapping
+from typing import Union
+
+import numpy as np
+from tracetools_read import DictEvent
+
+from .columnar import ColumnarTrace
+from .columnar import ColumnarTraceWriter
+
+
+MAPPED_MAGIC = b'TTAMAP\x00\x01'
+ALIGNMENT = 64
+
+_HEADER = struct.Struct('<8sQQ')
+
+_KEY_TIMESTAMPS = '__timestamps__'
+_KEY_CPU_IDS = '__cpu_ids__'
+_KEY_TIDS = '__tids__'
+
+# Value for a missing CPU ID or thread ID
+MISSING_ID = -1
+
+
+def is_mapped_file(
+    file_path: str,
+) -> bool:
+    """
+    Check if a converted file uses the memory-mapped format.
+
+    :param file_path: the path to the converted file
+    :return: `True` if it is a memory-mapped file, `False` otherwise
+    """
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAPPED_MAGIC)) == MAPPED_MAGIC
+
+
+class MappedTraceWriter(ColumnarTraceWriter):
+    """Writer for the memory-mapped converted trace format."""
+
+    def __init__(self) -> None:
+        """Create a MappedTraceWriter."""
+        super().__init__()
+        self._timestamps = array('q')
+        self._cpu_ids = array('q')
+        self._tids = array('q')
+
+    def add(
+        self,
+        event: DictEvent,
+    ) -> None:
+        super().add(event)
+        self._timestamps.append(event['_timestamp'])
+        self._cpu_ids.append(event.get('cpu_id', MISSING_ID))
+        self._tids.append(event.get('vtid', event.get('tid', MISSING_ID)))
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._get_arrays()
+        arrays[_KEY_TIMESTAMPS] = np.frombuffer(self._timestamps, dtype=np.int64)
+        arrays[_KEY_CPU_IDS] = np.frombuffer(self._cpu_ids, dtype=np.int64)
+        arrays[_KEY_TIDS] = np.frombuffer(self._tids, dtype=np.int64)
+        return arrays
+
+    def write(
+        self,
+        target: Union[str, BinaryIO],
+    ) -> int:
+        """
+        Write all added events.
+
+        :param target: the path to the file, or the file to write to
+        :return: the number of events written
+        """
+        if isinstance(target, str):
+            with open(target, 'wb') as f:
+                return self.write(f)
+
+        directory: Dict[str, Dict[str, Any]] = {}
+        offset = ALIGNMENT
+        target.write(bytes(offset))
+        for key, values in self._get_arrays().items():
+            if values.dtype.hasobject:
+                data = pickle.dumps(values.tolist(), protocol=4)
+                directory[key] = {'offset': offset, 'size': len(data), 'pickled': True}
+            else:
+                data = np.ascontiguousarray(values).tobytes()
+                directory[key] = {
+                    'offset': offset,
+                    'dtype': values.dtype.str,
+                    'shape': list(values.shape),
+                }
+            padding = -len(data) % ALIGNMENT
+            target.write(data)
+            target.write(bytes(padding))
+            offset += len(data) + padding
+        directory_data = json.dumps(directory).encode()
+        target.write(directory_data)
+        target.seek(0)
+        target.write(_HEADER.pack(MAPPED_MAGIC, offset, len(directory_data)))
+        return len(self)
+
+
+class _MappedArrays(Mapping):
+    """Read-only map of array key to array view over a memory-mapped file."""
+
+    def __init__(
+        self,
+        file_path: str,
+    ) -> None:
+        with open(file_path, 'rb') as f:
+            # The mapping stays valid after the file is closed
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, directory_offset, directory_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAPPED_MAGIC:
+            raise RuntimeError(f'not a memory-mapped converted file: {file_path}')
+        self._directory = json.loads(
+            self._mmap[directory_offset:directory_offset + directory_size].decode())
+        self._unpickled: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        entry = self._directory[key]
+        if entry.get('pickled', False):
+            values = self._unpickled.get(key, None)
+            if values is None:
+                offset = entry['offset']
+                # Same as the columnar format: only meant to be used with local, trusted files
+                values_list = pickle.loads(self._mmap[offset:offset + entry['size']])
+                values = np.empty(len(values_list), dtype=object)
+                values[:] = values_list
+                self._unpickled[key] = values
+            return values
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        count = int(np.prod(shape))
+        if count == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.frombuffer(
+            self._mmap,
+            dtype=dtype,
+            count=count,
+            offset=entry['offset'],
+        ).reshape(shape)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._directory)
+
+    def __len__(self) -> int:
+        return len(self._directory)
+
+
+class MappedTrace(ColumnarTrace):
+    """
+    Reader for the memory-mapped converted trace format.
+
+    On top of what `ColumnarTrace` provides, the timestamp, CPU ID, and thread ID of all events
+    are available as arrays in the original order. All typed columns (e.g. handles) are read-only
+    numpy views over the file, so nothing is copied until values are used.
+    """
+
+    @staticmethod
+    def _load_arrays(
+        file_path: str,
+    ) -> Mapping[str, np.ndarray]:
+        return _MappedArrays(file_path)
+
+    @property
+    def name_codes(self) -> np.ndarray:
+        """Get the index of the name of each event in `event_names`."""
+        return self._name_codes
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Get the timestamp of each event."""
+        return self._arrays[_KEY_TIMESTAMPS]
+
+    @property
+    def cpu_ids(self) -> np.ndarray:
+        """Get the CPU ID of each event, or `MISSING_ID`."""
+        return self._arrays[_KEY_CPU_IDS]
+
+    @property
+    def tids(self) -> np.ndarray:
+        """Get the thread ID (vtid, or tid) of each event, or `MISSING_ID`."""
+        return self._arrays[_KEY_TIDS]
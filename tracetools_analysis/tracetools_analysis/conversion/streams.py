@@ -0,0 +1,142 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module for finding the CTF streams of a trace directory and tracking their changes."""
+
+import hashlib
+import os
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+CTF_METADATA_FILE_NAME = 'metadata'
+# Magic number at the start of CTF packets (0xc1fc1fc1), in both byte orders
+_CTF_PACKET_MAGICS = (b'\xc1\x1f\xfc\xc1', b'\xc1\xfc\x1f\xc1')
+
+# Number of bytes at the start of a file that are hashed
+FILE_HASH_SIZE = 64 * 1024
+
+FILE_UNCHANGED = 'unchanged'
+FILE_APPENDED = 'appended'
+FILE_CHANGED = 'changed'
+
+FileState = Dict[str, Any]
+
+
+def is_packet_start(
+    file_path: str,
+    offset: int = 0,
+) -> bool:
+    """
+    Check if there is the start of a CTF packet at a given offset in a file.
+
+    :param file_path: the path to the file
+    :param offset: the byte offset
+    :return: `True` if there is a CTF packet magic number at that offset, `False` otherwise
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(len(_CTF_PACKET_MAGICS[0])) in _CTF_PACKET_MAGICS
+
+
+def get_trace_streams(
+    trace_directory: str,
+) -> List[Tuple[str, str]]:
+    """
+    Get the CTF stream files of all traces under a trace directory.
+
+    A trace is a directory containing a CTF metadata file, e.g. one for the kernel trace and one
+    for each UST channel buffer; the other files in it that start with a CTF packet are data
+    streams (e.g. one per CPU).
+
+    :param trace_directory: the trace directory
+    :return: the (metadata file path, stream file path) tuples, in a stable order
+    """
+    streams = []
+    for directory, subdirectories, files in os.walk(trace_directory):
+        subdirectories.sort()
+        if CTF_METADATA_FILE_NAME not in files:
+            continue
+        metadata_file_path = os.path.join(directory, CTF_METADATA_FILE_NAME)
+        for file_name in sorted(files):
+            file_path = os.path.join(directory, file_name)
+            if file_name == CTF_METADATA_FILE_NAME or not os.path.isfile(file_path):
+                continue
+            if not is_packet_start(file_path):
+                continue
+            streams.append((metadata_file_path, file_path))
+    return streams
+
+
+def _hash_file_prefix(
+    file_path: str,
+    size: int,
+) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+
+def get_file_state(
+    file_path: str,
+) -> FileState:
+    """
+    Get the state of a file, to be able to tell later on if it changed.
+
+    Only the start of the file is hashed, so that this stays cheap for big files, and so that the
+    hash stays the same when data is appended to the file.
+
+    :param file_path: the path to the file
+    :return: the state, with the size, the modification time, and the hash
+    """
+    file_stat = os.stat(file_path)
+    hash_size = min(file_stat.st_size, FILE_HASH_SIZE)
+    return {
+        'size': file_stat.st_size,
+        'mtime_ns': file_stat.st_mtime_ns,
+        'hash_size': hash_size,
+        'hash': _hash_file_prefix(file_path, hash_size),
+    }
+
+
+def compare_file_state(
+    old_state: FileState,
+    new_state: FileState,
+    file_path: str,
+) -> str:
+    """
+    Compare the previous and current states of a file.
+
+    :param old_state: the previous state
+    :param new_state: the current state
+    :param file_path: the path to the file, to compute the hash of the previous size if needed
+    :return: `FILE_UNCHANGED`, `FILE_APPENDED`, or `FILE_CHANGED`
+    """
+    if (
+        old_state['size'] == new_state['size'] and
+        old_state['mtime_ns'] == new_state['mtime_ns'] and
+        old_state['hash'] == new_state['hash']
+    ):
+        return FILE_UNCHANGED
+    if old_state['size'] < new_state['size']:
+        old_hash_size = old_state['hash_size']
+        if old_hash_size == new_state['hash_size']:
+            new_hash: Optional[str] = new_state['hash']
+        else:
+            new_hash = _hash_file_prefix(file_path, old_hash_size)
+        if old_state['hash'] == new_hash:
+            return FILE_APPENDED
+    return FILE_CHANGED
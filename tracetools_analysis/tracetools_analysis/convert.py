@@ -19,8 +19,11 @@ import argparse
 import os
 import sys
 import time
+from typing import Optional
 
 from tracetools_analysis.conversion import ctf
+from tracetools_analysis.conversion.ctf import OUTPUT_FORMAT_PICKLE
+from tracetools_analysis.conversion.ctf import OUTPUT_FORMATS
 
 from . import time_diff_to_str
 
@@ -37,6 +40,22 @@ def add_args(parser: argparse.ArgumentParser) -> None:
         default=DEFAULT_CONVERT_FILE_NAME,
         help='the name of the output file to generate, '
         'under $trace_directory (default: %(default)s)')
+    parser.add_argument(
+        '-F', '--format', dest='output_format',
+        choices=OUTPUT_FORMATS, default=OUTPUT_FORMAT_PICKLE,
+        help='the format of the output file: a stream of pickled events, typed columns '
+        'for each event name in a numpy .npz file, or the same columns in a binary file '
+        'that can be memory-mapped (default: %(default)s)')
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', metavar='N',
+        type=int, default=1,
+        help='the number of processes to use to convert the trace streams in parallel '
+        '(default: %(default)s)')
+    parser.add_argument(
+        '-i', '--incremental', dest='incremental',
+        action='store_true', default=None,
+        help='keep the converted data of each trace stream to only convert new or changed data '
+        'next time; automatically done if the existing output file was converted incrementally')
 
 
 def parse_args() -> argparse.Namespace:
@@ -49,6 +68,9 @@ def parse_args() -> argparse.Namespace:
 def convert(
     trace_directory: str,
     output_file_name: str = DEFAULT_CONVERT_FILE_NAME,
+    output_format: str = OUTPUT_FORMAT_PICKLE,
+    jobs: int = 1,
+    incremental: Optional[bool] = None,
 ) -> int:
     """
     Convert trace directory to a file.
@@ -57,6 +79,10 @@ def convert(
 
     :param trace_directory: the path to the trace directory to import
     :param outout_file_name: the name of the output file
+    :param output_format: the format of the output file
+    :param jobs: the number of processes to use
+    :param incremental: whether to convert incrementally, or `None` to do it only if the output
+        file was converted incrementally
     """
     trace_directory = os.path.expanduser(trace_directory)
     if not os.path.isdir(trace_directory):
@@ -66,7 +92,13 @@ def convert(
     print(f'converting trace directory: {trace_directory}')
     output_file_path = os.path.join(trace_directory, output_file_name)
     start_time = time.time()
-    count = ctf.convert(trace_directory, output_file_path)
+    count = ctf.convert(
+        trace_directory,
+        output_file_path,
+        output_format,
+        jobs,
+        incremental,
+    )
     time_diff = time.time() - start_time
     print(f'converted {count} events in {time_diff_to_str(time_diff)}')
     print(f'output written to: {output_file_path}')
@@ -78,5 +110,8 @@ def main():
 
     trace_directory = args.trace_directory
     output_file_name = args.output_file_name
+    output_format = args.output_format
+    jobs = args.jobs
+    incremental = args.incremental
 
-    convert(trace_directory, output_file_name)
+    convert(trace_directory, output_file_name, output_format, jobs, incremental)
@@ -26,6 +26,15 @@ class DataModel():
     def __init__(self) -> None:
         pass
 
+    def finalize(self) -> None:
+        """
+        Finalize the data model.
+
+        This is called once all events have been processed. Data models that buffer data during
+        processing should override this to build their final `DataFrame`s.
+        """
+        pass
+
     def print_data(self) -> None:
         """Print the data model."""
         raise NotImplementedError
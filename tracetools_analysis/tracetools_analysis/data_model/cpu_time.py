@@ -14,9 +14,13 @@
 
 """Module for CPU time data model."""
 
-import pandas as pd
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame
 
 from . import DataModel
+from .storage import ColumnStorage
 
 
 class CpuTimeDataModel(DataModel):
@@ -29,12 +33,20 @@ class CpuTimeDataModel(DataModel):
     def __init__(self) -> None:
         """Create a CpuTimeDataModel."""
         super().__init__()
-        self.times = pd.DataFrame(columns=[
-            'tid',
-            'start_timestamp',
-            'duration',
-            'cpu_id',
-        ])
+        self._times_storage = ColumnStorage({
+            'tid': np.int64,
+            'start_timestamp': np.int64,
+            'duration': np.int64,
+            'cpu_id': np.int64,
+        })
+        self._times: Optional[DataFrame] = None
+
+    @property
+    def times(self) -> DataFrame:
+        """Get the durations, creating the `DataFrame` if needed."""
+        if self._times is None:
+            self._times = self._times_storage.to_dataframe()
+        return self._times
 
     def add_duration(
         self,
@@ -43,13 +55,18 @@ class CpuTimeDataModel(DataModel):
         duration: int,
         cpu_id: int,
     ) -> None:
-        data = {
-            'tid': tid,
-            'start_timestamp': start_timestamp,
-            'duration': duration,
-            'cpu_id': cpu_id,
-        }
-        self.times = self.times.append(data, ignore_index=True)
+        self._times_storage.append(tid, start_timestamp, duration, cpu_id)
+        self._times = None
+
+    def add_durations(
+        self,
+        tids: np.ndarray,
+        start_timestamps: np.ndarray,
+        durations: np.ndarray,
+        cpu_ids: np.ndarray,
+    ) -> None:
+        self._times_storage.extend(tids, start_timestamps, durations, cpu_ids)
+        self._times = None
 
     def print_data(self) -> None:
         print('====================CPU TIME DATA MODEL====================')
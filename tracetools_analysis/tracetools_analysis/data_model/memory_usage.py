@@ -14,9 +14,13 @@
 
 """Module for memory usage data model."""
 
-import pandas as pd
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame
 
 from . import DataModel
+from .storage import ColumnStorage
 
 
 class MemoryUsageDataModel(DataModel):
@@ -27,14 +31,38 @@ class MemoryUsageDataModel(DataModel):
     timestamp.
     """
 
+    # Thread ID for differences of events that do not have one
+    UNKNOWN_TID = -1
+
     def __init__(self) -> None:
         """Create a MemoryUsageDataModel."""
         super().__init__()
-        self.memory_diff = pd.DataFrame(columns=[
-            'timestamp',
-            'tid',
-            'memory_diff',
-        ])
+        self._memory_diff_storage = ColumnStorage({
+            'timestamp': np.int64,
+            'tid': np.int64,
+            'memory_diff': np.int64,
+        })
+        # Index of the event of each difference in the trace, since differences for different
+        # events might not be added in trace order
+        self._index_storage = ColumnStorage({'index': np.int64})
+        self._next_index = 0
+        self._memory_diff: Optional[DataFrame] = None
+        self._sorted = True
+
+    @property
+    def memory_diff(self) -> DataFrame:
+        """Get the memory differences, creating the `DataFrame` if needed."""
+        if self._memory_diff is None:
+            memory_diff = self._memory_diff_storage.to_dataframe()
+            if not self._sorted:
+                # Sort by time, and keep the trace order of differences with the same timestamp
+                order = np.lexsort((
+                    self._index_storage.get_column('index'),
+                    memory_diff['timestamp'].to_numpy(),
+                ))
+                memory_diff = memory_diff.take(order).reset_index(drop=True)
+            self._memory_diff = memory_diff
+        return self._memory_diff
 
     def add_memory_difference(
         self,
@@ -42,12 +70,37 @@ class MemoryUsageDataModel(DataModel):
         tid: int,
         memory_diff: int,
     ) -> None:
-        data = {
-            'timestamp': timestamp,
-            'tid': tid,
-            'memory_diff': memory_diff,
-        }
-        self.memory_diff = self.memory_diff.append(data, ignore_index=True)
+        self._memory_diff_storage.append(timestamp, tid, memory_diff)
+        self._index_storage.append(self._next_index)
+        self._next_index += 1
+        self._memory_diff = None
+
+    def add_memory_differences(
+        self,
+        timestamps: np.ndarray,
+        tids: np.ndarray,
+        memory_diffs: np.ndarray,
+        indices: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Add memory differences.
+
+        :param timestamps: the timestamps
+        :param tids: the thread IDs
+        :param memory_diffs: the memory differences
+        :param indices: the index of each event in the trace (see `EventBlock.index`), or `None`
+            if the differences come after all previous ones
+        """
+        if len(timestamps) == 0:
+            return
+        if indices is None:
+            indices = np.arange(self._next_index, self._next_index + len(timestamps))
+        elif indices[0] < self._next_index:
+            self._sorted = False
+        self._memory_diff_storage.extend(timestamps, tids, memory_diffs)
+        self._index_storage.extend(indices)
+        self._next_index = max(self._next_index, int(indices[-1]) + 1)
+        self._memory_diff = None
 
     def print_data(self) -> None:
         print('==================MEMORY USAGE DATA MODEL==================')
@@ -16,9 +16,11 @@
 
 from typing import Optional
 
-import pandas as pd
+import numpy as np
+from pandas import DataFrame
 
 from . import DataModel
+from .storage import ColumnStorage
 
 
 class ProfileDataModel(DataModel):
@@ -32,15 +34,23 @@ class ProfileDataModel(DataModel):
     def __init__(self) -> None:
         """Create a ProfileDataModel."""
         super().__init__()
-        self.times = pd.DataFrame(columns=[
-            'tid',
-            'depth',
-            'function_name',
-            'parent_name',
-            'start_timestamp',
-            'duration',
-            'actual_duration',
-        ])
+        self._times_storage = ColumnStorage({
+            'tid': np.int64,
+            'depth': np.int64,
+            'function_name': object,
+            'parent_name': object,
+            'start_timestamp': np.int64,
+            'duration': np.int64,
+            'actual_duration': np.int64,
+        })
+        self._times: Optional[DataFrame] = None
+
+    @property
+    def times(self) -> DataFrame:
+        """Get the durations, creating the `DataFrame` if needed."""
+        if self._times is None:
+            self._times = self._times_storage.to_dataframe()
+        return self._times
 
     def add_duration(
         self,
@@ -52,16 +62,16 @@ class ProfileDataModel(DataModel):
         duration: int,
         actual_duration: int,
     ) -> None:
-        data = {
-            'tid': tid,
-            'depth': depth,
-            'function_name': function_name,
-            'parent_name': parent_name,
-            'start_timestamp': start_timestamp,
-            'duration': duration,
-            'actual_duration': actual_duration,
-        }
-        self.times = self.times.append(data, ignore_index=True)
+        self._times_storage.append(
+            tid,
+            depth,
+            function_name,
+            parent_name,
+            start_timestamp,
+            duration,
+            actual_duration,
+        )
+        self._times = None
 
     def print_data(self) -> None:
         print('====================PROFILE DATA MODEL====================')
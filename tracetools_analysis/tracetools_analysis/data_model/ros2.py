@@ -15,189 +15,312 @@
 
 """Module for ROS 2 data model."""
 
+from functools import lru_cache
+from typing import Any
+from typing import Dict
+from typing import List
+
 import pandas as pd
 
 from . import DataModel
 
+# Intermediate storage for objects: (index value -> values of the other columns)
+# Re-adding an object with the same index value overwrites it, like DataFrame.loc[] did
+ObjectStorage = Dict[Any, List[Any]]
+# Intermediate storage for instances: (column name -> column values)
+InstanceStorage = Dict[str, List[Any]]
+
+# Maximum number of prettified symbols to keep
+PRETTIFY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PRETTIFY_CACHE_SIZE)
+def prettify_symbol(
+    original: str,
+) -> str:
+    """
+    Process symbol to make it more readable.
+
+    * remove std::allocator
+    * remove std::default_delete
+    * bind object: remove placeholder
+
+    The most recently used results are cached, since the same (long, templated) symbols are
+    usually prettified many times during an analysis.
+
+    :param original: the original symbol
+    :return: the prettified symbol
+    """
+    pretty = original
+    # remove spaces
+    pretty = pretty.replace(' ', '')
+    # allocator
+    std_allocator = '_<std::allocator<void>>'
+    pretty = pretty.replace(std_allocator, '')
+    # default_delete
+    std_defaultdelete = 'std::default_delete'
+    if std_defaultdelete in pretty:
+        dd_start = pretty.find(std_defaultdelete)
+        template_param_open = dd_start + len(std_defaultdelete)
+        # find index of matching/closing GT sign
+        template_param_close = template_param_open
+        level = 0
+        done = False
+        while not done:
+            template_param_close += 1
+            if pretty[template_param_close] == '<':
+                level += 1
+            elif pretty[template_param_close] == '>':
+                if level == 0:
+                    done = True
+                else:
+                    level -= 1
+        pretty = pretty[:dd_start] + pretty[(template_param_close + 1):]
+    # bind
+    std_bind = 'std::_Bind<'
+    if pretty.startswith(std_bind):
+        # remove bind<>
+        pretty = pretty.replace(std_bind, '')
+        pretty = pretty[:-1]
+        # remove placeholder stuff
+        placeholder_from = pretty.find('*')
+        placeholder_to = pretty.find(')', placeholder_from)
+        pretty = pretty[:placeholder_from] + '?' + pretty[(placeholder_to + 1):]
+    # remove dangling comma
+    pretty = pretty.replace(',>', '>')
+    # restore meaningful spaces
+    if pretty.startswith('void'):
+        pretty = 'void' + ' ' + pretty[len('void'):]
+    if pretty.endswith('const'):
+        pretty = pretty[:(len(pretty) - len('const'))] + ' ' + 'const'
+    return pretty
+
 
 class Ros2DataModel(DataModel):
     """
     Container to model pre-processed ROS 2 data for analysis.
 
     This aims to represent the data in a ROS 2-aware way.
+
+    Data is buffered during processing and the `DataFrame`s are only built when finalizing.
     """
 
     def __init__(self) -> None:
         """Create a Ros2DataModel."""
         super().__init__()
         # Objects (one-time events, usually when something is created)
-        self.contexts = pd.DataFrame(columns=['context_handle',
-                                              'timestamp',
-                                              'pid',
-                                              'version'])
-        self.contexts.set_index(['context_handle'], inplace=True, drop=True)
-        self.nodes = pd.DataFrame(columns=['node_handle',
-                                           'timestamp',
-                                           'tid',
-                                           'rmw_handle',
-                                           'name',
-                                           'namespace'])
-        self.nodes.set_index(['node_handle'], inplace=True, drop=True)
-        self.publishers = pd.DataFrame(columns=['publisher_handle',
-                                                'timestamp',
-                                                'node_handle',
-                                                'rmw_handle',
-                                                'topic_name',
-                                                'depth'])
-        self.publishers.set_index(['publisher_handle'], inplace=True, drop=True)
-        self.subscriptions = pd.DataFrame(columns=['subscription_handle',
-                                                   'timestamp',
-                                                   'node_handle',
-                                                   'rmw_handle',
-                                                   'topic_name',
-                                                   'depth'])
-        self.subscriptions.set_index(['subscription_handle'], inplace=True, drop=True)
-        self.subscription_objects = pd.DataFrame(columns=['subscription',
-                                                          'timestamp',
-                                                          'subscription_handle'])
-        self.subscription_objects.set_index(['subscription'], inplace=True, drop=True)
-        self.services = pd.DataFrame(columns=['service_handle',
-                                              'timestamp',
-                                              'node_handle',
-                                              'rmw_handle',
-                                              'service_name'])
-        self.services.set_index(['service_handle'], inplace=True, drop=True)
-        self.clients = pd.DataFrame(columns=['client_handle',
-                                             'timestamp',
-                                             'node_handle',
-                                             'rmw_handle',
-                                             'service_name'])
-        self.clients.set_index(['client_handle'], inplace=True, drop=True)
-        self.timers = pd.DataFrame(columns=['timer_handle',
-                                            'timestamp',
-                                            'period',
-                                            'tid'])
-        self.timers.set_index(['timer_handle'], inplace=True, drop=True)
-        self.timer_objects = pd.DataFrame(columns=['timer_handle',
-                                                   'timestamp',
-                                                   'node_handle',
-                                                   'tid'])
-        self.timer_objects.set_index(['timer_handle'], inplace=True, drop=True)
-
-        self.callback_objects = pd.DataFrame(columns=['reference',
-                                                      'timestamp',
-                                                      'callback_object'])
-        self.callback_objects.set_index(['reference'], inplace=True, drop=True)
-        self.callback_symbols = pd.DataFrame(columns=['callback_object',
-                                                      'timestamp',
-                                                      'symbol'])
-        self.callback_symbols.set_index(['callback_object'], inplace=True, drop=True)
-        self.lifecycle_state_machines = pd.DataFrame(columns=['state_machine_handle',
-                                                              'node_handle'])
-        self.lifecycle_state_machines.set_index(['state_machine_handle'], inplace=True, drop=True)
+        self._contexts: ObjectStorage = {}
+        self._nodes: ObjectStorage = {}
+        self._publishers: ObjectStorage = {}
+        self._subscriptions: ObjectStorage = {}
+        self._subscription_objects: ObjectStorage = {}
+        self._services: ObjectStorage = {}
+        self._clients: ObjectStorage = {}
+        self._timers: ObjectStorage = {}
+        self._timer_objects: ObjectStorage = {}
+        self._callback_objects: ObjectStorage = {}
+        self._callback_symbols: ObjectStorage = {}
+        self._lifecycle_state_machines: ObjectStorage = {}
 
         # Events (multiple instances, may not have a meaningful index)
-        self.callback_instances = pd.DataFrame(columns=['callback_object',
-                                                        'timestamp',
-                                                        'duration',
-                                                        'intra_process'])
-
+        self._callback_instances: InstanceStorage = self._new_instance_storage([
+            'callback_object',
+            'timestamp',
+            'duration',
+            'intra_process',
+        ])
+        self._communication_instances: InstanceStorage = self._new_instance_storage([
+            'object',
+            'timestamp',
+            'duration',
+        ])
 
         # Lifecycle state transitions (may not have a meaningful index)
-        self.lifecycle_transitions = pd.DataFrame(columns=['state_machine_handle',
-                                                           'start_label',
-                                                           'goal_label',
-                                                           'timestamp'])
+        self._lifecycle_transitions: InstanceStorage = self._new_instance_storage([
+            'state_machine_handle',
+            'start_label',
+            'goal_label',
+            'timestamp',
+        ])
+
+        # Create the (empty) dataframes so that they are available before processing is done
+        self.finalize()
+
+    @staticmethod
+    def _new_instance_storage(
+        columns: List[str],
+    ) -> InstanceStorage:
+        return {column: [] for column in columns}
+
+    @staticmethod
+    def _objects_to_df(
+        objects: ObjectStorage,
+        index: str,
+        columns: List[str],
+    ) -> pd.DataFrame:
+        """
+        Create a `DataFrame` from buffered objects.
+
+        :param objects: the buffered objects
+        :param index: the name of the index column
+        :param columns: the names of the other columns
+        :return: the resulting `DataFrame`
+        """
+        return pd.DataFrame(
+            list(objects.values()),
+            index=pd.Index(list(objects.keys()), name=index),
+            columns=columns,
+        )
+
+    @staticmethod
+    def _instances_to_df(
+        instances: InstanceStorage,
+    ) -> pd.DataFrame:
+        """
+        Create a `DataFrame` from buffered instances.
+
+        :param instances: the buffered instances
+        :return: the resulting `DataFrame`
+        """
+        return pd.DataFrame(instances, columns=list(instances.keys()))
 
     def add_context(
         self, context_handle, timestamp, pid, version
     ) -> None:
-        self.contexts.loc[context_handle] = [timestamp, pid, version]
+        self._contexts[context_handle] = [timestamp, pid, version]
 
     def add_node(
         self, node_handle, timestamp, tid, rmw_handle, name, namespace
     ) -> None:
-        self.nodes.loc[node_handle] = [timestamp, tid, rmw_handle, name, namespace]
+        self._nodes[node_handle] = [timestamp, tid, rmw_handle, name, namespace]
 
     def add_publisher(
         self, handle, timestamp, node_handle, rmw_handle, topic_name, depth
     ) -> None:
-        self.publishers.loc[handle] = [timestamp, node_handle, rmw_handle, topic_name, depth]
+        self._publishers[handle] = [timestamp, node_handle, rmw_handle, topic_name, depth]
 
     def add_rcl_subscription(
         self, handle, timestamp, node_handle, rmw_handle, topic_name, depth
     ) -> None:
-        self.subscriptions.loc[handle] = [timestamp, node_handle, rmw_handle, topic_name, depth]
+        self._subscriptions[handle] = [timestamp, node_handle, rmw_handle, topic_name, depth]
 
     def add_rclcpp_subscription(
         self, subscription_pointer, timestamp, subscription_handle
     ) -> None:
-        self.subscription_objects.loc[subscription_pointer] = [timestamp, subscription_handle]
+        self._subscription_objects[subscription_pointer] = [timestamp, subscription_handle]
 
     def add_service(
         self, handle, timestamp, node_handle, rmw_handle, service_name
     ) -> None:
-        self.services.loc[handle] = [timestamp, node_handle, rmw_handle, service_name]
+        self._services[handle] = [timestamp, node_handle, rmw_handle, service_name]
 
     def add_client(
         self, handle, timestamp, node_handle, rmw_handle, service_name
     ) -> None:
-        self.clients.loc[handle] = [timestamp, node_handle, rmw_handle, service_name]
+        self._clients[handle] = [timestamp, node_handle, rmw_handle, service_name]
 
     def add_timer(
         self, handle, timestamp,  period, tid
     ) -> None:
-        self.timers.loc[handle] = [timestamp,  period, tid]
+        self._timers[handle] = [timestamp,  period, tid]
 
     def add_timer_object(
         self, handle, timestamp, node_handle,  tid
     ) -> None:
-        self.timer_objects.loc[handle] = [timestamp, node_handle,  tid]
+        self._timer_objects[handle] = [timestamp, node_handle,  tid]
 
     def add_callback_object(
         self, reference, timestamp, callback_object
     ) -> None:
-        self.callback_objects.loc[reference] = [timestamp, callback_object]
+        self._callback_objects[reference] = [timestamp, callback_object]
 
     def add_callback_symbol(
         self, callback_object, timestamp, symbol
     ) -> None:
-        self.callback_symbols.loc[callback_object] = [timestamp, symbol]
+        self._callback_symbols[callback_object] = [timestamp, symbol]
 
     def add_callback_instance(
         self, callback_object, timestamp, duration, intra_process
     ) -> None:
-        data = {
-            'callback_object': callback_object,
-            'timestamp': timestamp,
-            'duration': duration,
-            'intra_process': intra_process,
-        }
-        self.callback_instances = self.callback_instances.append(data, ignore_index=True)
+        self._callback_instances['callback_object'].append(callback_object)
+        self._callback_instances['timestamp'].append(timestamp)
+        self._callback_instances['duration'].append(duration)
+        self._callback_instances['intra_process'].append(intra_process)
 
     def add_communication_instance(self, event_object, timestamp, duration):
-        data = {
-            'object': event_object,
-            'timestamp': timestamp,
-            'duration': duration
-        }
-        self.communication_instances = self.communication_instances.append(data, ignore_index=True)
+        self._communication_instances['object'].append(event_object)
+        self._communication_instances['timestamp'].append(timestamp)
+        self._communication_instances['duration'].append(duration)
 
     def add_lifecycle_state_machine(
         self, handle, node_handle
     ) -> None:
-        self.lifecycle_state_machines.loc[handle] = [node_handle]
+        self._lifecycle_state_machines[handle] = [node_handle]
 
     def add_lifecycle_state_transition(
         self, state_machine_handle, start_label, goal_label, timestamp
     ) -> None:
-        data = {
-            'state_machine_handle': state_machine_handle,
-            'start_label': start_label,
-            'goal_label': goal_label,
-            'timestamp': timestamp,
-        }
-        self.lifecycle_transitions = self.lifecycle_transitions.append(data, ignore_index=True)
+        self._lifecycle_transitions['state_machine_handle'].append(state_machine_handle)
+        self._lifecycle_transitions['start_label'].append(start_label)
+        self._lifecycle_transitions['goal_label'].append(goal_label)
+        self._lifecycle_transitions['timestamp'].append(timestamp)
+
+    def finalize(self) -> None:
+        """Build the `DataFrame`s from the buffered data."""
+        self.contexts = self._objects_to_df(
+            self._contexts,
+            'context_handle',
+            ['timestamp', 'pid', 'version'])
+        self.nodes = self._objects_to_df(
+            self._nodes,
+            'node_handle',
+            ['timestamp', 'tid', 'rmw_handle', 'name', 'namespace'])
+        self.publishers = self._objects_to_df(
+            self._publishers,
+            'publisher_handle',
+            ['timestamp', 'node_handle', 'rmw_handle', 'topic_name', 'depth'])
+        self.subscriptions = self._objects_to_df(
+            self._subscriptions,
+            'subscription_handle',
+            ['timestamp', 'node_handle', 'rmw_handle', 'topic_name', 'depth'])
+        self.subscription_objects = self._objects_to_df(
+            self._subscription_objects,
+            'subscription',
+            ['timestamp', 'subscription_handle'])
+        self.services = self._objects_to_df(
+            self._services,
+            'service_handle',
+            ['timestamp', 'node_handle', 'rmw_handle', 'service_name'])
+        self.clients = self._objects_to_df(
+            self._clients,
+            'client_handle',
+            ['timestamp', 'node_handle', 'rmw_handle', 'service_name'])
+        self.timers = self._objects_to_df(
+            self._timers,
+            'timer_handle',
+            ['timestamp', 'period', 'tid'])
+        self.timer_objects = self._objects_to_df(
+            self._timer_objects,
+            'timer_handle',
+            ['timestamp', 'node_handle', 'tid'])
+        self.callback_objects = self._objects_to_df(
+            self._callback_objects,
+            'reference',
+            ['timestamp', 'callback_object'])
+        self.callback_symbols = self._objects_to_df(
+            self._callback_symbols,
+            'callback_object',
+            ['timestamp', 'symbol'])
+        self.callback_symbols['symbol_pretty'] = [
+            prettify_symbol(symbol) for symbol in self.callback_symbols['symbol']
+        ]
+        self.lifecycle_state_machines = self._objects_to_df(
+            self._lifecycle_state_machines,
+            'state_machine_handle',
+            ['node_handle'])
+        self.callback_instances = self._instances_to_df(self._callback_instances)
+        self.communication_instances = self._instances_to_df(self._communication_instances)
+        self.lifecycle_transitions = self._instances_to_df(self._lifecycle_transitions)
 
     def print_data(self) -> None:
         print('====================ROS 2 DATA MODEL===================')
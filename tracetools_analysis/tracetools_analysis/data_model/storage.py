@@ -0,0 +1,132 @@
+# Copyright 2019 Robert Bosch GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module for data model storage."""
+
+from typing import Any
+from typing import List
+from typing import Mapping
+
+import numpy as np
+from pandas import DataFrame
+
+
+class ColumnStorage():
+    """
+    Append-only columnar storage for data model rows.
+
+    Rows are written into fixed-size chunks of typed numpy arrays, one array per column. Appending
+    a row is therefore amortized O(1) and never copies previously-added rows. The chunks are only
+    concatenated when creating a `DataFrame` out of the storage.
+    """
+
+    DEFAULT_CHUNK_SIZE = 4096
+
+    def __init__(
+        self,
+        columns: Mapping[str, Any],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        Create a ColumnStorage.
+
+        :param columns: the ordered mapping from column name to numpy dtype
+        :param chunk_size: the number of rows per chunk
+        """
+        assert chunk_size > 0, f'invalid chunk size: {chunk_size}'
+        self._columns = list(columns.keys())
+        self._dtypes = [np.dtype(dtype) for dtype in columns.values()]
+        self._chunk_size = chunk_size
+        self._full_chunks: List[List[np.ndarray]] = []
+        self._chunk = self._new_chunk()
+        self._chunk_len = 0
+
+    @property
+    def columns(self) -> List[str]:
+        """Get the column names."""
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._full_chunks) * self._chunk_size + self._chunk_len
+
+    def _new_chunk(self) -> List[np.ndarray]:
+        return [np.empty(self._chunk_size, dtype=dtype) for dtype in self._dtypes]
+
+    def append(
+        self,
+        *values: Any,
+    ) -> None:
+        """
+        Append a row.
+
+        :param values: the value for each column, in order
+        """
+        if self._chunk_len == self._chunk_size:
+            self._full_chunks.append(self._chunk)
+            self._chunk = self._new_chunk()
+            self._chunk_len = 0
+        index = self._chunk_len
+        for array, value in zip(self._chunk, values):
+            array[index] = value
+        self._chunk_len = index + 1
+
+    def extend(
+        self,
+        *columns: Any,
+    ) -> None:
+        """
+        Append rows given as columns.
+
+        :param columns: the values for each column, in order, as arrays of the same length
+        """
+        length = len(columns[0])
+        assert all(len(values) == length for values in columns), 'columns of different lengths'
+        start = 0
+        while start < length:
+            if self._chunk_len == self._chunk_size:
+                self._full_chunks.append(self._chunk)
+                self._chunk = self._new_chunk()
+                self._chunk_len = 0
+            index = self._chunk_len
+            count = min(self._chunk_size - index, length - start)
+            for array, values in zip(self._chunk, columns):
+                array[index:index + count] = values[start:start + count]
+            self._chunk_len = index + count
+            start += count
+
+    def get_column(
+        self,
+        column: str,
+    ) -> np.ndarray:
+        """
+        Get all values of a column as a single array.
+
+        :param column: the column name
+        :return: a new array with the values
+        """
+        column_index = self._columns.index(column)
+        arrays = [chunk[column_index] for chunk in self._full_chunks]
+        arrays.append(self._chunk[column_index][:self._chunk_len])
+        return np.concatenate(arrays)
+
+    def to_dataframe(self) -> DataFrame:
+        """
+        Create a `DataFrame` with the stored rows.
+
+        :return: the `DataFrame`, with one typed column per storage column
+        """
+        return DataFrame(
+            {column: self.get_column(column) for column in self._columns},
+            columns=self._columns,
+        )
@@ -17,17 +17,46 @@
 import os
 import pickle
 import sys
-from typing import Dict
-from typing import List
+from typing import Iterable
+from typing import Iterator
 from typing import Optional
+from typing import Sequence
+from typing import Set
 from typing import Tuple
 
+from tracetools_read import DictEvent
+from tracetools_read import get_event_name
 from tracetools_read.trace import is_trace_directory
 
+from ..conversion.cache import is_conversion_up_to_date
+from ..conversion.cache import read_manifest
+from ..conversion.columnar import ColumnarTrace
+from ..conversion.columnar import is_columnar_file
+from ..conversion.index import load_event_index
+from ..conversion.mapped import is_mapped_file
+from ..conversion.mapped import MappedTrace
 from ..convert import convert
 from ..convert import DEFAULT_CONVERT_FILE_NAME
 
 
+class EventList(list):
+    """
+    List of events, along with the set of their names.
+
+    The names come from the event index of the converted file, so that they do not have to be
+    collected from the events again (e.g. to check for required events). They are not updated if
+    the list is modified.
+    """
+
+    def __init__(
+        self,
+        events: Iterable[DictEvent],
+        event_names: Iterable[str],
+    ) -> None:
+        super().__init__(events)
+        self.event_names = set(event_names)
+
+
 def _inspect_input_path(
     input_path: str,
     force_conversion: bool = False,
@@ -40,7 +69,8 @@ def _inspect_input_path(
     If the input path is a directory, it checks if there is a "converted" file directly inside it,
     otherwise it tries to import the path as a trace directory.
     If `force_conversion` is set to `True`, even if a converted file is found, it will ask to
-    re-create it.
+    re-create it. A converted file found under a directory is also re-created if its manifest
+    shows that the trace directory changed since it was converted.
 
     :param input_path: the path to a converted file or trace directory
     :param force_conversion: whether to re-create converted file even if it is found
@@ -66,6 +96,13 @@ def _inspect_input_path(
                         f'found converted file but will re-create it: {prospective_converted_file}'
                     )
                 return prospective_converted_file, True
+            elif is_conversion_up_to_date(prospective_converted_file) is False:
+                if not quiet:
+                    print(
+                        f'found converted file but trace directory changed, will update it: '
+                        f'{prospective_converted_file}'
+                    )
+                return prospective_converted_file, True
             else:
                 if not quiet:
                     print(f'found converted file: {prospective_converted_file}')
@@ -122,25 +159,30 @@ def _convert_if_needed(
     if create_converted_file:
         input_directory = os.path.dirname(converted_file_path)
         input_file_name = os.path.basename(converted_file_path)
-        convert(input_directory, input_file_name)
+        # Keep the same format as the previous conversion
+        manifest = read_manifest(converted_file_path)
+        if manifest is not None:
+            convert(input_directory, input_file_name, manifest['output_format'])
+        else:
+            convert(input_directory, input_file_name)
 
     return converted_file_path
 
 
-def load_file(
+def _get_converted_file_path(
     input_path: str,
     do_convert_if_needed: bool = True,
     force_conversion: bool = False,
     quiet: bool = False,
-) -> List[Dict]:
+) -> str:
     """
-    Load file containing converted trace events.
+    Get the path to the converted file, converting the trace directory first if needed.
 
     :param input_path: the path to a converted file or trace directory
     :param do_convert_if_needed: whether to create the converted file if needed (else, let it fail)
     :param force_conversion: whether to re-create converted file even if it is found
     :param quiet: whether to not print any output
-    :return: the list of events read from the file
+    :return: the path to the converted file
     """
     if do_convert_if_needed or force_conversion:
         file_path = _convert_if_needed(input_path, force_conversion, quiet)
@@ -150,13 +192,179 @@ def load_file(
     if file_path is None:
         raise RuntimeError(f'could not use input path: {input_path}')
 
-    events = []
-    with open(os.path.expanduser(file_path), 'rb') as f:
-        p = pickle.Unpickler(f)
+    return os.path.expanduser(file_path)
+
+
+def _open_columnar_trace(
+    file_path: str,
+) -> Optional[ColumnarTrace]:
+    """
+    Open a converted file if it uses the columnar or the memory-mapped format.
+
+    :param file_path: the path to the converted file
+    :return: the trace, or `None` if the file uses the pickle format
+    """
+    if is_columnar_file(file_path):
+        return ColumnarTrace(file_path)
+    if is_mapped_file(file_path):
+        return MappedTrace(file_path)
+    return None
+
+
+def _read_events(
+    file_path: str,
+) -> Iterator[DictEvent]:
+    """
+    Read events from a converted file, one at a time.
+
+    Each event is normally pickled on its own, so it can be unpickled on its own without keeping
+    references to the previous ones. Files created by older versions share a single pickle memo
+    for all events, so they have to be read with a single unpickler; this is detected when reading
+    the second event, in which case reading restarts from the beginning.
+
+    :param file_path: the path to the converted file
+    :return: the events
+    """
+    count = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            try:
+                event = pickle.load(f)
+            except EOFError:
+                return
+            except pickle.UnpicklingError:
+                # Event refers to objects from previous events, see above
+                break
+            count += 1
+            yield event
+
+    with open(file_path, 'rb') as f:
+        unpickler = pickle.Unpickler(f)
+        index = 0
         while True:
             try:
-                events.append(p.load())
+                event = unpickler.load()
             except EOFError:
-                break  # we're done
+                return
+            # Skip events that were already given
+            if index >= count:
+                yield event
+            index += 1
+
+
+def _read_events_at(
+    file_path: str,
+    offsets: Iterable[int],
+) -> Iterator[DictEvent]:
+    """
+    Read events from a converted file at the given byte offsets.
+
+    :param file_path: the path to the converted file
+    :param offsets: the byte offsets of the events, from the event index
+    :return: the events
+    """
+    with open(file_path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            yield pickle.load(f)
+
+
+def iter_events(
+    input_path: str,
+    do_convert_if_needed: bool = True,
+    force_conversion: bool = False,
+    quiet: bool = False,
+    event_names: Optional[Iterable[str]] = None,
+) -> Iterator[DictEvent]:
+    """
+    Iterate over converted trace events without loading all of them into memory.
+
+    The input path is checked (and the trace directory converted if needed) right away, but
+    events are only read from the file as they are being iterated over.
 
+    :param input_path: the path to a converted file or trace directory
+    :param do_convert_if_needed: whether to create the converted file if needed (else, let it fail)
+    :param force_conversion: whether to re-create converted file even if it is found
+    :param quiet: whether to not print any output
+    :param event_names: the names of the events to read, or `None` to read all events; if the
+        converted file has an event index, other events are skipped without being read
+    :return: an iterator over the events read from the file
+    """
+    file_path = _get_converted_file_path(input_path, do_convert_if_needed, force_conversion, quiet)
+    trace = _open_columnar_trace(file_path)
+    if trace is not None:
+        events = iter(trace)
+    else:
+        if event_names is not None:
+            index = load_event_index(file_path)
+            if index is not None:
+                return _read_events_at(file_path, index.get_offsets(event_names).tolist())
+        events = _read_events(file_path)
+    if event_names is not None:
+        event_names = set(event_names)
+        return (event for event in events if get_event_name(event) in event_names)
     return events
+
+
+def get_event_names(
+    input_path: str,
+    do_convert_if_needed: bool = True,
+    force_conversion: bool = False,
+    quiet: bool = False,
+    scan_events: bool = True,
+) -> Optional[Set[str]]:
+    """
+    Get the set of event names in a converted file.
+
+    Columnar and memory-mapped files, and the event index of pickle files, directly list the
+    event names. Otherwise, this reads through all events once, but only keeps their names.
+
+    :param input_path: the path to a converted file or trace directory
+    :param do_convert_if_needed: whether to create the converted file if needed (else, let it fail)
+    :param force_conversion: whether to re-create converted file even if it is found
+    :param quiet: whether to not print any output
+    :param scan_events: whether to read through all events if the file does not list the names
+    :return: the set of event names, or `None` if the file does not list them and `scan_events`
+        is false
+    """
+    file_path = _get_converted_file_path(input_path, do_convert_if_needed, force_conversion, quiet)
+    trace = _open_columnar_trace(file_path)
+    if trace is not None:
+        return set(trace.event_names)
+    index = load_event_index(file_path)
+    if index is not None:
+        return set(index.event_names)
+    if not scan_events:
+        return None
+    return {get_event_name(event) for event in _read_events(file_path)}
+
+
+def load_file(
+    input_path: str,
+    do_convert_if_needed: bool = True,
+    force_conversion: bool = False,
+    quiet: bool = False,
+) -> Sequence[DictEvent]:
+    """
+    Load file containing converted trace events.
+
+    Events from pickle files are all loaded into a list, which is an `EventList` if the file has an
+    event index. Columnar and memory-mapped files are loaded as a `ColumnarTrace` or a
+    `MappedTrace`, which rebuild events from the typed columns when they are accessed. In all these
+    cases, the set of event names is then available through the `event_names` attribute, which
+    processors use instead of going through all events.
+
+    :param input_path: the path to a converted file or trace directory
+    :param do_convert_if_needed: whether to create the converted file if needed (else, let it fail)
+    :param force_conversion: whether to re-create converted file even if it is found
+    :param quiet: whether to not print any output
+    :return: the sequence of events read from the file
+    """
+    file_path = _get_converted_file_path(input_path, do_convert_if_needed, force_conversion, quiet)
+    trace = _open_columnar_trace(file_path)
+    if trace is not None:
+        return trace
+    index = load_event_index(file_path)
+    if index is not None:
+        return EventList(_read_events(file_path), index.event_names)
+    return list(_read_events(file_path))
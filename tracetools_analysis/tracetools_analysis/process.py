@@ -16,11 +16,13 @@
 """Entrypoint/script to process events from a converted file to build a ROS model."""
 
 import argparse
+import itertools
 import os
 import sys
 import time
 
-from tracetools_analysis.loading import load_file
+from tracetools_analysis.loading import get_event_names
+from tracetools_analysis.loading import iter_events
 from tracetools_analysis.processor import Processor
 from tracetools_analysis.processor.ros2 import Ros2Handler
 
@@ -68,14 +70,29 @@ def process(
 
     start_time = time.time()
 
-    events = load_file(input_path, do_convert_if_needed=True, force_conversion=force_conversion)
+    # Get the event names first if the file lists them, so that missing required events are
+    # reported before processing; otherwise, they are checked while streaming the events
+    event_names = get_event_names(
+        input_path,
+        do_convert_if_needed=True,
+        force_conversion=force_conversion,
+        scan_events=False,
+    )
+    # The file was converted above if needed
+    events = iter_events(input_path, do_convert_if_needed=True, quiet=True)
+    # Stream events from the file and count them along the way
+    counter = itertools.count()
     processor = Processor(Ros2Handler())
-    processor.process(events)
+    processor.process(
+        (event for event, _ in zip(events, counter)),
+        event_names=event_names,
+    )
+    event_count = next(counter)
 
     time_diff = time.time() - start_time
     if not hide_results:
         processor.print_data()
-    print(f'processed {len(events)} events in {time_diff_to_str(time_diff)}')
+    print(f'processed {event_count} events in {time_diff_to_str(time_diff)}')
     return 0
 
 
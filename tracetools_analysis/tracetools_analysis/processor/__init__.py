@@ -14,26 +14,49 @@
 
 """Base processor module."""
 
+from array import array
 from collections import defaultdict
 import sys
 from types import ModuleType
 from typing import Callable
+from typing import Collection
 from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Sequence
 from typing import Set
+from typing import Sized
 from typing import Type
 from typing import Union
 
+import numpy as np
 from tracetools_read import DictEvent
 from tracetools_read import get_event_name
 from tracetools_read import get_field
 
+from ..conversion.columnar import ColumnarTrace
+from ..conversion.columnar import PRESENT_SUFFIX
 from ..data_model import DataModel
 
 
 class EventMetadata():
-    """Container for event metadata."""
+    """
+    Container for event metadata.
+
+    One is used for every handled event, so it uses `__slots__` and plain attributes to keep
+    creation and attribute access cheap.
+    """
+
+    __slots__ = [
+        'event_name',
+        'timestamp',
+        'cpu_id',
+        'procname',
+        'pid',
+        'tid',
+    ]
 
     def __init__(
         self,
@@ -50,41 +73,151 @@ class EventMetadata():
         Parameters with a default value of `None` are not mandatory,
         since they are not always present.
         """
+        self.event_name = event_name
+        self.timestamp = timestamp
+        self.cpu_id = cpu_id
+        self.procname = procname
+        self.pid = pid
+        self.tid = tid
+
+
+class EventBlock():
+    """
+    Block of events with the same name, for batch handler functions.
+
+    Values are given as numpy arrays with one value per event, in time order. Arrays are only
+    created from the events when they are first requested. If the events come from a columnar
+    trace, the arrays are slices of its columns instead, and events are not needed.
+    """
+
+    def __init__(
+        self,
+        event_name: str,
+        events: Sequence[DictEvent] = (),
+        columns: Optional[Mapping[str, np.ndarray]] = None,
+        indices: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Create an EventBlock.
+
+        :param event_name: the name of the events
+        :param events: the events, which must all have that name
+        :param columns: the (field name -> array) map of the values of the events, along with the
+            masks of the fields that not all events have (see `ColumnarTrace.get_columns`), to use
+            instead of the events
+        :param indices: the index of each event among all processed events, if known
+        """
         self._event_name = event_name
-        self._timestamp = timestamp
-        self._cpu_id = cpu_id
-        self._procname = procname
-        self._pid = pid
-        self._tid = tid
+        self._events = events
+        self._indices = indices
+        self._columns: Dict[str, np.ndarray] = {}
+        self._trace_columns = columns
+        if columns is not None:
+            self._size = len(columns['_timestamp'])
+            self._pid_key = self._choose_column_key(columns, 'vpid', 'pid')
+            self._tid_key = self._choose_column_key(columns, 'vtid', 'tid')
+        else:
+            self._size = len(events)
+            first_event = events[0] if events else {}
+            self._pid_key = DispatchPlan._choose_key(first_event, 'vpid', 'pid')
+            self._tid_key = DispatchPlan._choose_key(first_event, 'vtid', 'tid')
+
+    @staticmethod
+    def _choose_column_key(
+        columns: Mapping[str, np.ndarray],
+        *keys: str,
+    ) -> Optional[str]:
+        """Get the first key with a value for the first event, like `DispatchPlan._choose_key`."""
+        for key in keys:
+            values = columns.get(key, None)
+            if values is None or len(values) == 0:
+                continue
+            present = columns.get(key + PRESENT_SUFFIX, None)
+            if (present is None or present[0]) and values[0] is not None:
+                return key
+        return None
 
     @property
-    def event_name(self):
+    def event_name(self) -> str:
         return self._event_name
 
+    def __len__(self) -> int:
+        return self._size
+
     @property
-    def timestamp(self):
-        return self._timestamp
+    def index(self) -> Optional[np.ndarray]:
+        """
+        Get the index of each event among all processed events, or `None` if it is not known.
+
+        It gives the order of events in blocks with different event names, even for events with
+        the same timestamp.
+        """
+        return self._indices
 
     @property
-    def cpu_id(self):
-        return self._cpu_id
+    def timestamp(self) -> np.ndarray:
+        """Get the timestamps."""
+        return self.get_field('_timestamp')
 
     @property
-    def procname(self):
-        return self._procname
+    def cpu_id(self) -> np.ndarray:
+        """Get the CPU IDs."""
+        return self.get_field('cpu_id')
 
     @property
-    def pid(self):
-        return self._pid
+    def pid(self) -> Optional[np.ndarray]:
+        """Get the process IDs (vpid or pid), or `None` if the events do not have them."""
+        return self.get_field(self._pid_key) if self._pid_key is not None else None
 
     @property
-    def tid(self):
-        return self._tid
+    def tid(self) -> Optional[np.ndarray]:
+        """Get the thread IDs (vtid or tid), or `None` if the events do not have them."""
+        return self.get_field(self._tid_key) if self._tid_key is not None else None
+
+    def get_field(
+        self,
+        field_name: str,
+    ) -> np.ndarray:
+        """
+        Get the values of a field.
+
+        :param field_name: the field name
+        :return: the array of values
+        """
+        values = self._columns.get(field_name, None)
+        if values is None:
+            if self._trace_columns is not None:
+                values = self._get_trace_column(field_name)
+            else:
+                try:
+                    values_list = [event[field_name] for event in self._events]
+                except KeyError:
+                    # Let get_field() raise the usual error
+                    values_list = [get_field(event, field_name) for event in self._events]
+                values = np.array(values_list)
+            self._columns[field_name] = values
+        return values
+
+    def _get_trace_column(
+        self,
+        field_name: str,
+    ) -> np.ndarray:
+        columns = self._trace_columns
+        values = columns.get(field_name, None)
+        present = columns.get(field_name + PRESENT_SUFFIX, None)
+        if values is None or (present is not None and not present.all()):
+            # Same error as get_field()
+            raise AttributeError(
+                f"event field '{field_name}' not found for event: {self._event_name}")
+        return values
 
 
 HandlerMethod = Callable[[DictEvent, EventMetadata], None]
 HandlerMap = Dict[str, HandlerMethod]
 HandlerMultimap = Dict[str, List[HandlerMethod]]
+BatchHandlerMethod = Callable[[EventBlock], None]
+BatchHandlerMap = Dict[str, BatchHandlerMethod]
+BatchHandlerMultimap = Dict[str, List[BatchHandlerMethod]]
 
 
 class Dependant():
@@ -119,12 +252,18 @@ class EventHandler(Dependant):
     Provides handling functions for some events, depending on the name. Passes that on to a data
     model. Should be subclassed, but it is not necessary since the handling functions can be
     anything; therefore it does not raise any error if it is directly instantiated.
+
+    Handling functions are either called once per event, or, for batch handling functions, once
+    per block of events with the same name (see `EventBlock`). Blocks for a given event name are
+    given in time order, but only once enough events have been collected, so batch handling
+    functions should not depend on the state of other handlers.
     """
 
     def __init__(
         self,
         *,
-        handler_map: HandlerMap,
+        handler_map: Optional[HandlerMap] = None,
+        batch_handler_map: Optional[BatchHandlerMap] = None,
         data_model: Optional[DataModel] = None,
         **kwargs,
     ) -> None:
@@ -132,12 +271,19 @@ class EventHandler(Dependant):
         Create an EventHandler.
 
         :param handler_map: the mapping from event name to handling method
+        :param batch_handler_map: the mapping from event name to batch handling method
         :param data_model: the data model
         """
-        assert handler_map is not None and len(handler_map) > 0, \
+        handler_map = handler_map or {}
+        batch_handler_map = batch_handler_map or {}
+        assert len(handler_map) > 0 or len(batch_handler_map) > 0, \
             f'empty map: {self.__class__.__name__}'
-        assert all(required_name in handler_map.keys() for required_name in self.required_events())
+        assert all(
+            required_name in handler_map.keys() or required_name in batch_handler_map.keys()
+            for required_name in self.required_events()
+        )
         self._handler_map = handler_map
+        self._batch_handler_map = batch_handler_map
         self._data_model = data_model
         self._processor: Optional[Processor] = None
 
@@ -146,6 +292,11 @@ class EventHandler(Dependant):
         """Get the handler functions map."""
         return self._handler_map
 
+    @property
+    def batch_handler_map(self) -> BatchHandlerMap:
+        """Get the batch handler functions map."""
+        return self._batch_handler_map
+
     @property
     def data(self) -> DataModel:
         """Get the data model."""
@@ -165,6 +316,18 @@ class EventHandler(Dependant):
         """
         return set()
 
+    @staticmethod
+    def keeps_metadata() -> bool:
+        """
+        Check if this EventHandler keeps references to the `EventMetadata` objects it is given.
+
+        If none of the handlers for a given event name keep references, the `Processor` updates and
+        re-uses a single `EventMetadata` object for all events with that name instead of creating
+        a new one for every event. Inheriting classes that only read the metadata while handling
+        an event should return `False`.
+        """
+        return True
+
     def register_processor(
         self,
         processor: 'Processor',
@@ -172,6 +335,15 @@ class EventHandler(Dependant):
         """Register processor with this `EventHandler` so that it can query other handlers."""
         self._processor = processor
 
+    def finalize(self) -> None:
+        """
+        Finalize the event handler.
+
+        This is called by the `Processor` once all events have been processed.
+        """
+        if self._data_model is not None:
+            self._data_model.finalize()
+
     @staticmethod
     def int_to_hex_str(addr: int) -> str:
         """Format an `int` into an hex `str`."""
@@ -180,13 +352,13 @@ class EventHandler(Dependant):
     @classmethod
     def process(
         cls,
-        events: List[DictEvent],
+        events: Iterable[DictEvent],
         **kwargs,
     ) -> 'EventHandler':
         """
         Create a `Processor` and process an instance of the class.
 
-        :param events: the list of events
+        :param events: the events, e.g. a list or an iterator
         :return: the processor object after processing
         """
         if cls == EventHandler:
@@ -302,6 +474,7 @@ class Processor():
         self,
         *handlers: EventHandler,
         quiet: bool = False,
+        batch_size: Optional[int] = None,
         **kwargs,
     ) -> None:
         """
@@ -309,6 +482,8 @@ class Processor():
 
         :param handlers: the `EventHandler`s to use for processing
         :param quiet: whether to not print any output, like progress information
+        :param batch_size: the number of events per block for batch handler functions, or `None`
+            for the default (see `BatchDispatchPlan`)
         :param kwargs: the parameters to pass on to new handlers
         """
         self._initial_handlers = list(handlers)
@@ -316,6 +491,14 @@ class Processor():
             raise RuntimeError('Must provide at least one handler!')
         self._expanded_handlers = self._expand_dependencies(*handlers, **kwargs)
         self._handler_multimap = self._get_handler_maps(self._expanded_handlers)
+        self._batch_handler_multimap = self._get_batch_handler_maps(self._expanded_handlers)
+        self._metadata_reuse_map = self._get_metadata_reuse_map(self._expanded_handlers)
+        self._dispatch_plans: Dict[str, Optional[DispatchPlan]] = {}
+        # Columnar trace being processed, if any, to give its columns to batch handler functions
+        self._trace: Optional[ColumnarTrace] = None
+        self._batch_size = batch_size if batch_size is not None \
+            else BatchDispatchPlan.DEFAULT_BATCH_SIZE
+        self._timestamp_begin: Optional[int] = None
         self._register_with_handlers(self._expanded_handlers)
         self._quiet = quiet
         self._progress_display = ProcessingProgressDisplay(
@@ -352,6 +535,40 @@ class Processor():
                 handler_multimap[event_name].append(handler_method)
         return handler_multimap
 
+    @staticmethod
+    def _get_batch_handler_maps(
+        handlers: List[EventHandler],
+    ) -> BatchHandlerMultimap:
+        """
+        Collect and merge `BatchHandlerMap`s from all events handlers into a multimap.
+
+        :param handlers: the list of handlers
+        :return: the merged multimap
+        """
+        batch_handler_multimap: BatchHandlerMultimap = defaultdict(list)
+        for handler in handlers:
+            for event_name, handler_method in handler.batch_handler_map.items():
+                batch_handler_multimap[event_name].append(handler_method)
+        return batch_handler_multimap
+
+    @staticmethod
+    def _get_metadata_reuse_map(
+        handlers: List[EventHandler],
+    ) -> Dict[str, bool]:
+        """
+        Check, for each event name, if the `EventMetadata` object can be re-used.
+
+        :param handlers: the list of handlers
+        :return: the map from event name to `True` if no handler for it keeps metadata references
+        """
+        reuse_map: Dict[str, bool] = {}
+        for handler in handlers:
+            for event_name in handler.handler_map.keys():
+                reuse_map[event_name] = (
+                    reuse_map.get(event_name, True) and not handler.keeps_metadata()
+                )
+        return reuse_map
+
     def _register_with_handlers(
         self,
         handlers: List[EventHandler],
@@ -364,6 +581,11 @@ class Processor():
         for handler in handlers:
             handler.register_processor(self)
 
+    @property
+    def timestamp_begin(self) -> Optional[int]:
+        """Get the timestamp of the first processed event, or `None` if there is none yet."""
+        return self._timestamp_begin
+
     def get_handler_by_type(
         self,
         handler_type: Type,
@@ -381,16 +603,26 @@ class Processor():
 
     @staticmethod
     def get_event_names(
-        events: List[DictEvent],
+        events: Iterable[DictEvent],
     ) -> Set[str]:
-        """Get set of names from a list of events."""
+        """
+        Get set of names from a list of events.
+
+        If the events come with the set of their names as an `event_names` attribute (e.g. when
+        loaded from a converted file with an event index), it is used directly.
+
+        :param events: the events
+        :return: the set of event names
+        """
+        event_names = getattr(events, 'event_names', None)
+        if event_names is not None:
+            return set(event_names)
         return {get_event_name(event) for event in events}
 
     def _check_required_events(
         self,
-        events: List[DictEvent],
+        event_names: Set[str],
     ) -> None:
-        event_names = self.get_event_names(events)
         # Check names separately so that we can know which event from which handler is missing
         missing_events: Dict[str, Set[str]] = defaultdict(set)
         for handler in self._expanded_handlers:
@@ -404,63 +636,111 @@ class Processor():
 
     def process(
         self,
-        events: List[DictEvent],
+        events: Iterable[DictEvent],
         erase_progress: bool = False,
-        no_required_events_check: bool = False
+        no_required_events_check: bool = False,
+        event_names: Optional[Set[str]] = None,
     ) -> None:
         """
         Process all events.
 
+        The events can be any iterable, e.g. a generator that loads them one at a time. If it is
+        not a collection and `event_names` is not provided, the check for required events can only
+        be done using the names of the events that were processed, once processing is done.
+
         :param events: the events to process
         :param erase_progress: whether to erase the progress message
         :param no_required_events_check: whether to skip the check for required events
+        :param event_names: the set of names of the events, if known (e.g. from a pre-scan)
         """
+        check_after_processing = False
         if not no_required_events_check:
-            self._check_required_events(events)
+            if event_names is not None:
+                self._check_required_events(event_names)
+            elif isinstance(events, Collection):
+                self._check_required_events(self.get_event_names(events))
+            else:
+                check_after_processing = True
 
         if not self._processing_done:
+            if isinstance(events, ColumnarTrace) and not self._dispatch_plans:
+                self._trace = events
             # Split into two versions so that performance is optimal
             if self._progress_display is None:
-                for event in events:
-                    self._process_event(event)
+                for index, event in enumerate(events):
+                    self._process_event(event, index)
             else:
-                self._progress_display.set_work_total(len(events))
-                for event in events:
-                    self._process_event(event)
+                self._progress_display.set_work_total(
+                    len(events) if isinstance(events, Sized) else None
+                )
+                for index, event in enumerate(events):
+                    self._process_event(event, index)
                     self._progress_display.did_work()
                 self._progress_display.done(erase=erase_progress)
+            self._flush_batches()
+            if check_after_processing:
+                # A dispatch plan is compiled for every event name that was processed
+                self._check_required_events(set(self._dispatch_plans.keys()))
+            self._finalize_processing()
             self._processing_done = True
 
-    def _process_event(self, event: DictEvent) -> None:
-        """Process a single event."""
+    def _flush_batches(self) -> None:
+        """Give the remaining blocks of events to batch handler functions."""
+        for dispatch_plan in self._dispatch_plans.values():
+            if isinstance(dispatch_plan, BatchDispatchPlan):
+                dispatch_plan.flush()
+
+    def _finalize_processing(self) -> None:
+        """Finalize all handlers and their data models."""
+        for handler in self._expanded_handlers:
+            handler.finalize()
+
+    def _process_event(self, event: DictEvent, index: int = 0) -> None:
+        """Process a single event, given its index among all processed events."""
         event_name = get_event_name(event)
+        try:
+            dispatch_plan = self._dispatch_plans[event_name]
+        except KeyError:
+            dispatch_plan = self._compile_dispatch_plan(event_name, event)
+            self._dispatch_plans[event_name] = dispatch_plan
+        if dispatch_plan is not None:
+            dispatch_plan.dispatch(event, index)
+
+    def _compile_dispatch_plan(
+        self,
+        event_name: str,
+        event: DictEvent,
+    ) -> Optional['DispatchPlan']:
+        """
+        Compile the dispatch plan for an event name.
+
+        :param event_name: the event name
+        :param event: the first event with that name
+        :return: the dispatch plan, or `None` if there is no handler for that event name
+        """
+        if self._timestamp_begin is None:
+            # No plan was compiled yet, so this is the first event
+            self._timestamp_begin = get_field(event, '_timestamp')
         handler_functions = self._handler_multimap.get(event_name, None)
-        if handler_functions is not None:
-            for handler_function in handler_functions:
-                timestamp = get_field(event, '_timestamp')
-                cpu_id = get_field(event, 'cpu_id')
-                # TODO perhaps validate fields depending on the type of event,
-                # i.e. all UST events should have procname, (v)pid and (v)tid
-                # context info, since analyses might not work otherwise
-                procname = get_field(event, 'procname', raise_if_not_found=False)
-                pid = get_field(
-                    event,
-                    'vpid',
-                    default=get_field(
-                        event,
-                        'pid',
-                        raise_if_not_found=False),
-                    raise_if_not_found=False)
-                tid = get_field(
-                    event,
-                    'vtid',
-                    default=get_field(
-                        event,
-                        'tid',
-                        raise_if_not_found=False),
-                    raise_if_not_found=False)
-                metadata = EventMetadata(event_name, timestamp, cpu_id, procname, pid, tid)
-                handler_function(event, metadata)
+        batch_handler_functions = self._batch_handler_multimap.get(event_name, None)
+        if batch_handler_functions is not None:
+            return BatchDispatchPlan(
+                event_name,
+                handler_functions or [],
+                batch_handler_functions,
+                event,
+                self._metadata_reuse_map.get(event_name, False),
+                batch_size=self._batch_size,
+                trace=self._trace,
+            )
+        if handler_functions is None:
+            return None
+        return DispatchPlan(
+            event_name,
+            handler_functions,
+            event,
+            self._metadata_reuse_map.get(event_name, False),
+        )
 
     def print_data(self) -> None:
         """Print processed data."""
@@ -469,6 +749,194 @@ class Processor():
                 handler.data.print_data()
 
 
+class DispatchPlan():
+    """
+    Plan for dispatching events with a given name to their handler functions.
+
+    It is compiled once per event name, using the first event with that name. Since all events
+    with the same name have the same fields, the keys for the optional context fields (e.g. vpid
+    or pid) are chosen once using that first event. The `EventMetadata` is then created once per
+    event and shared by all handler functions, or, if none of them keep a reference to it, a
+    single `EventMetadata` object is updated for every event.
+    """
+
+    def __init__(
+        self,
+        event_name: str,
+        handler_functions: List[HandlerMethod],
+        event: DictEvent,
+        reuse_metadata: bool = False,
+    ) -> None:
+        """
+        Create a DispatchPlan.
+
+        :param event_name: the event name
+        :param handler_functions: the handler functions for this event name
+        :param event: the first event with that name, used to choose the context field keys
+        :param reuse_metadata: whether to update a single `EventMetadata` object for all events
+        """
+        self._event_name = event_name
+        self._handler_functions = tuple(handler_functions)
+        self._metadata: Optional[EventMetadata] = \
+            EventMetadata(event_name, 0, 0) if reuse_metadata else None
+        # TODO perhaps validate fields depending on the type of event,
+        # i.e. all UST events should have procname, (v)pid and (v)tid
+        # context info, since analyses might not work otherwise
+        self._procname_key = self._choose_key(event, 'procname')
+        self._pid_key = self._choose_key(event, 'vpid', 'pid')
+        self._tid_key = self._choose_key(event, 'vtid', 'tid')
+
+    @staticmethod
+    def _choose_key(
+        event: DictEvent,
+        *keys: str,
+    ) -> Optional[str]:
+        """Get the first key with a value in the event, or `None` if none of them have one."""
+        return next((key for key in keys if event.get(key, None) is not None), None)
+
+    @property
+    def event_name(self) -> str:
+        return self._event_name
+
+    @property
+    def pid_key(self) -> Optional[str]:
+        return self._pid_key
+
+    @property
+    def tid_key(self) -> Optional[str]:
+        return self._tid_key
+
+    def dispatch(
+        self,
+        event: DictEvent,
+        index: int = 0,
+    ) -> None:
+        """
+        Create the event metadata and call all handler functions with it.
+
+        :param event: the event
+        :param index: the index of the event among all processed events
+        """
+        try:
+            timestamp = event['_timestamp']
+            cpu_id = event['cpu_id']
+        except KeyError:
+            # Let get_field() raise the usual error
+            timestamp = get_field(event, '_timestamp')
+            cpu_id = get_field(event, 'cpu_id')
+        procname_key = self._procname_key
+        pid_key = self._pid_key
+        tid_key = self._tid_key
+        procname = event.get(procname_key, None) if procname_key is not None else None
+        pid = event.get(pid_key, None) if pid_key is not None else None
+        tid = event.get(tid_key, None) if tid_key is not None else None
+        metadata = self._metadata
+        if metadata is None:
+            metadata = EventMetadata(self._event_name, timestamp, cpu_id, procname, pid, tid)
+        else:
+            metadata.timestamp = timestamp
+            metadata.cpu_id = cpu_id
+            metadata.procname = procname
+            metadata.pid = pid
+            metadata.tid = tid
+        for handler_function in self._handler_functions:
+            handler_function(event, metadata)
+
+
+class BatchDispatchPlan(DispatchPlan):
+    """
+    Plan for dispatching events with a given name to batch handler functions.
+
+    Events are collected and given to batch handler functions as an `EventBlock` once there are
+    `batch_size` events, and when processing is done. They are also dispatched one at a time to
+    the normal handler functions for the same event name, if any.
+
+    If the events come from a columnar trace, they are not collected: blocks are created from
+    slices of the columns of the trace, since the n-th event with a given name is the n-th value of
+    the columns for that name.
+    """
+
+    DEFAULT_BATCH_SIZE = 65536
+
+    def __init__(
+        self,
+        event_name: str,
+        handler_functions: List[HandlerMethod],
+        batch_handler_functions: List[BatchHandlerMethod],
+        event: DictEvent,
+        reuse_metadata: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        trace: Optional[ColumnarTrace] = None,
+    ) -> None:
+        """
+        Create a BatchDispatchPlan.
+
+        :param event_name: the event name
+        :param handler_functions: the handler functions for this event name
+        :param batch_handler_functions: the batch handler functions for this event name
+        :param event: the first event with that name, used to choose the context field keys
+        :param reuse_metadata: whether to update a single `EventMetadata` object for all events
+        :param batch_size: the number of events per block
+        :param trace: the columnar trace that is being processed from the start, if any
+        """
+        super().__init__(event_name, handler_functions, event, reuse_metadata)
+        self._batch_handler_functions = tuple(batch_handler_functions)
+        self._batch_size = batch_size
+        self._events: List[DictEvent] = []
+        self._indices = array('q')
+        self._trace = trace
+        # Range of the events of the current block in the columns of the trace
+        self._block_start = 0
+        self._block_stop = 0
+
+    def dispatch(
+        self,
+        event: DictEvent,
+        index: int = 0,
+    ) -> None:
+        if self._handler_functions:
+            super().dispatch(event, index)
+        if self._trace is not None:
+            self._block_stop += 1
+            if self._block_stop - self._block_start >= self._batch_size:
+                self.flush()
+            return
+        events = self._events
+        events.append(event)
+        self._indices.append(index)
+        if len(events) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Give the collected events to the batch handler functions, if there are any."""
+        if self._trace is not None:
+            start = self._block_start
+            stop = self._block_stop
+            if start == stop:
+                return
+            block = EventBlock(
+                self._event_name,
+                columns={
+                    field_name: values[start:stop]
+                    for field_name, values in self._trace.get_columns(self._event_name).items()
+                },
+                indices=self._trace.get_indices(self._event_name)[start:stop],
+            )
+            self._block_start = stop
+        else:
+            if not self._events:
+                return
+            block = EventBlock(
+                self._event_name,
+                self._events,
+                indices=np.frombuffer(self._indices, dtype=np.int64),
+            )
+            self._events = []
+            self._indices = array('q')
+        for batch_handler_function in self._batch_handler_functions:
+            batch_handler_function(block)
+
+
 class AutoProcessor():
     """
     Automatic processor, which takes a list of events and enables all relevant handlers.
@@ -488,11 +956,13 @@ class AutoProcessor():
         :param events: the list of events to process
         :param kwargs: the kwargs to provide when instanciating EventHandler subclasses
         """
-        self.handlers = self.get_applicable_event_handlers(events)
+        # Only get the event names once
+        event_names = Processor.get_event_names(events)
+        self.handlers = self._get_applicable_event_handlers_from_names(event_names)
         Processor(
             *self.handlers,
             **kwargs,
-        ).process(events)
+        ).process(events, event_names=event_names)
 
     def print_data(self) -> None:
         """Print data models of all handlers."""
@@ -509,7 +979,14 @@ class AutoProcessor():
         :param events: the list of events
         :return: the concrete EventHandler instances which are applicable
         """
-        event_names = Processor.get_event_names(events)
+        return AutoProcessor._get_applicable_event_handlers_from_names(
+            Processor.get_event_names(events),
+        )
+
+    @staticmethod
+    def _get_applicable_event_handlers_from_names(
+        event_names: Set[str],
+    ) -> List[EventHandler]:
         # Force import of all processor submodules (i.e. files) so that we can find all
         # EventHandler subclasses
         AutoProcessor._import_event_handler_submodules()
@@ -596,6 +1073,9 @@ class AutoProcessor():
 class ProcessingProgressDisplay():
     """Display processing progress periodically on stdout."""
 
+    # Number of units of work between updates when the total is not known
+    UNKNOWN_TOTAL_DISPLAY_PERIOD = 100000
+
     def __init__(
         self,
         processing_elements: List[str],
@@ -606,24 +1086,26 @@ class ProcessingProgressDisplay():
         :param processing_elements: the list of elements doing processing
         """
         self.__info_string = '[' + ', '.join(processing_elements) + ']'
-        self.__total_work: int = 0
+        self.__total_work: Optional[int] = 0
         self.__progress_count: int = 0
         self.__rolling_count: int = 0
         self.__work_display_period: int = 0
 
     def set_work_total(
         self,
-        total: int,
+        total: Optional[int],
     ) -> None:
         """
         Set the total units of work.
 
-        :param total: the total number of units of work to do
+        :param total: the total number of units of work to do, or `None` if it is not known
         """
         self.__total_work = total
         self.__progress_count = 0
         self.__rolling_count = 0
-        self.__work_display_period = total // 100
+        self.__work_display_period = (
+            total // 100 if total is not None else self.UNKNOWN_TOTAL_DISPLAY_PERIOD
+        )
         self._update()
 
     def did_work(
@@ -644,14 +1126,18 @@ class ProcessingProgressDisplay():
 
     def _get_progress_message(
         self,
-        percentage: float,
+        percentage: Optional[float],
     ) -> str:
+        if percentage is None:
+            return f' [{self.__progress_count}] {self.__info_string}'
         return f' [{percentage:2.0f}%] {self.__info_string}'
 
     def _update(
         self,
     ) -> None:
-        percentage = 100.0 * (float(self.__progress_count) / float(self.__total_work))
+        percentage = None
+        if self.__total_work is not None:
+            percentage = 100.0 * (float(self.__progress_count) / float(self.__total_work))
         sys.stdout.write(self._get_progress_message(percentage) + '\r')
 
     def done(
@@ -663,7 +1149,11 @@ class ProcessingProgressDisplay():
 
         :param erase: whether to erase the progress message
         """
+        if self.__total_work is None:
+            # Display the final count
+            self._update()
         if erase:
             # Write spaces over progress message to "erase" it
-            sys.stdout.write(len(self._get_progress_message(100.0)) * ' ' + '\r')
+            percentage = 100.0 if self.__total_work is not None else None
+            sys.stdout.write(len(self._get_progress_message(percentage)) * ' ' + '\r')
         sys.stdout.write('\n')
@@ -15,13 +15,14 @@
 """Module for CPU time events processing."""
 
 from typing import Dict
+from typing import Optional
 from typing import Set
 
-from tracetools_read import get_field
+import numpy as np
 
+from . import BatchHandlerMap
+from . import EventBlock
 from . import EventHandler
-from . import EventMetadata
-from . import HandlerMap
 from ..data_model.cpu_time import CpuTimeDataModel
 
 
@@ -29,25 +30,44 @@ class CpuTimeHandler(EventHandler):
     """
     Handler that extracts data for CPU time.
 
-    It extracts timestamps from sched_switch events to later compute CPU time per thread.
+    It extracts timestamps from sched_switch events to later compute CPU time per thread. Events
+    are handled in blocks: they are grouped by CPU, and durations are computed for a whole block
+    at once as the difference between consecutive timestamps on the same CPU.
+
+    Optionally, the thread running on a CPU before its first sched_switch event is accounted for
+    from the beginning of the trace. Otherwise, the first sched_switch event of each CPU is only
+    used as the start of the next slice.
     """
 
     def __init__(
         self,
+        *,
+        timestamp_begin: Optional[int] = None,
+        use_trace_begin: bool = False,
         **kwargs,
     ) -> None:
-        """Create a CpuTimeHandler."""
-        # Link event to handling method
-        handler_map: HandlerMap = {
+        """
+        Create a CpuTimeHandler.
+
+        :param timestamp_begin: the timestamp of the beginning of the trace, used as the start of
+            the first slice on each CPU, or `None`
+        :param use_trace_begin: whether to use the timestamp of the first event given to the
+            processor as the beginning of the trace, if `timestamp_begin` is `None`
+        """
+        # Link event to batch handling method
+        batch_handler_map: BatchHandlerMap = {
             'sched_switch':
-                self._handle_sched_switch,
+                self._handle_sched_switch_block,
         }
         super().__init__(
-            handler_map=handler_map,
+            batch_handler_map=batch_handler_map,
             data_model=CpuTimeDataModel(),
             **kwargs,
         )
 
+        self._timestamp_begin = timestamp_begin
+        self._use_trace_begin = use_trace_begin
+
         # Temporary buffers
         # cpu_id -> start timestamp of the running thread
         self._cpu_start: Dict[int, int] = {}
@@ -58,22 +78,52 @@ class CpuTimeHandler(EventHandler):
             'sched_switch',
         }
 
+    @staticmethod
+    def keeps_metadata() -> bool:
+        return False
+
     @property
     def data(self) -> CpuTimeDataModel:
         return super().data  # type: ignore
 
-    def _handle_sched_switch(
-        self, event: Dict, metadata: EventMetadata
+    def _handle_sched_switch_block(
+        self, block: EventBlock
     ) -> None:
-        timestamp = metadata.timestamp
-        cpu_id = metadata.cpu_id
-        # Process if there is a previous thread timestamp
-        # TODO instead of discarding it, use first ever timestamp
-        # of the trace (with TraceCollection.timestamp_begin)
-        prev_timestamp = self._cpu_start.get(cpu_id, None)
-        if prev_timestamp is not None:
-            prev_tid = get_field(event, 'prev_tid')
-            duration = timestamp - prev_timestamp
-            self.data.add_duration(prev_tid, prev_timestamp, duration, cpu_id)
-        # Set start timestamp of next thread
-        self._cpu_start[cpu_id] = timestamp
+        timestamps = block.timestamp.astype(np.int64)
+        cpu_ids = block.cpu_id.astype(np.int64)
+        prev_tids = block.get_field('prev_tid').astype(np.int64)
+
+        # Group by CPU, keeping the time order in each group
+        order = np.argsort(cpu_ids, kind='stable')
+        timestamps = timestamps[order]
+        cpu_ids = cpu_ids[order]
+        prev_tids = prev_tids[order]
+        group_starts = np.ones(len(cpu_ids), dtype=np.bool_)
+        group_starts[1:] = cpu_ids[1:] != cpu_ids[:-1]
+        group_ends = np.roll(group_starts, -1)
+
+        # The running thread started at the previous switch on the same CPU
+        start_timestamps = np.roll(timestamps, 1)
+        # For the first switch on each CPU, it started at the last switch of the previous block,
+        # or at the beginning of the trace if requested
+        timestamp_begin = self._timestamp_begin
+        if timestamp_begin is None and self._use_trace_begin and self.processor is not None:
+            timestamp_begin = self.processor.timestamp_begin
+        head_start_timestamps = [
+            self._cpu_start.get(cpu_id, timestamp_begin)
+            for cpu_id in cpu_ids[group_starts].tolist()
+        ]
+        valid = np.ones(len(cpu_ids), dtype=np.bool_)
+        valid[group_starts] = [timestamp is not None for timestamp in head_start_timestamps]
+        start_timestamps[group_starts] = [timestamp or 0 for timestamp in head_start_timestamps]
+        self._cpu_start.update(zip(cpu_ids[group_ends].tolist(), timestamps[group_ends].tolist()))
+
+        # Add durations in the original order
+        time_order = np.argsort(order[valid], kind='stable')
+        start_timestamps = start_timestamps[valid][time_order]
+        self.data.add_durations(
+            prev_tids[valid][time_order],
+            start_timestamps,
+            timestamps[valid][time_order] - start_timestamps,
+            cpu_ids[valid][time_order],
+        )
@@ -15,10 +15,14 @@
 """Module for memory usage events processing."""
 
 from typing import Dict
+from typing import Optional
 from typing import Set
 
+import numpy as np
 from tracetools_read import get_field
 
+from . import BatchHandlerMap
+from . import EventBlock
 from . import EventHandler
 from . import EventMetadata
 from . import HandlerMap
@@ -39,6 +43,10 @@ class MemoryUsageHandler(EventHandler):
             **kwargs,
         )
 
+    @staticmethod
+    def keeps_metadata() -> bool:
+        return False
+
     @property
     def data(self) -> MemoryUsageDataModel:
         return super().data  # type: ignore
@@ -46,9 +54,11 @@ class MemoryUsageHandler(EventHandler):
     def _update(
         self,
         timestamp: int,
-        tid: int,
+        tid: Optional[int],
         memory_difference: int,
     ) -> None:
+        if tid is None:
+            tid = MemoryUsageDataModel.UNKNOWN_TID
         # Add to data model
         self.data.add_memory_difference(timestamp, tid, memory_difference)
 
@@ -190,6 +200,8 @@ class KernelMemoryUsageHandler(MemoryUsageHandler):
         * kmem_mm_page_alloc
         * kmem_mm_page_free
 
+    Events are handled in blocks.
+
     Implementation inspired by Trace Compass' implementation:
     https://git.eclipse.org/c/tracecompass/org.eclipse.tracecompass.git/tree/analysis/org.eclipse.tracecompass.analysis.os.linux.core/src/org/eclipse/tracecompass/analysis/os/linux/core/kernelmemoryusage/KernelMemoryStateProvider.java#n84
     """
@@ -200,15 +212,15 @@ class KernelMemoryUsageHandler(MemoryUsageHandler):
         self,
         **kwargs,
     ) -> None:
-        # Link event to handling method
-        handler_map: HandlerMap = {
+        # Link event to batch handling method
+        batch_handler_map: BatchHandlerMap = {
             'kmem_mm_page_alloc':
-                self._handle_malloc,
+                self._handle_malloc_block,
             'kmem_mm_page_free':
-                self._handle_free,
+                self._handle_free_block,
         }
         super().__init__(
-            handler_map=handler_map,
+            batch_handler_map=batch_handler_map,
             **kwargs,
         )
 
@@ -219,26 +231,26 @@ class KernelMemoryUsageHandler(MemoryUsageHandler):
             'kmem_mm_page_free',
         }
 
-    def _handle_malloc(
-        self, event: Dict, metadata: EventMetadata
+    def _handle_malloc_block(
+        self, block: EventBlock
     ) -> None:
-        self._handle(event, metadata, self.PAGE_SIZE)
+        self._handle_block(block, self.PAGE_SIZE)
 
-    def _handle_free(
-        self, event: Dict, metadata: EventMetadata
+    def _handle_free_block(
+        self, block: EventBlock
     ) -> None:
-        self._handle(event, metadata, -self.PAGE_SIZE)
+        self._handle_block(block, -self.PAGE_SIZE)
 
-    def _handle(
+    def _handle_block(
         self,
-        event: Dict,
-        metadata: EventMetadata,
+        block: EventBlock,
         inc: int,
     ) -> None:
-        order = get_field(event, 'order')
-        inc <<= order
-
-        timestamp = metadata.timestamp
-        tid = metadata.tid
-
-        self._update(timestamp, tid, inc)
+        orders = block.get_field('order').astype(np.int64)
+        incs = np.left_shift(np.int64(inc), orders)
+        tids = block.tid
+        if tids is None:
+            tids = np.full(len(block), MemoryUsageDataModel.UNKNOWN_TID, dtype=np.int64)
+
+        # Alloc and free blocks are not given in trace order
+        self.data.add_memory_differences(block.timestamp, tids, incs, block.index)
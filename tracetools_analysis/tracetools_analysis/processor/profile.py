@@ -95,6 +95,10 @@ class ProfileHandler(EventHandler):
             'sched_switch',
         }
 
+    @staticmethod
+    def keeps_metadata() -> bool:
+        return False
+
     @property
     def data(self) -> ProfileDataModel:
         return super().data  # type: ignore
@@ -83,7 +83,8 @@ class Ros2Handler(EventHandler):
         )
 
         # Temporary buffers
-        self._callback_instances: Dict[int, Tuple[Dict, EventMetadata]] = {}
+        # callback object -> (callback_start event, start timestamp)
+        self._callback_instances: Dict[int, Tuple[Dict, int]] = {}
 
     @staticmethod
     def required_events() -> Set[str]:
@@ -91,6 +92,10 @@ class Ros2Handler(EventHandler):
             'ros2:rcl_init',
         }
 
+    @staticmethod
+    def keeps_metadata() -> bool:
+        return False
+
     @property
     def data(self) -> Ros2DataModel:
         return super().data  # type: ignore
@@ -222,7 +227,7 @@ class Ros2Handler(EventHandler):
     ) -> None:
         # Add to dict
         callback_addr = get_field(event, 'callback')
-        self._callback_instances[callback_addr] = (event, metadata)
+        self._callback_instances[callback_addr] = (event, metadata.timestamp)
 
     def _handle_callback_end(
         self, event: Dict, metadata: EventMetadata,
@@ -231,13 +236,13 @@ class Ros2Handler(EventHandler):
         callback_object = get_field(event, 'callback')
         callback_instance_data = self._callback_instances.get(callback_object)
         if callback_instance_data is not None:
-            (event_start, metadata_start) = callback_instance_data
+            (event_start, timestamp_start) = callback_instance_data
             del self._callback_instances[callback_object]
-            duration = metadata.timestamp - metadata_start.timestamp
+            duration = metadata.timestamp - timestamp_start
             is_intra_process = get_field(event_start, 'is_intra_process', raise_if_not_found=False)
             self.data.add_callback_instance(
                 callback_object,
-                metadata_start.timestamp,
+                timestamp_start,
                 duration,
                 bool(is_intra_process))
         else:
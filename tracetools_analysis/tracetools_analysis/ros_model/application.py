@@ -1,5 +1,9 @@
+import numpy as np
+import pandas as pd
+
 from tracetools_analysis.utils.ros2 import Ros2DataModelUtil
 from tracetools_analysis.loading import load_file
+from tracetools_analysis.processor import Processor
 from tracetools_analysis.processor.ros2 import Ros2Handler
 
 from .util import Util, DataFrameFilter, Counter
@@ -9,9 +13,7 @@ from .callback import SubscribeCallback, TimerCallback, Callback
 from .publish import Publish
 from .search_tree import SearchTree, Path, PathCollection
 from .data_type import Timeseries
-
-import pandas as pd
-import numpy as np
+from .instances import RuntimeInstancesHandler
 
 
 class End2End(Path):
@@ -56,6 +58,8 @@ class Application():
         self.comm_instances = None
         self._filter = DataFrameFilter()
         self._time_converter = None
+        # (events, instances extracted from them)
+        self._runtime_instances = None
 
     @property
     def paths(self):
@@ -125,7 +129,19 @@ class Application():
 
         self.events = events
 
-        handler = Ros2Handler.process(events)
+        # Extract the ROS 2 data and the runtime instances in a single pass over the events
+        handler = Ros2Handler()
+        instances_handler = RuntimeInstancesHandler()
+        processor = Processor(handler, instances_handler)
+        # Runtime instances are optional, so only the events required by Ros2Handler are checked
+        missing_events = handler.required_events() - processor.get_event_names(events)
+        if missing_events:
+            raise Processor.RequiredEventNotFoundError(
+                f'missing events: {{{handler.__class__.__name__!r}: {missing_events}}}'
+            )
+        processor.process(events, no_required_events_check=True)
+        Ros2Handler.check_processed(handler)
+        self._runtime_instances = (events, instances_handler.data)
 
         self.data_util = Ros2DataModelUtil(handler.data)
         self._insert_runtime_data(self.data_util, self.nodes)
@@ -202,11 +218,14 @@ class Application():
                 callback.timeseries = Timeseries(callback_durations, time, clock)
 
     def _import_comm_instances(self, instances):
+        if len(self.comms) == 0:
+            return
+        # (publish object, subscribe object) -> positions of its instances
+        comm_indices = instances.groupby(['publish_object', 'subscribe_object']).indices
         for comm in self.comms:
             objects = comm.get_objects()
-            duration_records = instances[
-                (instances['publish_object'] == objects['publish']) &
-                (instances['subscribe_object'] == objects['subscribe'])]
+            duration_records = instances.iloc[
+                comm_indices.get((objects['publish'], objects['subscribe']), [])]
 
             if len(duration_records) == 0:
                 print(f'Failed to calculate {comm.topic_name} latency.'
@@ -219,19 +238,17 @@ class Application():
             dds = comm.child[0]
             dds.timeseries = Timeseries(duration_records['communication_latency'].values, time, clock)
 
-    def get_publish_instances(self, events):
-        publish_instances = pd.DataFrame(columns=[
-            'timestamp',
-            'stamp',
-            'publisher_handle'])
+    def _get_runtime_instances(self, events):
+        # Re-use the instances extracted while importing the trace if possible
+        if self._runtime_instances is None or self._runtime_instances[0] is not events:
+            instances_handler = RuntimeInstancesHandler()
+            # Callers might only need some of the instances, and missing ones are just empty
+            Processor(instances_handler).process(events, no_required_events_check=True)
+            self._runtime_instances = (events, instances_handler.data)
+        return self._runtime_instances[1]
 
-        for event in events:
-            if event['_name'] == 'ros2:rclcpp_publish':
-                data = {
-                    'timestamp': event['_timestamp'],
-                    'publisher_handle': event['publisher_handle']
-                }
-                publish_instances = publish_instances.append(data, ignore_index=True)
+    def get_publish_instances(self, events):
+        publish_instances = self._get_runtime_instances(events).publish_instances
 
         publish_instances = pd.merge(publish_instances,  self.data_util.get_publish_info() , on='publisher_handle')
         publish_instances.reset_index(inplace=True, drop=True)
@@ -240,22 +257,7 @@ class Application():
         return publish_instances
 
     def get_subscribe_instances(self, events):
-        subscribe_instances = pd.DataFrame(columns=[
-            'timestamp',
-            'stamp',
-            'callback_object',
-            'source_stamp',
-            'received_stamp'])
-
-        for event in events:
-            if event['_name'] == 'ros2:rclcpp_subscribe':
-                data = {
-                    'timestamp': event['_timestamp'],
-                    'callback_object': event['callback'],
-                    'source_stamp': event['source_stamp'],
-                    'received_stamp': event['received_stamp']
-                }
-                subscribe_instances = subscribe_instances.append(data, ignore_index=True)
+        subscribe_instances = self._get_runtime_instances(events).subscribe_instances
 
         subscribe_instances = pd.merge(subscribe_instances,  self.data_util.get_subscribe_info(), on='callback_object')
         subscribe_instances.reset_index(inplace=True, drop=True)
@@ -263,155 +265,94 @@ class Application():
         return subscribe_instances
 
     def _get_comm_instances(self, events, comms):
+        if len(comms) == 0:
+            return []
         publish_instances = self.get_publish_instances(events)
         subscribe_instances = self.get_subscribe_instances(events)
 
-        comm_instances = [self._get_specific_comm_instances(comm,
-                                                  publish_instances,
-                                                  subscribe_instances) \
-                          for comm in comms]
-        if len(comm_instances) > 0:
-            comm_instances = pd.concat(comm_instances)
-        return comm_instances
-
-    def _get_specific_comm_instances(self, comm, publish_df, subscribe_df):
-        assert isinstance(publish_df, pd.DataFrame)
-        assert isinstance(subscribe_df, pd.DataFrame)
-        assert len(publish_df) > 0
-        assert len(subscribe_df) > 0
-
-        obj = comm.get_objects()
-        publish_object = obj['publish']
-        subscribe_object = obj['subscribe']
-
-        comm_instances = pd.DataFrame(columns=['publish_object',
-                                               'subscribe_object',
-                                               'timestamp',
-                                               'duration'])
-
-        # filter specific records
-        publish_df_ = publish_df[publish_df['publisher_handle'] == publish_object]
-        publish_df_.reset_index(inplace=True, drop=True)
-
-        subscribe_df_ = subscribe_df[subscribe_df['callback_object'] == subscribe_object]
-        subscribe_df_.reset_index(inplace=True, drop=True)
-
-        if len(publish_df_) == 0 or len(subscribe_df_) == 0:
-            return comm_instances
-
-        for i, subscribe_record in subscribe_df_.iterrows():
-
-            duration_ns = None
-            communication_latency_ns = None
-
-            duration_ns = subscribe_record['timestamp'] - subscribe_record['source_stamp']
-            communication_latency_ns = subscribe_record['received_stamp'] - subscribe_record['source_stamp']
-
-            data = {
-                'timestamp': subscribe_record['timestamp'],
-                'publish_object': publish_object,
-                'subscribe_object': subscribe_object,
-                'duration': duration_ns,
-                'communication_latency': communication_latency_ns
-            }
-            comm_instances = comm_instances.append(data, ignore_index=True)
-
-        # remove last records if values are NaN
-
-        valid_messages_df = comm_instances[comm_instances['duration'] != None]
-        last_valid_idx = valid_messages_df.index[-1]
-        comm_instances = comm_instances.iloc[:last_valid_idx+1]
-
-        return comm_instances
-
-    def _get_specific_sched_instances(self, sched, callback_end_instances, callback_start_instances):
-        sched_instances = pd.DataFrame(columns=[
+        assert len(publish_instances) > 0
+        assert len(subscribe_instances) > 0
+
+        # Only keep communications with a publisher that published at least once
+        comm_objects = pd.DataFrame(
+            [(comm.get_objects()['publish'], comm.get_objects()['subscribe']) for comm in comms],
+            columns=['publish_object', 'subscribe_object'])
+        published = comm_objects['publish_object'].isin(publish_instances['publisher_handle'])
+        comm_objects = comm_objects[published]
+
+        # Compute durations and latencies for all communications at once
+        subscribe_instances = subscribe_instances[
+            ['timestamp', 'callback_object', 'source_stamp', 'received_stamp']]
+        comm_instances = comm_objects.reset_index().merge(
+            subscribe_instances, left_on='subscribe_object', right_on='callback_object')
+        # Keep instances in the order of the communications
+        comm_instances.sort_values('index', kind='stable', ignore_index=True, inplace=True)
+        comm_instances['duration'] = \
+            comm_instances['timestamp'] - comm_instances['source_stamp']
+        comm_instances['communication_latency'] = \
+            comm_instances['received_stamp'] - comm_instances['source_stamp']
+        return comm_instances[[
+            'publish_object',
+            'subscribe_object',
             'timestamp',
-            'callback_in_object',
-            'callback_out_object',
-            'duration'])
-
-        start_instances = callback_start_instances[
-            callback_start_instances['callback_out_object'] == sched.callback_out.object]
-        end_instances = callback_end_instances[
-            callback_end_instances['callback_in_object'] == sched.callback_in.object]
-
-        start_instances = start_instances.assign(instance_type='start')
-        end_instances = end_instances.assign(instance_type='end')
-
-        start_instances.drop('callback_out_object', axis=1)
-        end_instances.drop('callback_in_object', axis=1, inplace=True)
-
-        assert len(end_instances) > 0
-        assert len(start_instances) > 0
-
-        instances = pd.concat([start_instances, end_instances]).sort_values('timestamp')
-        instances.reset_index(drop=True, inplace=True)
-
-        instances_list = list(instances.itertuples())
-        for row_, row in zip(instances_list[:-1], instances_list[1:]):
-            if row_.instance_type == 'end' and row.instance_type == 'start':
-                duration = row.timestamp - row_.timestamp
-                data = {
-                    'timestamp': row_.timestamp,
-                    'callback_in_object': sched.callback_in.object,
-                    'callback_out_object': sched.callback_out.object,
-                    'duration': duration
-                }
-                sched_instances = sched_instances.append(data, ignore_index=True)
-        return sched_instances
+            'duration',
+            'communication_latency']]
 
     def _get_callback_end_instances(self, events):
-        callback_end_instances = pd.DataFrame(columns=[
-            'timestamp',
-            'callback_in_object'])
-
-        for event in events:
-            if event['_name'] == 'ros2:callback_end':
-                data = {
-                    'timestamp': event['_timestamp'],
-                    'callback_in_object': event['callback']
-                }
-                callback_end_instances = callback_end_instances.append(data, ignore_index=True)
-
-        return callback_end_instances
+        return self._get_runtime_instances(events).callback_end_instances
 
     def _get_callback_start_instances(self, events):
-        callback_start_instances = pd.DataFrame(columns=[
-            'timestamp',
-            'callback_out_object'])
-
-        for event in events:
-            if event['_name'] == 'ros2:callback_start':
-                data = {
-                    'timestamp': event['_timestamp'],
-                    'callback_out_object': event['callback']
-                }
-                callback_start_instances = callback_start_instances.append(data, ignore_index=True)
-
-        return callback_start_instances
+        return self._get_runtime_instances(events).callback_start_instances
 
     def _get_sched_instances(self, events, scheds):
         callback_end_instances = self._get_callback_end_instances(events)
         callback_start_instances = self._get_callback_start_instances(events)
 
-        sched_instances = [
-            self._get_specific_sched_instances(sched, callback_end_instances, callback_start_instances)
-            for sched in scheds]
-
-        if len(sched_instances) > 0:
-          sched_instances = pd.concat(sched_instances)
-
-        return sched_instances
-
+        if len(scheds) == 0:
+            return []
+
+        sched_objects = pd.DataFrame(
+            [(sched.callback_in.object, sched.callback_out.object) for sched in scheds],
+            columns=['callback_in_object', 'callback_out_object'])
+        sched_objects['sched'] = np.arange(len(sched_objects))
+        end_instances = sched_objects[['sched', 'callback_in_object']].merge(
+            callback_end_instances, on='callback_in_object')
+        start_instances = sched_objects[['sched', 'callback_out_object']].merge(
+            callback_start_instances, on='callback_out_object')
+        assert sched_objects['sched'].isin(end_instances['sched']).all()
+        assert sched_objects['sched'].isin(start_instances['sched']).all()
+
+        # Sort the end and start instances of all scheds by sched, then by timestamp, with ends
+        # first for equal timestamps, and match each end with the start that directly follows it
+        sched_index = np.concatenate(
+            (end_instances['sched'].values, start_instances['sched'].values))
+        timestamps = np.concatenate(
+            (end_instances['timestamp'].values, start_instances['timestamp'].values))
+        is_start = np.arange(len(timestamps)) >= len(end_instances)
+        order = np.lexsort((is_start, timestamps, sched_index))
+        sched_index = sched_index[order]
+        timestamps = timestamps[order]
+        is_start = is_start[order]
+        matches = np.flatnonzero(
+            ~is_start[:-1] & is_start[1:] & (sched_index[:-1] == sched_index[1:]))
+
+        sched_instances = sched_objects.iloc[sched_index[matches]].reset_index(drop=True)
+        sched_instances.insert(0, 'timestamp', timestamps[matches])
+        sched_instances['duration'] = timestamps[matches + 1] - timestamps[matches]
+        return sched_instances[[
+            'timestamp',
+            'callback_in_object',
+            'callback_out_object',
+            'duration']]
 
     def _import_sched_durations(self, sched_instances):
+        if len(self.scheds) == 0:
+            return
+        sched_indices = sched_instances.groupby(
+            ['callback_in_object', 'callback_out_object']).indices
         for sched in self.scheds:
-            duration_records = sched_instances[
-                (sched_instances['callback_in_object'] == sched.callback_in.object) &
-                (sched_instances['callback_out_object']
-                 == sched.callback_out.object)
-            ]
+            duration_records = sched_instances.iloc[sched_indices.get(
+                (sched.callback_in.object, sched.callback_out.object), [])]
             duration_raw = duration_records['duration'].values
             time = duration_records['timestamp'].values
             clock = None if self._time_converter is None \
@@ -2,8 +2,7 @@ import collections.abc
 
 from .search_tree import Path
 from .publish import Publish
-
-import numpy as np
+from .util import Util
 
 class CallbackCollectionIterator(collections.abc.Iterator):
     def __init__(self, callback_collection):
@@ -106,14 +105,9 @@ class Callback():
     def get_info(self):
         pass
 
-    def get_stats(self):
-        data = {
-            'unit': 'ms',
-            'min': np.min(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'max': np.max(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'median': np.median(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'mean': np.mean(self.timeseries.raw_nan_removed * 1.0e-6)
-        }
+    def get_stats(self, use_sketch=False):
+        data = {'unit': 'ms'}
+        data.update(Util.get_stats_from_timeseries(self.timeseries, use_sketch))
         return data
 
 
@@ -145,16 +139,11 @@ class CallbackPath(Path):
             return ''
         return self._callback.topic_name
 
-    def get_stats(self):
-        data = {
-            'unit': 'ms',
-            'min': np.min(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'max': np.max(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'median': np.median(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'mean': np.mean(self.timeseries.raw_nan_removed) * 1.0e-6,
-            'send': len(self.timeseries.raw),
-            'lost': len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
-        }
+    def get_stats(self, use_sketch=False):
+        data = {'unit': 'ms'}
+        data.update(Util.get_stats_from_timeseries(self.timeseries, use_sketch))
+        data['send'] = len(self.timeseries.raw)
+        data['lost'] = len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
         return data
 
 
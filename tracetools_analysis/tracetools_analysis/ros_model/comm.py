@@ -1,12 +1,10 @@
 import collections.abc
 
-from .search_tree import Path
-from .node import NodePath, Node
-from .util import Counter
 from .callback import SubscribeCallback
+from .node import Node, NodePath
 from .publish import Publish
-
-import numpy as np
+from .search_tree import Path
+from .util import Counter, Util
 
 class DDS(Path):
     counter = Counter()
@@ -25,7 +23,7 @@ class DDS(Path):
         self._index = self.counter.get_count(self, self.topic_name)
         self._unique_name = '{}_dds_{}'.format(self.topic_name, self._index)
 
-    def get_stats(self):
+    def get_stats(self, use_sketch=False):
         data = {
             'unit': 'ms',
             'min': None,
@@ -39,10 +37,7 @@ class DDS(Path):
         if len(self.timeseries.raw_nan_removed) == 0:
             return data
 
-        data['min'] = np.min(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['max'] = np.max(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['median'] = np.median(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['mean'] = np.mean(self.timeseries.raw_nan_removed) * 1.0e-6
+        data.update(Util.get_stats_from_timeseries(self.timeseries, use_sketch))
         data['send'] = len(self.timeseries.raw)
         data['lost'] = len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
 
@@ -74,7 +69,7 @@ class Comm(Path):
     def get_objects(self):
         return {'publish': self.publish.object, 'subscribe': self.cb_sub.object}
 
-    def get_stats(self):
+    def get_stats(self, use_sketch=False):
         data = {
             'unit': 'ms',
             'min': None,
@@ -88,10 +83,7 @@ class Comm(Path):
         if len(self.timeseries.raw_nan_removed) == 0:
             return data
 
-        data['min'] = np.min(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['max'] = np.max(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['median'] = np.median(self.timeseries.raw_nan_removed) * 1.0e-6
-        data['mean'] = np.mean(self.timeseries.raw_nan_removed) * 1.0e-6
+        data.update(Util.get_stats_from_timeseries(self.timeseries, use_sketch))
         data['send'] = len(self.timeseries.raw)
         data['lost'] = len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
 
@@ -1,18 +1,53 @@
 import numpy as np
-from .util import Util
+
+
+# Size of the smaller histogram above which histograms are convolved with FFT
+FFT_CONVOLVE_MIN_SIZE = 1024
+
+
+def _convolve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if min(len(a), len(b)) < FFT_CONVOLVE_MIN_SIZE:
+        return np.convolve(a, b)
+
+    size = len(a) + len(b) - 1
+    fft_size = 1 << (size - 1).bit_length()
+
+    def fft_convolve(x, y):
+        return np.fft.irfft(np.fft.rfft(x, fft_size) * np.fft.rfft(y, fft_size), fft_size)[:size]
+
+    # Keep exactly the bins that can be reached, so that rounding errors neither show up as
+    # latencies nor remove latencies with a probability below them
+    convolved = fft_convolve(a, b)
+    reachable = fft_convolve(a > 0, b > 0) > 0.5
+    return np.where(reachable, np.maximum(convolved, np.finfo(np.float64).tiny), 0)
+
 
 class Histogram:
     pass
 
 class Histogram:
+    """
+    Histogram of latencies, with bins of `binsize_ns`.
+
+    Only the occupied range is stored, i.e. the values from the bin of the minimum latency to the
+    bin of the maximum latency, along with the index of the first bin.
+    """
+
     __normalize = True
 
-    def __init__(self, raw: np.array, binsize_ns=1):
+    def __init__(self, raw: np.array, binsize_ns=1, offset=0):
+        """
+        Create a Histogram.
+
+        :param raw: the value of each bin, starting from bin `offset`
+        :param binsize_ns: the size of the bins
+        :param offset: the index of the bin of the first value
+        """
         binsize_ns = int(binsize_ns)
         self._binsize_ns = binsize_ns
-        raw = np.trim_zeros(raw, 'b')
-        raw = np.append(raw, 0)
-        self._latencies, self._hists = self._divide(raw)
+        occupied = np.flatnonzero(raw > 0)
+        self._offset = offset + occupied[0]
+        self._values = np.asarray(raw[occupied[0]:occupied[-1] + 1], dtype=np.float64)
 
     @classmethod
     def normalize(cls, use):
@@ -20,144 +55,289 @@ class Histogram:
 
     @classmethod
     def sum(cls, histgrams):
-        hist = Histogram(histgrams[0].raw, binsize_ns=histgrams[0].binsize_ns)
-        for histgram in histgrams[1:]:
-            hist = hist + histgram
-        return hist
+        if len(histgrams) == 1:
+            return Histogram(
+                histgrams[0].values,
+                binsize_ns=histgrams[0].binsize_ns,
+                offset=histgrams[0].offset)
+
+        # Add histograms pairwise, so that long paths do not keep adding small histograms to an
+        # ever larger one
+        hists = list(histgrams)
+        while len(hists) > 1:
+            hists = [
+                hists[i] + hists[i + 1] if i + 1 < len(hists) else hists[i]
+                for i in range(0, len(hists), 2)]
+        return hists[0]
 
     def __add__(self, hist: Histogram):
-        import itertools
         assert self.binsize_ns == hist.binsize_ns, f'{self.binsize_ns}, {hist.binsize_ns}'
-        
-        def add_latencies(latency1, latency2):
-            latency_min = min(latency1) + min(latency2)
-            latency_max = max(latency1) + max(latency2)+1
-            return np.arange(latency_min, latency_max + self._binsize_ns, self._binsize_ns)
-        
-        hist_pairs = list(itertools.product(self._hists, hist._hists))
-        latency_pairs = list(itertools.product(self._latencies, hist._latencies))
-
-        hists = [0] * len(hist_pairs)
-        latencies = [0] * len(latency_pairs)
-        for i, (hist_pair, latency_pair) in enumerate(zip(hist_pairs, latency_pairs)):
-            hist = np.convolve(hist_pair[0], hist_pair[1])/2.0
-            hist = np.append(hist, 0)
-            hist[1:] += hist[:-1]
-            hists[i] = hist
-            latencies[i] = add_latencies(latency_pair[0], latency_pair[1])
-            
-        return self.__class__(self._to_raw(latencies, hists), binsize_ns=self._binsize_ns)
-    
+
+        values = _convolve(self.values, hist.values) / 2.0
+        # A latency in bin i plus a latency in bin j is in bin i + j or i + j + 1
+        values = np.append(values, 0)
+        values[1:] += values[:-1].copy()
+
+        return self.__class__(
+            values, binsize_ns=self._binsize_ns, offset=self._offset + hist._offset)
+
     @property
     def binsize_ns(self):
         return self._binsize_ns
-    
+
+    @property
+    def offset(self):
+        """Get the index of the first occupied bin."""
+        return self._offset
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get the (normalized) values of the occupied bins, starting from bin `offset`."""
+        if Histogram.__normalize:
+            sum = np.sum(self._values)
+            assert sum != 0
+            return self._values / sum
+        return self._values
+
     @property
     def raw(self) -> np.ndarray:
-        return self._to_raw(self._latencies, self._hists)
-    
+        """Get the values of all bins from 0, followed by an empty bin."""
+        return np.concatenate((np.zeros(self._offset), self.values, [0]))
+
     @property
     def latency(self):
         return self._get_latency_ms()
-    
+
     def get_xy(self):
         return self._get_latency_ms(), self._get_hist()
-    
-    def _divide(self, raw):
-        idx = np.where(raw > 0)[0]
-        idx_diff = idx[1:] - idx[:-1]
-
-        idx_split = np.where(idx_diff > 1)[0]+1
-
-        indicies = np.array(np.split(idx, idx_split))
-
-        latencies = self._to_latency(indicies)
-        hist = np.array([raw[_] for _ in indicies])
-
-        return latencies, hist
-    
-    def _to_latency(self, index):
-        return index * self._binsize_ns
-    
-    def _to_index(self, latency):
-        return int(latency / self._binsize_ns)
-    
-    def _to_raw(self, latencies, hists):
-        max_latency = np.max(Util.flatten(latencies))
-        array_size = self._to_index(max_latency)+2
-        raw = np.zeros(array_size)
-        
-        for hist, latency in zip(hists, latencies):
-            idx_min = self._to_index(np.min(latency))
-            idx_max = self._to_index(np.max(latency))+1
-            raw[idx_min:idx_max]+=hist
-            
-        if Histogram.__normalize:
-            sum = np.sum(raw)
-            assert(sum != 0)
-            return raw / sum
-        
-        return raw
-    
+
+    def _get_xy_start(self):
+        # Start from the empty bin before the first occupied bin, if any
+        return max(0, self._offset - 1)
+
     def _get_latency_ms(self):
-        array_size = self._to_index(np.max(Util.flatten(self._latencies))) + 2
-        indicies = np.arange(array_size)
-        latencies_ns = np.array([self._to_latency(_) for _ in indicies])
-        
-        offset = max(0, self._to_index(np.min(Util.flatten(self._latencies)))-1)
-        return latencies_ns[offset:] * 1.0e-6
-    
+        indicies = np.arange(self._get_xy_start(), self._offset + len(self._values) + 1)
+        return indicies * self._binsize_ns * 1.0e-6
+
     def _get_hist(self):
-        raw = self._to_raw(self._latencies, self._hists)
-        
-        min_idx = np.min(np.where(raw>0)[0])
-        min_idx = min_idx-1 if min_idx>0 else min_idx
-        
-        return raw[min_idx:]
+        return np.concatenate((
+            np.zeros(self._offset - self._get_xy_start()),
+            self.values,
+            [0],
+        ))
+
+
+# Relative accuracy of the quantiles given by the sketch of a timeseries
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+
+class _SketchBuckets:
+    """Counts of contiguous sketch buckets, starting from bucket `offset`."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, keys: np.ndarray, counts=None):
+        if len(keys) == 0:
+            return
+        offset = np.min(keys)
+        end = np.max(keys) + 1
+        if len(self.counts) > 0:
+            offset = min(offset, self.offset)
+            end = max(end, self.offset + len(self.counts))
+        merged = np.bincount(keys - offset, weights=counts, minlength=end - offset)
+        merged = merged.astype(np.int64)
+        merged[self.offset - offset:self.offset - offset + len(self.counts)] += self.counts
+        self.offset = offset
+        self.counts = merged
+
+    def merge(self, buckets):
+        keys = np.arange(buckets.offset, buckets.offset + len(buckets.counts))
+        self.add(keys, buckets.counts)
+
+
+class QuantileSketch:
+    """
+    Mergeable sketch of a distribution, which gives quantiles with a bounded relative error.
+
+    Values are counted in logarithmic buckets (like DDSketch), so its size only depends on the
+    range of the values, not on their number.
+    """
+
+    # Values closer to 0 are counted as 0
+    MIN_VALUE = 1.0e-9
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        """
+        Create a QuantileSketch.
+
+        :param relative_accuracy: the maximum relative error of the quantiles
+        """
+        assert 0 < relative_accuracy < 1, relative_accuracy
+        self._relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        self._positive = _SketchBuckets()
+        self._negative = _SketchBuckets()
+        self._zero_count = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+
+    @classmethod
+    def sum(cls, sketches):
+        sketch = sketches[0]
+        for sketch_ in sketches[1:]:
+            sketch = sketch + sketch_
+        return sketch
+
+    def __add__(self, sketch):
+        assert self._relative_accuracy == sketch._relative_accuracy, \
+            f'{self._relative_accuracy}, {sketch._relative_accuracy}'
+        merged = self.__class__(self._relative_accuracy)
+        for sketch_ in (self, sketch):
+            merged._positive.merge(sketch_._positive)
+            merged._negative.merge(sketch_._negative)
+            merged._zero_count += sketch_._zero_count
+            merged._count += sketch_._count
+            merged._sum += sketch_._sum
+            merged._min = min(merged._min, sketch_._min)
+            merged._max = max(merged._max, sketch_._max)
+        return merged
+
+    @property
+    def relative_accuracy(self):
+        return self._relative_accuracy
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def min(self):
+        return self._min
+
+    @property
+    def max(self):
+        return self._max
+
+    @property
+    def mean(self):
+        if self._count == 0:
+            return np.nan
+        return self._sum / self._count
+
+    def add(self, values: np.ndarray):
+        """
+        Add values (which must not be NaN) to the sketch.
+
+        :param values: the values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self._count += len(values)
+        self._sum += np.sum(values)
+        self._min = min(self._min, np.min(values))
+        self._max = max(self._max, np.max(values))
+        self._zero_count += np.count_nonzero(np.abs(values) < self.MIN_VALUE)
+        self._positive.add(self._get_keys(values[values >= self.MIN_VALUE]))
+        self._negative.add(self._get_keys(-values[values <= -self.MIN_VALUE]))
+
+    def get_quantile(self, quantile: float) -> float:
+        """
+        Get a quantile of the values.
+
+        :param quantile: the quantile, between 0 and 1
+        :return: the value, or NaN if the sketch is empty
+        """
+        assert 0 <= quantile <= 1, quantile
+        if self._count == 0:
+            return np.nan
+        if quantile == 0:
+            return self._min
+        if quantile == 1:
+            return self._max
+
+        rank = quantile * (self._count - 1)
+        negative_count = np.sum(self._negative.counts)
+        if rank < negative_count:
+            # Negative buckets, from the largest absolute value
+            counts = np.cumsum(self._negative.counts[::-1])
+            key = self._negative.offset + len(counts) - 1 - np.searchsorted(counts, rank, 'right')
+            value = -self._get_value(key)
+        elif rank < negative_count + self._zero_count:
+            value = 0.0
+        else:
+            counts = np.cumsum(self._positive.counts)
+            rank -= negative_count + self._zero_count
+            key = self._positive.offset + np.searchsorted(counts, rank, 'right')
+            value = self._get_value(key)
+        return min(max(value, self._min), self._max)
+
+    def _get_keys(self, values):
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _get_value(self, key):
+        # Middle of the bucket, relative to its bounds
+        return 2.0 * self._gamma ** key / (self._gamma + 1)
+
 
 class Timeseries:
     def __init__(self, raw: np.array, time: np.array, clock=None):
         self.__raw = raw
+        self.__raw_nan_removed = None
         self._time = time
         self._clock = clock
+        self.__sketch = None
 
     @classmethod
     def sum(cls, timeseries):
-        import pandas as pd
-
-        child_dfs = []
-
+        # A path may go through the same timeseries more than once
+        unique_children = []
+        unique_index = {}
+        child_unique = []
         for child in timeseries:
-            child_dfs.append(pd.DataFrame(data={
-                'timestamp': child.time,
-                'latency': child.raw,
-                'clock': child.clock,
-                'object': child
-            }))
+            if id(child) not in unique_index:
+                unique_index[id(child)] = len(unique_children)
+                unique_children.append(child)
+            child_unique.append(unique_index[id(child)])
 
-        path_df = pd.concat(child_dfs).sort_values('timestamp')
+        first_record_stamp = np.max([child.time[0] for child in unique_children])
+        first_latencies = [
+            child.raw[np.flatnonzero(child.time <= first_record_stamp)[-1]]
+            for child in unique_children]
 
-        first_record_stamp = np.max([df.timestamp[0] for df in child_dfs])
-        first_records_df = [df[df['timestamp'] <= first_record_stamp]
-                            for df in child_dfs]
-        first_record_df = [df.iloc[-1, :] for df in first_records_df]
+        # Records of all children, sorted by timestamp and tagged with their child index
+        timestamp = np.concatenate([child.time for child in timeseries])
+        record_latency = np.concatenate([child.raw for child in timeseries])
+        record_child = np.repeat(child_unique, [len(child.time) for child in timeseries])
+        order = np.argsort(timestamp, kind='stable')
+        order = order[timestamp[order] >= first_record_stamp]
+        timestamp = timestamp[order]
+        record_latency = record_latency[order].astype(np.float64)
+        record_child = record_child[order]
 
-        target_path_df = path_df[path_df['timestamp'] >= first_record_stamp]
-        target_path_df.reset_index(drop=True, inplace=True)
+        # Latency of each child at every record, i.e. the latency of its last record so far
+        record_index = np.arange(len(timestamp))
+        child_latencies = []
+        for i, first_latency in enumerate(first_latencies):
+            last_record = np.where(record_child == i, record_index, -1)
+            np.maximum.accumulate(last_record, out=last_record)
+            child_latencies.append(np.where(
+                last_record >= 0, record_latency[last_record], first_latency))
 
-        latency = np.zeros(len(target_path_df))
+        latency = np.zeros(len(timestamp))
+        for i in child_unique:
+            latency += child_latencies[i]
 
-        child_latencies = np.array([_.latency for _ in first_record_df])
-
-        for i, row in target_path_df.iterrows():
-            for j, child in enumerate(timeseries):
-                if row['object'] == child:
-                    child_latencies[j] = row['latency']
-            latency[i] = np.sum(child_latencies)
-
-        timestamp = target_path_df['timestamp'].values
-        has_clock = (target_path_df['clock'].values != None).all()
-        clock = target_path_df['timestamp'].values if has_clock else None
+        has_clock = all(
+            child.clock is not None
+            for i, child in enumerate(unique_children)
+            if (record_child == i).any())
+        clock = timestamp if has_clock else None
 
         return Timeseries(latency, timestamp, clock)
 
@@ -167,7 +347,20 @@ class Timeseries:
 
     @property
     def raw_nan_removed(self) -> np.ndarray:
-        return np.array([_ for _ in self.__raw if not np.isnan(_)])
+        if self.__raw_nan_removed is None:
+            raw = np.asarray(self.__raw)
+            if raw.dtype == object:
+                raw = raw.astype(np.float64)
+            self.__raw_nan_removed = raw[~np.isnan(raw)]
+        return self.__raw_nan_removed
+
+    @property
+    def sketch(self) -> QuantileSketch:
+        """Get a quantile sketch of the latencies, which is created on first access."""
+        if self.__sketch is None:
+            self.__sketch = QuantileSketch()
+            self.__sketch.add(self.raw_nan_removed)
+        return self.__sketch
 
     @property
     def time(self):
@@ -185,8 +378,10 @@ class Timeseries:
 
     def to_hist(self, binsize_ns):
         raw = self.raw_nan_removed / binsize_ns
-        bins = int(np.ceil(np.max(raw))) + 1
+        # Only count the bins from the minimum latency
+        raw = raw[raw >= 0]
+        offset = int(np.floor(np.min(raw)))
+        bins = int(np.ceil(np.max(raw))) + 1 - offset
         assert bins < 10000000, 'too large bin size.'
-        range_max = int(np.ceil(np.max(raw))) + 1
-        hist_raw, _ = np.histogram(raw, bins=bins, range=(0, range_max))
-        return Histogram(hist_raw, binsize_ns=binsize_ns)
+        hist_raw = np.bincount(np.floor(raw).astype(np.int64) - offset, minlength=bins)
+        return Histogram(hist_raw, binsize_ns=binsize_ns, offset=offset)
@@ -0,0 +1,137 @@
+from typing import Set
+
+import numpy as np
+
+from tracetools_analysis.data_model import DataModel
+from tracetools_analysis.data_model.storage import ColumnStorage
+from tracetools_analysis.processor import EventHandler
+
+
+class RuntimeInstancesDataModel(DataModel):
+    """
+    Publish, subscribe, and callback start/end instances used by the application model.
+
+    Rows are collected in typed column buffers, and the DataFrames are created on first access.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._publish_storage = ColumnStorage({
+            'timestamp': np.int64,
+            'publisher_handle': np.int64,
+        })
+        self._subscribe_storage = ColumnStorage({
+            'timestamp': np.int64,
+            'callback_object': np.int64,
+            'source_stamp': np.int64,
+            'received_stamp': np.int64,
+        })
+        self._callback_start_storage = ColumnStorage({
+            'timestamp': np.int64,
+            'callback_out_object': np.int64,
+        })
+        self._callback_end_storage = ColumnStorage({
+            'timestamp': np.int64,
+            'callback_in_object': np.int64,
+        })
+
+    @property
+    def publish_instances(self):
+        df = self._publish_storage.to_dataframe()
+        df.insert(1, 'stamp', np.nan)
+        return df
+
+    @property
+    def subscribe_instances(self):
+        df = self._subscribe_storage.to_dataframe()
+        df.insert(1, 'stamp', np.nan)
+        return df
+
+    @property
+    def callback_start_instances(self):
+        return self._callback_start_storage.to_dataframe()
+
+    @property
+    def callback_end_instances(self):
+        return self._callback_end_storage.to_dataframe()
+
+    def add_publish_instances(self, timestamps, publisher_handles):
+        self._publish_storage.extend(timestamps, publisher_handles)
+
+    def add_subscribe_instances(
+            self, timestamps, callback_objects, source_stamps, received_stamps):
+        self._subscribe_storage.extend(
+            timestamps, callback_objects, source_stamps, received_stamps)
+
+    def add_callback_start_instances(self, timestamps, callback_objects):
+        self._callback_start_storage.extend(timestamps, callback_objects)
+
+    def add_callback_end_instances(self, timestamps, callback_objects):
+        self._callback_end_storage.extend(timestamps, callback_objects)
+
+    def print_data(self):
+        print('==================RUNTIME INSTANCES DATA MODEL==================')
+        tail = 20
+        for name in ['publish', 'subscribe', 'callback_start', 'callback_end']:
+            print(f'{name} instances (tail={tail}):')
+            print(getattr(self, f'{name}_instances').tail(tail).to_string())
+        print('================================================================')
+
+
+class RuntimeInstancesHandler(EventHandler):
+    """
+    Handler that extracts the instances needed by `Application`, in the same pass as `Ros2Handler`.
+
+    It uses the following events:
+        * ros2:rclcpp_publish
+        * ros2:rclcpp_subscribe
+        * ros2:callback_start
+        * ros2:callback_end
+    """
+
+    def __init__(self, **kwargs):
+        batch_handler_map = {
+            'ros2:rclcpp_publish':
+                self._handle_rclcpp_publish_block,
+            'ros2:rclcpp_subscribe':
+                self._handle_rclcpp_subscribe_block,
+            'ros2:callback_start':
+                self._handle_callback_start_block,
+            'ros2:callback_end':
+                self._handle_callback_end_block,
+        }
+        super().__init__(
+            batch_handler_map=batch_handler_map,
+            data_model=RuntimeInstancesDataModel(),
+            **kwargs,
+        )
+
+    @staticmethod
+    def required_events() -> Set[str]:
+        return {
+            'ros2:rclcpp_publish',
+            'ros2:rclcpp_subscribe',
+            'ros2:callback_start',
+            'ros2:callback_end',
+        }
+
+    @property
+    def data(self) -> RuntimeInstancesDataModel:
+        return super().data  # type: ignore
+
+    def _handle_rclcpp_publish_block(self, block):
+        self.data.add_publish_instances(
+            block.timestamp, block.get_field('publisher_handle'))
+
+    def _handle_rclcpp_subscribe_block(self, block):
+        self.data.add_subscribe_instances(
+            block.timestamp,
+            block.get_field('callback'),
+            block.get_field('source_stamp'),
+            block.get_field('received_stamp'))
+
+    def _handle_callback_start_block(self, block):
+        self.data.add_callback_start_instances(block.timestamp, block.get_field('callback'))
+
+    def _handle_callback_end_block(self, block):
+        self.data.add_callback_end_instances(block.timestamp, block.get_field('callback'))
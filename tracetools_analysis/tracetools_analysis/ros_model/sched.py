@@ -1,8 +1,8 @@
 import collections.abc
-import numpy as np
 
 from .callback import Callback, CallbackPath
 from .search_tree import Path
+from .util import Util
 
 class SchedCollectionIterator(collections.abc.Iterator):
     def __init__(self, sched_collection):
@@ -77,14 +77,9 @@ class Sched(Path):
         self.callback_out = callback_out
         self._unique_name = '{}--{}'.format(self.callback_in.name, self.callback_out.name)
 
-    def get_stats(self):
-        data = {
-            'unit': 'ms',
-            'min': np.min(self.timeseries.raw_nan_removed)*1.0e-6,
-            'max': np.max(self.timeseries.raw_nan_removed)*1.0e-6,
-            'median': np.median(self.timeseries.raw_nan_removed)*1.0e-6,
-            'mean': np.mean(self.timeseries.raw_nan_removed)*1.0e-6,
-            'send': len(self.timeseries.raw),
-            'lost': len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
-        }
+    def get_stats(self, use_sketch=False):
+        data = {'unit': 'ms'}
+        data.update(Util.get_stats_from_timeseries(self.timeseries, use_sketch))
+        data['send'] = len(self.timeseries.raw)
+        data['lost'] = len(self.timeseries.raw)-len(self.timeseries.raw_nan_removed)
         return data
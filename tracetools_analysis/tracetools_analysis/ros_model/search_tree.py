@@ -37,11 +37,19 @@ class SearchTree():
 
 
 class Path(SearchNode):
+    # Incremented whenever the timeseries or the child of any path is set, so that the timeseries
+    # and histograms computed from the children are not used anymore
+    _generation = 0
+
     def __init__(self, child=[]):
         super().__init__()
 
         self._hist = None
         self._timeseries = None
+        # (generation, timeseries computed from the children)
+        self._computed_timeseries = None
+        # (generation, histograms by binsize_ns)
+        self._computed_hists = None
         self.child = child
         self._alias_name = None
         self._unique_name = None
@@ -71,8 +79,17 @@ class Path(SearchNode):
     @child.setter
     def child(self, child):
         self._child = child
+        Path._generation += 1
 
     def hist(self, binsize_ns=1):
+        if self._computed_hists is None or self._computed_hists[0] != Path._generation:
+            self._computed_hists = (Path._generation, {})
+        hists = self._computed_hists[1]
+        if binsize_ns not in hists:
+            hists[binsize_ns] = self._compute_hist(binsize_ns)
+        return hists[binsize_ns]
+
+    def _compute_hist(self, binsize_ns):
         if self._timeseries is not None:
             return self._timeseries.to_hist(binsize_ns)
 
@@ -87,13 +104,20 @@ class Path(SearchNode):
             return self._timeseries
 
         if len(self.child) > 0:
-            return Timeseries.sum([_.timeseries for _ in self.child])
+            if self._computed_timeseries is None or \
+                    self._computed_timeseries[0] != Path._generation:
+                self._computed_timeseries = (
+                    Path._generation,
+                    Timeseries.sum([_.timeseries for _ in self.child]),
+                )
+            return self._computed_timeseries[1]
 
         return self._timeseries
 
     @timeseries.setter
     def timeseries(self, timeseries):
         self._timeseries = timeseries
+        Path._generation += 1
 
     def has_hist(self, child):
         for path in child:
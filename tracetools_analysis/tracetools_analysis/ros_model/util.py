@@ -1,6 +1,12 @@
 import os
+
+import numpy as np
 import pandas as pd
 
+# Percentiles given by the stats of a timeseries, when using its quantile sketch
+SKETCH_PERCENTILES = [50, 90, 99, 99.9]
+
+
 class Util():
     @classmethod
     def flatten(cls, x):
@@ -43,6 +49,28 @@ class Util():
         }
         return stats
 
+    @classmethod
+    def get_stats_from_timeseries(cls, timeseries, use_sketch=False):
+        if not use_sketch:
+            latencies = timeseries.raw_nan_removed
+            return {
+                'min': np.min(latencies) * 1.0e-6,
+                'max': np.max(latencies) * 1.0e-6,
+                'median': np.median(latencies) * 1.0e-6,
+                'mean': np.mean(latencies) * 1.0e-6,
+            }
+
+        sketch = timeseries.sketch
+        stats = {
+            'min': sketch.min * 1.0e-6,
+            'max': sketch.max * 1.0e-6,
+            'median': sketch.get_quantile(0.5) * 1.0e-6,
+            'mean': sketch.mean * 1.0e-6,
+        }
+        for percentile in SKETCH_PERCENTILES:
+            stats[f'p{percentile:g}'] = sketch.get_quantile(percentile / 100) * 1.0e-6
+        return stats
+
 
 class DataFrameFilter():
 
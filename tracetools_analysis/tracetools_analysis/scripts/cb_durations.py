@@ -46,16 +46,14 @@ def main():
     handler = Ros2Handler.process(events)
     du = Ros2DataModelUtil(handler.data)
 
-    stat_data = []
-    for ptr, name in du.get_callback_symbols().items():
-        durations = du.get_callback_durations(ptr)['duration']
-        stat_data.append((
-            durations.count(),
-            durations.sum(),
-            durations.mean(),
-            durations.std(),
-            format_fn(name),
-        ))
-
-    stat_df = pd.DataFrame(columns=['Count', 'Sum', 'Mean', 'Std', 'Name'], data=stat_data)
+    stats = du.get_callback_duration_stats(percentiles=[])
+    # Only keep callbacks with a symbol
+    stats = stats[stats['symbol'].notna()]
+    stat_df = pd.DataFrame({
+        'Count': stats['count'],
+        'Sum': stats['sum'],
+        'Mean': stats['mean'],
+        'Std': stats['std'],
+        'Name': stats['symbol'].map(format_fn),
+    }).reset_index(drop=True)
     print(stat_df.sort_values(by='Sum', ascending=False).to_string())
@@ -14,13 +14,13 @@
 
 """Module for data model utility classes."""
 
-from datetime import datetime as dt
 from typing import List
 from typing import Optional
 from typing import Union
 
 import numpy as np
 from pandas import DataFrame
+from pandas import to_datetime
 
 from ..data_model import DataModel
 from ..processor import EventHandler
@@ -65,21 +65,17 @@ class DataModelUtil():
         :return: the resulting `DataFrame`
         """
         if not isinstance(columns_ns_to_ms, list):
-            columns_ns_to_ms = list(columns_ns_to_ms)
+            columns_ns_to_ms = [columns_ns_to_ms]
         if not isinstance(columns_ns_to_datetime, list):
-            columns_ns_to_datetime = list(columns_ns_to_datetime)
+            columns_ns_to_datetime = [columns_ns_to_datetime]
 
         df = original if inplace else original.copy()
-        # Convert from ns to ms
-        if len(columns_ns_to_ms) > 0:
-            df[columns_ns_to_ms] = df[columns_ns_to_ms].applymap(
-                lambda t: t / 1000000.0 if not np.isnan(t) else t
-            )
-        # Convert from ns to ms + ms to datetime, as UTC
-        if len(columns_ns_to_datetime) > 0:
-            df[columns_ns_to_datetime] = df[columns_ns_to_datetime].applymap(
-                lambda t: dt.utcfromtimestamp(t / 1000000000.0) if not np.isnan(t) else t
-            )
+        # Convert from ns to ms, keeping NaN values
+        for column in columns_ns_to_ms:
+            df[column] = df[column].astype(np.float64) / 1000000.0
+        # Convert from ns to naive datetime (UTC), with NaN values becoming NaT
+        for column in columns_ns_to_datetime:
+            df[column] = to_datetime(df[column], unit='ns')
         return df
 
     @staticmethod
@@ -97,4 +93,4 @@ class DataModelUtil():
         :param right_column: the name of the right column
         :param diff_column: the name of the new column with differences
         """
-        df[diff_column] = df.apply(lambda row: row[left_column] - row[right_column], axis=1)
+        df[diff_column] = df[left_column] - df[right_column]
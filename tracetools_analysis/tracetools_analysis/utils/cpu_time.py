@@ -16,7 +16,9 @@
 
 from typing import Union
 
+import numpy as np
 from pandas import DataFrame
+from pandas import Index
 
 from . import DataModelUtil
 from ..data_model.cpu_time import CpuTimeDataModel
@@ -43,4 +45,14 @@ class CpuTimeDataModelUtil(DataModelUtil):
 
     def get_time_per_thread(self) -> DataFrame:
         """Get a DataFrame of total duration for each thread."""
-        return self.data.times.loc[:, ['tid', 'duration']].groupby(by='tid').sum()
+        times = self.data.times
+        tids = times['tid'].to_numpy(dtype=np.int64)
+        durations = times['duration'].to_numpy(dtype=np.int64)
+        # Sum durations over runs of the same thread ID
+        order = np.argsort(tids, kind='stable')
+        tids = tids[order]
+        run_starts = np.flatnonzero(np.r_[True, tids[1:] != tids[:-1]]) if len(tids) else []
+        return DataFrame(
+            data={'duration': np.add.reduceat(durations[order], run_starts).astype(np.int64)},
+            index=Index(tids[run_starts], name='tid'),
+        )
@@ -14,12 +14,12 @@
 
 """Module for memory usage data model utils."""
 
-from collections import defaultdict
 from typing import Dict
-from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
+import numpy as np
 from pandas import DataFrame
 
 from . import DataModelUtil
@@ -82,32 +82,29 @@ class MemoryUsageDataModelUtil(DataModelUtil):
 
         :return dataframe with maximum memory usage (userspace & kernel) per tid
         """
-        tids_ust = None
-        tids_kernel = None
-        ust_memory_usage_dfs = self.get_absolute_userspace_memory_usage_by_tid()
-        if ust_memory_usage_dfs is not None:
-            tids_ust = set(ust_memory_usage_dfs.keys())
-        kernel_memory_usage_dfs = self.get_absolute_kernel_memory_usage_by_tid()
-        if kernel_memory_usage_dfs is not None:
-            tids_kernel = set(kernel_memory_usage_dfs.keys())
+        max_ust = None
+        max_kernel = None
+        if self.data_ust is not None:
+            max_ust = self._get_max_memory_usage_by_tid(self.data_ust)
+        if self.data_kernel is not None:
+            max_kernel = self._get_max_memory_usage_by_tid(self.data_kernel)
         # Use only the userspace tid values if available, otherwise use the kernel tid values
-        tids = tids_ust or tids_kernel
+        tids = (set(max_ust.keys()) if max_ust is not None else None) or \
+            (set(max_kernel.keys()) if max_kernel is not None else None)
         # Should not happen, since it is checked in __init__
         if tids is None:
             raise RuntimeError('no data')
         data = [
             [
                 tid,
-                self.format_size(ust_memory_usage_dfs[tid]['memory_usage'].max(), precision=1)
-                if ust_memory_usage_dfs is not None
-                and ust_memory_usage_dfs.get(tid) is not None
+                self.format_size(max_ust[tid], precision=1)
+                if max_ust is not None and tid in max_ust
                 else None,
-                self.format_size(kernel_memory_usage_dfs[tid]['memory_usage'].max(), precision=1)
-                if kernel_memory_usage_dfs is not None
-                and kernel_memory_usage_dfs.get(tid) is not None
+                self.format_size(max_kernel[tid], precision=1)
+                if max_kernel is not None and tid in max_kernel
                 else None,
             ]
-            for tid in tids
+            for tid in sorted(tids)
         ]
         return DataFrame(data, columns=['tid', 'max_memory_usage_ust', 'max_memory_usage_kernel'])
 
@@ -131,34 +128,66 @@ class MemoryUsageDataModelUtil(DataModelUtil):
             return None
         return self._get_absolute_memory_usage_by_tid(self.data_kernel)
 
+    @staticmethod
+    def _get_memory_usage_by_tid(
+        data_model: MemoryUsageDataModel,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compute the memory usage after each memory difference, grouped by tid.
+
+        :param data_model: the data model
+        :return:
+            the tids, timestamps, memory differences, and memory usage after each difference,
+            sorted by tid (and in time order for each tid),
+            and the index of the first difference of each tid
+        """
+        memory_diff = data_model.memory_diff
+        tids = memory_diff['tid'].to_numpy(dtype=np.int64)
+        order = np.argsort(tids, kind='stable')
+        tids = tids[order]
+        timestamps = memory_diff['timestamp'].to_numpy(dtype=np.int64)[order]
+        diffs = memory_diff['memory_diff'].to_numpy(dtype=np.int64)[order]
+        starts = np.flatnonzero(np.r_[True, tids[1:] != tids[:-1]]) if len(tids) \
+            else np.empty(0, dtype=np.intp)
+        # Cumulative sum, restarting from 0 for each tid
+        usage = np.cumsum(diffs)
+        group_offsets = usage[starts] - diffs[starts]
+        usage -= np.repeat(group_offsets, np.diff(np.r_[starts, len(tids)]))
+        return tids, timestamps, diffs, usage, starts
+
+    def _get_max_memory_usage_by_tid(
+        self,
+        data_model: MemoryUsageDataModel,
+    ) -> Dict[int, int]:
+        tids, _, _, usage, starts = self._get_memory_usage_by_tid(data_model)
+        if len(tids) == 0:
+            return {}
+        # Memory usage starts from 0 for each tid
+        max_usage = np.maximum(np.maximum.reduceat(usage, starts), 0)
+        return dict(zip(tids[starts].tolist(), max_usage.tolist()))
+
     def _get_absolute_memory_usage_by_tid(
         self,
         data_model: MemoryUsageDataModel,
     ) -> Dict[int, DataFrame]:
-        previous: Dict[int, int] = defaultdict(int)
-        data: Dict[int, List[Dict[str, int]]] = defaultdict(list)
-        for index, row in data_model.memory_diff.iterrows():
-            timestamp = row['timestamp']
-            tid = int(row['tid'])
-            diff = row['memory_diff']
-            previous_value = previous[tid]
-            next_value = previous_value + diff
-            data[tid].append({
-                'timestamp': timestamp,
-                'tid': tid,
-                'memory_usage': previous_value,
-            })
-            data[tid].append({
-                'timestamp': timestamp,
-                'tid': tid,
-                'memory_usage': next_value,
-            })
-            previous[tid] = next_value
+        tids, timestamps, diffs, usage, starts = self._get_memory_usage_by_tid(data_model)
+        # Two steps per difference: memory usage before and after it
+        step_timestamps = np.repeat(timestamps, 2)
+        step_tids = np.repeat(tids, 2)
+        step_usage = np.column_stack((usage - diffs, usage)).ravel()
+        ends = np.r_[starts[1:], len(tids)]
         return {
             tid: self.convert_time_columns(
-                DataFrame(data[tid], columns=['timestamp', 'tid', 'memory_usage']),
+                DataFrame(
+                    data={
+                        'timestamp': step_timestamps[2 * start:2 * end],
+                        'tid': step_tids[2 * start:2 * end],
+                        'memory_usage': step_usage[2 * start:2 * end],
+                    },
+                    columns=['timestamp', 'tid', 'memory_usage'],
+                ),
                 columns_ns_to_datetime=['timestamp'],
                 inplace=True,
             )
-            for tid in data
+            for tid, start, end in zip(tids[starts].tolist(), starts.tolist(), ends.tolist())
         }
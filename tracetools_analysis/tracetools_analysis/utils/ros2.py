@@ -16,23 +16,36 @@
 """Module for ROS data model utils."""
 
 from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import List
 from typing import Mapping
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 from typing import Union
 
 import numpy as np
+import pandas as pd
 from pandas import concat
 from pandas import DataFrame
-import pandas as pd
+from pandas import Index
 
 from . import DataModelUtil
+from ..data_model.ros2 import prettify_symbol
 from ..data_model.ros2 import Ros2DataModel
 from ..processor.ros2 import Ros2Handler
 
 
 class Ros2DataModelUtil(DataModelUtil):
-    """ROS 2 data model utility class."""
+    """
+    ROS 2 data model utility class.
+
+    Lookups by handle, reference, or symbol use indexes that are built from the data model
+    `DataFrame`s the first time they are needed. An index is rebuilt if one of the `DataFrame`s it
+    is built from is replaced, e.g. when the data model is finalized again, but not if a
+    `DataFrame` is modified in place.
+    """
 
     def __init__(
         self,
@@ -44,11 +57,144 @@ class Ros2DataModelUtil(DataModelUtil):
         :param data_object: the data model or the event handler which has a data model
         """
         super().__init__(data_object)
+        # index name -> (DataFrames it was built from, index)
+        self._indexes: Dict[str, Tuple[Tuple[DataFrame, ...], Any]] = {}
 
     @property
     def data(self) -> Ros2DataModel:
         return super().data  # type: ignore
 
+    def _get_index(
+        self,
+        name: str,
+        dataframes: Tuple[DataFrame, ...],
+        build: Callable[[], Any],
+    ) -> Any:
+        """
+        Get an index, building it if it does not exist or is outdated.
+
+        :param name: the name of the index
+        :param dataframes: the data model `DataFrame`s that the index is built from
+        :param build: the function to build the index
+        :return: the index
+        """
+        cached = self._indexes.get(name, None)
+        if cached is not None:
+            cached_dataframes, index = cached
+            if all(cached_df is df for cached_df, df in zip(cached_dataframes, dataframes)):
+                return index
+        index = build()
+        self._indexes[name] = (dataframes, index)
+        return index
+
+    def _get_callback_symbols_index(self) -> Dict[int, str]:
+        """Get the callback object -> prettified symbol index."""
+        def build() -> Dict[int, str]:
+            callback_instances = self.data.callback_instances
+            callback_symbols = self.data.callback_symbols
+
+            # Get a list of callback objects
+            callback_objects = set(callback_instances['callback_object'].unique().tolist())
+            # Get their symbol
+            registered_objects = set(callback_symbols.index) & callback_objects
+            if 'symbol_pretty' in callback_symbols.columns:
+                symbols = callback_symbols['symbol_pretty']
+                return {obj: symbols[obj] for obj in registered_objects}
+            symbols = callback_symbols['symbol']
+            return {obj: self._prettify(symbols[obj]) for obj in registered_objects}
+        return self._get_index(
+            'callback_symbols',
+            (self.data.callback_instances, self.data.callback_symbols),
+            build,
+        )
+
+    def _get_symbol_callback_object_index(self) -> Dict[str, int]:
+        """Get the prettified symbol -> callback object index."""
+        callback_symbols = self._get_callback_symbols_index()
+        return self._get_index(
+            'symbol_callback_object',
+            (self.data.callback_instances, self.data.callback_symbols),
+            lambda: {symbol: obj for obj, symbol in callback_symbols.items()},
+        )
+
+    def _get_callback_object_reference_index(self) -> Dict[int, int]:
+        """Get the callback object -> reference index."""
+        def build() -> Dict[int, int]:
+            callback_objects = self.data.callback_objects
+            index: Dict[int, int] = {}
+            # Keep the first reference for a given callback object
+            for reference, callback_object in zip(
+                callback_objects.index.tolist(),
+                callback_objects['callback_object'].tolist(),
+            ):
+                index.setdefault(callback_object, int(reference))
+            return index
+        return self._get_index(
+            'callback_object_reference',
+            (self.data.callback_objects,),
+            build,
+        )
+
+    def _get_reference_owner_index(self) -> Dict[int, Optional[Tuple[str, Mapping[str, Any]]]]:
+        """Get the callback reference -> (owner type name, owner info) index."""
+        def build() -> Dict[int, Optional[Tuple[str, Mapping[str, Any]]]]:
+            return {
+                reference: self._get_reference_owner_info(reference)
+                for reference in self._get_callback_object_reference_index().values()
+            }
+        return self._get_index(
+            'reference_owner',
+            (
+                self.data.callback_objects,
+                self.data.timers,
+                self.data.publishers,
+                self.data.subscription_objects,
+                self.data.subscriptions,
+                self.data.services,
+                self.data.clients,
+                self.data.nodes,
+            ),
+            build,
+        )
+
+    def _get_subscription_reference_index(self) -> Dict[int, Tuple[int, str]]:
+        """Get the subscription reference -> (node handle, topic name) index."""
+        def build() -> Dict[int, Tuple[int, str]]:
+            # To get information about a subscription reference, we need 2 dataframes
+            #   * subscription_objects
+            #      * subscription (reference) <--> subscription_handle
+            #   * subscriptions
+            #      * subscription_handle <--> topic_name
+            #      * subscription_handle <--> node_handle
+            subscriptions_info = self.data.subscription_objects[['subscription_handle']].merge(
+                self.data.subscriptions[['node_handle', 'topic_name']],
+                left_on='subscription_handle',
+                right_index=True,
+            )
+            return dict(zip(
+                subscriptions_info.index.tolist(),
+                zip(
+                    subscriptions_info['node_handle'].tolist(),
+                    subscriptions_info['topic_name'].tolist(),
+                ),
+            ))
+        return self._get_index(
+            'subscription_reference',
+            (self.data.subscription_objects, self.data.subscriptions),
+            build,
+        )
+
+    def _get_node_handle_index(self) -> Dict[int, Tuple[str, Any]]:
+        """Get the node handle -> (node name, tid) index."""
+        return self._get_index(
+            'node_handle',
+            (self.data.nodes,),
+            lambda: dict(zip(
+                self.data.nodes.index.tolist(),
+                zip(self.data.nodes['name'].tolist(), self.data.nodes['tid'].tolist()),
+            )),
+        )
+
     def _prettify(
         self,
         original: str,
@@ -56,61 +202,15 @@ class Ros2DataModelUtil(DataModelUtil):
         """
         Process symbol to make it more readable.
 
-        * remove std::allocator
-        * remove std::default_delete
-        * bind object: remove placeholder
+        See `prettify_symbol()`.
 
         :param original: the original symbol
         :return: the prettified symbol
         """
-        pretty = original
-        # remove spaces
-        pretty = pretty.replace(' ', '')
-        # allocator
-        std_allocator = '_<std::allocator<void>>'
-        pretty = pretty.replace(std_allocator, '')
-        # default_delete
-        std_defaultdelete = 'std::default_delete'
-        if std_defaultdelete in pretty:
-            dd_start = pretty.find(std_defaultdelete)
-            template_param_open = dd_start + len(std_defaultdelete)
-            # find index of matching/closing GT sign
-            template_param_close = template_param_open
-            level = 0
-            done = False
-            while not done:
-                template_param_close += 1
-                if pretty[template_param_close] == '<':
-                    level += 1
-                elif pretty[template_param_close] == '>':
-                    if level == 0:
-                        done = True
-                    else:
-                        level -= 1
-            pretty = pretty[:dd_start] + pretty[(template_param_close + 1):]
-        # bind
-        std_bind = 'std::_Bind<'
-        if pretty.startswith(std_bind):
-            # remove bind<>
-            pretty = pretty.replace(std_bind, '')
-            pretty = pretty[:-1]
-            # remove placeholder stuff
-            placeholder_from = pretty.find('*')
-            placeholder_to = pretty.find(')', placeholder_from)
-            pretty = pretty[:placeholder_from] + '?' + pretty[(placeholder_to + 1):]
-        # remove dangling comma
-        pretty = pretty.replace(',>', '>')
-        # restore meaningful spaces
-        if pretty.startswith('void'):
-            pretty = 'void' + ' ' + pretty[len('void'):]
-        if pretty.endswith('const'):
-            pretty = pretty[:(len(pretty) - len('const'))] + ' ' + 'const'
-        return pretty
+        return prettify_symbol(original)
 
     def get_callback_object(self, callback_symbol):
-        symbols_dic = self.get_callback_symbols()
-        symbols_dic = {v: k for k, v in symbols_dic.items()}
-        return symbols_dic.get(callback_symbol)
+        return self._get_symbol_callback_object_index().get(callback_symbol)
 
     def get_publish_object(self, namespace, node_name, topic_name):
         df = self.get_publish_info()
@@ -127,16 +227,7 @@ class Ros2DataModelUtil(DataModelUtil):
 
         :return: the map
         """
-        callback_instances = self.data.callback_instances
-        callback_symbols = self.data.callback_symbols
-
-        # Get a list of callback objects
-        callback_objects = set(callback_instances['callback_object'])
-        # Get their symbol
-        registered_objects = set(callback_symbols.index) & callback_objects
-        return {
-            obj: self._prettify(callback_symbols.loc[obj, 'symbol']) for obj in registered_objects
-        }
+        return dict(self._get_callback_symbols_index())
 
     def get_tids(self) -> List[str]:
         """Get a list of thread ids corresponding to the nodes."""
@@ -160,6 +251,73 @@ class Ros2DataModelUtil(DataModelUtil):
         # Time conversion
         return self.convert_time_columns(data, ['duration'], ['timestamp'])
 
+    def get_callback_duration_stats(
+        self,
+        percentiles: Sequence[float] = (0.5, 0.9, 0.99),
+    ) -> DataFrame:
+        """
+        Get statistics about the durations of the instances of all callbacks.
+
+        :param percentiles: the percentiles of the durations to include, between 0 and 1
+        :return: a dataframe indexed by callback object, containing the symbol, owner type and
+            owner info of each callback, along with the count, sum, mean, standard deviation, min,
+            max (ms) and percentiles (ms, in columns named like '50%') of its durations
+        """
+        callback_instances = self.data.callback_instances
+        callback_objects, codes = np.unique(
+            callback_instances['callback_object'].to_numpy(dtype=np.int64),
+            return_inverse=True,
+        )
+        durations = callback_instances['duration'].to_numpy(dtype=np.float64) / 1000000.0
+        # Sort durations by callback object, and by value if percentiles are needed
+        if percentiles:
+            order = np.argsort(durations, kind='stable')
+            order = order[np.argsort(codes[order], kind='stable')]
+        else:
+            order = np.argsort(codes, kind='stable')
+        durations = durations[order]
+        counts = np.bincount(codes, minlength=len(callback_objects))
+        starts = np.cumsum(counts) - counts
+
+        def reduce_groups(ufunc: np.ufunc, values: np.ndarray) -> np.ndarray:
+            return ufunc.reduceat(values, starts) if len(values) else np.zeros(0)
+
+        sums = reduce_groups(np.add, durations)
+        means = sums / counts
+        squared_deviations = (durations - np.repeat(means, counts)) ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stds = np.sqrt(reduce_groups(np.add, squared_deviations) / (counts - 1))
+        stds[counts < 2] = np.nan
+        stats = DataFrame(
+            data={
+                'count': counts,
+                'sum': sums,
+                'mean': means,
+                'std': stds,
+                'min': reduce_groups(np.minimum, durations),
+                'max': reduce_groups(np.maximum, durations),
+            },
+            index=Index(callback_objects, name='callback_object'),
+        )
+        for percentile in percentiles:
+            # Linear interpolation between the closest ranks
+            positions = starts + percentile * (counts - 1)
+            lower = np.floor(positions).astype(np.int64)
+            upper = np.ceil(positions).astype(np.int64)
+            stats[f'{percentile * 100:g}%'] = \
+                durations[lower] + (durations[upper] - durations[lower]) * (positions - lower)
+
+        symbols = self._get_callback_symbols_index()
+        owners = [self.get_callback_owner_info(obj) for obj in stats.index]
+        stats.insert(0, 'symbol', [symbols.get(obj) for obj in stats.index])
+        stats.insert(1, 'owner_type', [owner[0] if owner else None for owner in owners])
+        stats.insert(
+            2,
+            'owner_info',
+            [self.format_info_dict(owner[1]) if owner else None for owner in owners],
+        )
+        return stats
+
     def get_node_info_from_tid(
             self,
             tid) -> DataFrame:
@@ -222,10 +380,25 @@ class Ros2DataModelUtil(DataModelUtil):
         :return: information about the owner of the callback, or `None` if it fails
         """
         # Get reference corresponding to callback object
-        reference = self.data.callback_objects.loc[
-            self.data.callback_objects['callback_object'] == callback_obj
-        ].index.values.astype(int)[0]
+        reference = self._get_callback_object_reference_index().get(callback_obj, None)
+        if reference is None:
+            return None
+        owner = self._get_reference_owner_index().get(reference, None)
+        if owner is None:
+            return None
+        type_name, info = owner
+        return type_name, dict(info)
 
+    def _get_reference_owner_info(
+        self,
+        reference: int,
+    ) -> Optional[Tuple[str, Mapping[str, Any]]]:
+        """
+        Get the type and information about the owner of a callback reference.
+
+        :param reference: the callback reference value
+        :return: the owner type name and information, or `None` if it fails
+        """
         type_name = None
         info = None
         # Check if it's a timer first (since it's slightly different than the others)
@@ -248,7 +421,6 @@ class Ros2DataModelUtil(DataModelUtil):
         if info is None:
             return None
         return type_name, info
-        # return f'{type_name} -- {self.format_info_dict(info)}'
 
     def get_timer_info(self):
         timer_df = self.data.nodes.drop('timestamp', axis=1)
@@ -361,47 +533,14 @@ class Ros2DataModelUtil(DataModelUtil):
         :param subscription_reference: the subscription reference value
         :return: a dictionary with name:value info, or `None` if it fails
         """
-        # First check that the subscription reference exists
-        if subscription_reference not in self.data.subscription_objects.index:
+        subscription = self._get_subscription_reference_index().get(subscription_reference, None)
+        if subscription is None:
             return None
 
-        # To get information about a subscription reference, we need 3 dataframes
-        #   * subscription_objects
-        #      * subscription (reference) <--> subscription_handle
-        #   * subscriptions
-        #      * subscription_handle <--> topic_name
-        #      * subscription_handle <--> node_handle
-        #   * nodes
-        #      * node_handle <--> (node info)
-        # First, drop unnecessary common columns for debugging simplicity
-        subscription_objects_simple = self.data.subscription_objects.drop(
-            columns=['timestamp'],
-            axis=1,
-        )
-        subscriptions_simple = self.data.subscriptions.drop(
-            columns=['timestamp', 'rmw_handle'],
-            inplace=False,
-        )
-        nodes_simple = self.data.nodes.drop(
-            columns=['timestamp', 'rmw_handle'],
-            inplace=False,
-        )
-        # Then merge the 3 dataframes
-        subscriptions_info = subscription_objects_simple.merge(
-            subscriptions_simple,
-            left_on='subscription_handle',
-            right_index=True,
-        ).merge(
-            nodes_simple,
-            left_on='node_handle',
-            right_index=True,
-        )
-
-        node_handle = subscriptions_info.loc[subscription_reference, 'node_handle']
+        node_handle, topic_name = subscription
         node_handle_info = self.get_node_handle_info(node_handle)
         if node_handle_info is None:
             return None
-        topic_name = subscriptions_info.loc[subscription_reference, 'topic_name']
         subscription_info = {'topic': topic_name}
         return {**node_handle_info, **subscription_info}
 
@@ -457,11 +596,11 @@ class Ros2DataModelUtil(DataModelUtil):
         :param node_handle: the node handle value
         :return: a dictionary with name:value info, or `None` if it fails
         """
-        if node_handle not in self.data.nodes.index:
+        node_info = self._get_node_handle_index().get(node_handle, None)
+        if node_info is None:
             return None
 
-        node_name = self.data.nodes.loc[node_handle, 'name']
-        tid = self.data.nodes.loc[node_handle, 'tid']
+        node_name, tid = node_info
         return {'node': node_name, 'tid': tid}
 
     def get_lifecycle_node_handle_info(